@@ -0,0 +1,1182 @@
+import threading
+from array import array
+from collections import OrderedDict
+from itertools import islice
+from time import monotonic, perf_counter
+
+import numpy as np
+
+from leases import LeaseManager
+from metrics import InstrumentedLock
+
+DEFAULT_PARAMETERS = {
+    "available": [10, 9, 10],
+    "maximum": [[7, 5, 3], [3, 2, 2], [9, 0, 2], [2, 2, 2], [4, 3, 3]],
+    "allocation": [[0, 1, 0], [2, 0, 0], [3, 0, 2], [2, 1, 1], [0, 0, 2]]
+}
+
+# Process slots are added in chunks that double the capacity, and never fewer than this many.
+MIN_CAPACITY_GROWTH = 8
+
+# Avoidance grants a request only if the state stays safe; detection grants anything that fits in available and
+# looks for deadlocks among blocked requests in the background instead.
+AVOIDANCE, DETECTION = "avoidance", "detection"
+FINGERPRINT_MASK = (1 << 64) - 1
+# Rows of a cached sequence's prefix are checked this many at a time, see rows_finish_in_order.
+PREFIX_BLOCK = 64
+
+
+class VectorizedSafetyEngine:
+    """Safety check over NumPy matrices.
+
+    Keeps a worklist of unfinished processes and, on every pass, marks all of the ones whose need fits in the
+    current work vector as finished at once. Stops when a pass makes no progress.
+    """
+
+    def __init__(self, metrics=None):
+        self.metrics = metrics
+
+    def find_safe_sequence(self, allocation: np.ndarray, available: np.ndarray, need: np.ndarray) -> tuple:
+        work = available.copy()
+        pending = np.arange(len(allocation))
+        sequence = []
+        passes = 0
+        while pending.size:
+            passes += 1
+            # Skip the fancy-index copy on the first pass, when every process is still pending.
+            candidates = need if pending.size == len(need) else need[pending]
+            runnable = (candidates <= work).all(axis=1)
+            if not runnable.any():
+                break
+            finished = pending[runnable]
+            work += allocation[finished].sum(axis=0)
+            sequence.extend(finished.tolist())
+            pending = pending[~runnable]
+
+        if self.metrics is not None:
+            self.metrics.observe(self.metrics.safety_passes, passes)
+        return not pending.size, sequence
+
+
+class SafetyCache:
+    """Bounded map from a state fingerprint to the (is_safe, sequence) found for that state.
+
+    With eviction "lru" a hit moves the entry to the back of the queue; with "fifo" entries leave in the order they
+    were added. Not thread-safe: the engine only touches it with its lock held.
+    """
+
+    def __init__(self, maxsize=256, eviction="lru"):
+        if eviction not in ("lru", "fifo"):
+            raise ValueError(f"unknown eviction policy {eviction!r}")
+        self.maxsize = maxsize
+        self.eviction = eviction
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, fingerprint):
+        verdict = self.entries.get(fingerprint)
+        if verdict is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        if self.eviction == "lru":
+            self.entries.move_to_end(fingerprint)
+        return verdict
+
+    def put(self, fingerprint, verdict) -> None:
+        self.entries[fingerprint] = verdict
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self) -> dict:
+        return {"size": len(self.entries), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses,
+                "evictions": self.evictions, "hit_rate": round(self.hit_rate(), 6)}
+
+
+class SystemState:
+    """available, maximum, allocation and need as NumPy views over one contiguous int64 buffer.
+
+    The buffer is an array('q') unless another writable buffer, such as a shared memory block, is given.
+    """
+    __slots__ = ("num_processes", "num_resources", "buffer", "words", "available", "maximum", "allocation", "need")
+
+    def __init__(self, num_processes, num_resources, buffer=None, offset=0):
+        matrix = num_processes * num_resources
+        size = self.words_needed(num_processes, num_resources)
+        self.num_processes = num_processes
+        self.num_resources = num_resources
+        self.buffer = array("q", bytes(size * 8)) if buffer is None else buffer
+        self.words = np.frombuffer(self.buffer, dtype=np.int64, count=size, offset=offset)
+        self.available = self.words[:num_resources]
+        self.maximum = self.words[num_resources:num_resources + matrix].reshape(num_processes, num_resources)
+        self.allocation = self.words[num_resources + matrix:num_resources + 2 * matrix].reshape(num_processes,
+                                                                                                num_resources)
+        self.need = self.words[num_resources + 2 * matrix:].reshape(num_processes, num_resources)
+
+    @staticmethod
+    def words_needed(num_processes, num_resources) -> int:
+        return num_resources + 3 * num_processes * num_resources
+
+    @classmethod
+    def from_matrices(cls, available, maximum, allocation, buffer=None, offset=0):
+        maximum = np.asarray(maximum, dtype=np.int64)
+        state = cls(maximum.shape[0], len(available), buffer, offset)
+        state.available[:] = available
+        state.maximum[:] = maximum
+        state.allocation[:] = allocation
+        np.subtract(state.maximum, state.allocation, out=state.need)
+        return state
+
+    def copy(self):
+        state = SystemState(self.num_processes, self.num_resources)
+        state.words[:] = self.words
+        return state
+
+    def resized(self, num_processes):
+        """Returns a copy with num_processes rows; rows past the current ones are zero, which marks them free."""
+        state = SystemState(num_processes, self.num_resources)
+        rows = min(num_processes, self.num_processes)
+        state.available[:] = self.available
+        state.maximum[:rows] = self.maximum[:rows]
+        state.allocation[:rows] = self.allocation[:rows]
+        state.need[:rows] = self.need[:rows]
+        return state
+
+
+class StateSnapshot:
+    """Immutable state published by every commit in optimistic mode, readable outside the lock.
+
+    A commit only copies available and the rows it touched: allocation and need are rebuilt from the last full copy
+    and the rows changed since, the first time a reader asks for them, and then shared by every reader.
+    """
+    __slots__ = ("version", "available", "safe_sequence", "sequence_position", "base", "changes", "count", "latest",
+                 "matrices")
+
+    def __init__(self, version, available, allocation, need, safe_sequence, sequence_position, changes=(), count=0):
+        self.version = version
+        self.available = available
+        self.safe_sequence = safe_sequence
+        self.sequence_position = sequence_position
+        self.base = (allocation, need)
+        # changes is append-only and shared with later snapshots, so only its first count entries belong here.
+        self.changes = changes
+        self.count = count
+        self.latest = None
+        self.matrices = None if count else self.base
+
+    @property
+    def allocation(self) -> np.ndarray:
+        return self.materialize()[0]
+
+    @property
+    def need(self) -> np.ndarray:
+        return self.materialize()[1]
+
+    def row(self, num_process) -> tuple:
+        """Returns the allocation and need rows of one process without rebuilding the whole matrices."""
+        if self.matrices is not None:
+            return self.matrices[0][num_process], self.matrices[1][num_process]
+        change = self.latest_changes().get(num_process)
+        if change is None:
+            return self.base[0][num_process], self.base[1][num_process]
+        return self.changes[change][1:]
+
+    def rows(self, processes) -> tuple:
+        """Returns the allocation and need rows of an array of processes without rebuilding the whole matrices."""
+        if self.matrices is not None:
+            return self.matrices[0][processes], self.matrices[1][processes]
+
+        allocation, need = self.base[0][processes], self.base[1][processes]
+        latest = self.latest_changes()
+        for i in np.flatnonzero(np.isin(processes, np.fromiter(latest, dtype=np.intp, count=len(latest)))):
+            _, allocation[i], need[i] = self.changes[latest[int(processes[i])]]
+        return allocation, need
+
+    def latest_changes(self) -> dict:
+        """Maps every process changed since the full copy to the index of its last change."""
+        if self.latest is None:
+            self.latest = {num_process: i for i, (num_process, _, _) in enumerate(islice(self.changes, self.count))}
+        return self.latest
+
+    def materialize(self) -> tuple:
+        matrices = self.matrices
+        if matrices is None:
+            allocation, need = self.base[0].copy(), self.base[1].copy()
+            for num_process, allocation_row, need_row in islice(self.changes, self.count):
+                allocation[num_process] = allocation_row
+                need[num_process] = need_row
+            matrices = self.matrices = (read_only_view(allocation), read_only_view(need))
+        return matrices
+
+
+def read_only_view(array: np.ndarray) -> np.ndarray:
+    view = array.view()
+    view.flags.writeable = False
+    return view
+
+
+class Waiter:
+    """A blocked request, parked on its own condition until a release touches one of the resources it is short of."""
+
+    def __init__(self, lock, num_process, request):
+        self.condition = threading.Condition(lock)
+        self.num_process = num_process
+        self.request = request
+        self.resources = ()
+        self.preempted = False
+
+
+class BankersAlgorithm:
+    def __init__(self, available, maximum, allocation, safety_engine=None, optimistic=False, max_retries=8,
+                 metrics=None, wal=None, policy=AVOIDANCE, detection_interval=1.0, preempt_victims=False,
+                 on_deadlock=None, safety_cache_size=0, safety_cache_eviction="lru"):
+        self.init_engine(SystemState.from_matrices(available, maximum, allocation), safety_engine, optimistic,
+                         max_retries, metrics, wal, policy, detection_interval, preempt_victims, on_deadlock,
+                         safety_cache_size, safety_cache_eviction)
+
+    @classmethod
+    def from_state(cls, state: SystemState, **kwargs):
+        """Wraps an existing SystemState, such as one mapped from a snapshot, without copying it."""
+        system_management = cls.__new__(cls)
+        system_management.init_engine(state, **kwargs)
+        return system_management
+
+    def init_engine(self, state: SystemState, safety_engine=None, optimistic=False, max_retries=8, metrics=None,
+                    wal=None, policy=AVOIDANCE, detection_interval=1.0, preempt_victims=False, on_deadlock=None,
+                    safety_cache_size=0, safety_cache_eviction="lru"):
+        if policy not in (AVOIDANCE, DETECTION):
+            raise ValueError(f"unknown policy {policy!r}")
+        if policy == DETECTION and optimistic:
+            raise ValueError("the detection policy does not use the optimistic mode")
+        self.bind_state(state)
+        self.metrics = metrics
+        self.wal = wal
+        self.recorder = None
+        self.lock = threading.Lock() if metrics is None else InstrumentedLock(metrics)
+        self.len_resources = state.num_resources
+        self.safety_engine = safety_engine if safety_engine is not None else VectorizedSafetyEngine(metrics)
+        self.safe_sequence = None
+        self.sequence_position = None
+        # Full safety checks are memoized by a fingerprint of the state that apply_delta keeps up to date in O(m).
+        # None means it has to be recomputed from the matrices before the next lookup.
+        self.safety_cache = SafetyCache(safety_cache_size, safety_cache_eviction) if safety_cache_size else None
+        self.fingerprint = None
+        self.fingerprint_weights = None
+        self.optimistic = optimistic
+        self.max_retries = max_retries
+        self.version = 0
+        self.last_grant_version = 0
+        self.snapshot = None
+        # Rows changed since the last published snapshot, so the next one copies only those.
+        self.dirty_rows = set() if optimistic else None
+        self.waiters = [set() for _ in range(self.len_resources)]
+        if optimistic:
+            self.publish_snapshot()
+        self.policy = policy
+        self.preempt_victims = preempt_victims
+        self.on_deadlock = on_deadlock
+        self.stop_detection = threading.Event()
+        if policy == DETECTION:
+            threading.Thread(target=self.detection_loop, args=(detection_interval,), daemon=True).start()
+        # Started on the first request with a TTL, together with its reclaiming thread.
+        self.leases = None
+        self.reset_free_slots()
+        self.start = perf_counter()
+
+    def request_resources(self, num_process, request_res,  console_info, wait=False, timeout=None, ttl=None):
+        """Grants the request if it is safe. With a ttl in seconds a granted request is leased: it is released again
+        unless the lease is renewed in time, and the lease id is returned.
+        """
+        request = np.asarray(request_res, dtype=np.int64)
+        if ttl is not None:
+            # Started outside the lock, so the grant can take out its lease under the lock.
+            self.lease_manager()
+        if wait:
+            granted = self.request_blocking(num_process, request, timeout, ttl)
+        elif self.optimistic:
+            granted = self.request_optimistically(num_process, request, ttl)
+        else:
+            self.lock.acquire()
+            try:
+                self.record_request(num_process, request)
+                granted = self.grant_if_safe(num_process, request) and self.start_lease(num_process, request, ttl)
+            finally:
+                self.lock.release()
+        self.wait_durable()
+        time_stamp = perf_counter()
+        console_info.append([bool(granted), num_process, request_res, round(time_stamp - self.start, 4)])
+        if granted and ttl is not None:
+            return granted
+        return None
+
+    def request_resources_batch(self, requests, maximize_grants=False, console_info=None, ttls=None) -> list:
+        """Evaluates a list of (num_process, request_res) pairs under a single lock acquisition.
+
+        Returns the grant flags in the order of requests. With maximize_grants the requests are admitted smallest
+        first, measured against what is available, which is a greedy way to fit as many of them as possible. ttls,
+        parallel to requests, leases the granted requests that have one; their flags are the lease ids instead of True.
+        """
+        vectors = [np.asarray(request_res, dtype=np.int64) for _, request_res in requests]
+        granted = [False] * len(requests)
+        if ttls is None:
+            ttls = [None] * len(requests)
+        elif any(ttl is not None for ttl in ttls):
+            self.lease_manager()
+
+        self.lock.acquire()
+        try:
+            order = self.admission_order(vectors) if maximize_grants else range(len(requests))
+            for i in order:
+                self.record_request(requests[i][0], vectors[i])
+                granted[i] = (self.grant_if_safe(requests[i][0], vectors[i])
+                              and self.start_lease(requests[i][0], vectors[i], ttls[i]))
+        finally:
+            if self.optimistic:
+                self.publish_snapshot(grant=any(granted))
+            self.lock.release()
+        self.wait_durable()
+
+        if console_info is not None:
+            time_stamp = round(perf_counter() - self.start, 4)
+            for i in order:
+                console_info.append([bool(granted[i]), requests[i][0], requests[i][1], time_stamp])
+        return granted
+
+    def lease_manager(self) -> LeaseManager:
+        """Starts the lease manager if needed. Must be called without the lock, which it takes to do so."""
+        if self.leases is None:
+            with self.lock:
+                if self.leases is None:
+                    self.leases = LeaseManager(self)
+        return self.leases
+
+    def start_lease(self, num_process, request, ttl):
+        """Leases a request that was just granted and returns the lease id, or True without a ttl.
+
+        Must be called with the lock held, in the acquisition that granted the request, so that the slot cannot go to
+        another process before the lease names it. The lease manager must have been started beforehand.
+        """
+        if ttl is None:
+            return True
+        return self.leases.grant(num_process, request, ttl)
+
+    def renew_lease(self, lease_id, ttl) -> bool:
+        """Extends a lease to ttl seconds from now; False if it is unknown or has already expired."""
+        return self.leases is not None and self.leases.renew(lease_id, ttl)
+
+    def release_lease(self, lease_id, console_info=None) -> bool:
+        """Ends a lease early and releases what it still covers; False if it is unknown or has already expired."""
+        lease = self.leases.cancel(lease_id) if self.leases is not None else None
+        if lease is None:
+            return False
+        try:
+            self.release_resources_batch([lease], console_info, clip=True)
+        finally:
+            self.leases.finish_reclaiming([lease_id])
+        return True
+
+    def request_optimistically(self, num_process, request, ttl=None):
+        """Checks the request against a snapshot without the lock, then commits with a compare-and-swap on version.
+
+        Commits that landed after the snapshot only invalidate the check if one of them was a grant, because
+        releases keep a safe state safe. After max_retries lost races the request is decided under the lock.
+        Returns what start_lease does for a granted request and False otherwise.
+        """
+        for _ in range(self.max_retries):
+            snapshot = self.snapshot
+            if num_process >= len(snapshot.base[0]):
+                # The state grew after this snapshot was published; only the lock sees the new slots yet.
+                break
+            start = perf_counter()
+            safe, sequence = self.check_request_on_snapshot(snapshot, num_process, request)
+            self.observe_safety_check(start)
+
+            self.lock.acquire()
+            try:
+                if self.version == snapshot.version or (safe and self.last_grant_version <= snapshot.version):
+                    self.record_request(num_process, request)
+                    if safe:
+                        self.apply_delta(num_process, request)
+                        self.log_grant(num_process, request)
+                        if sequence is not None:
+                            self.cache_safe_sequence(sequence)
+                        self.publish_snapshot(grant=True)
+                        self.count_decision("request", "granted")
+                    else:
+                        valid = self.fits(request, snapshot.row(num_process)[1], snapshot.available)
+                        self.count_decision("request", "denied_unsafe" if valid else "denied_invalid")
+                    return safe and self.start_lease(num_process, request, ttl)
+            finally:
+                self.lock.release()
+
+        self.lock.acquire()
+        try:
+            self.record_request(num_process, request)
+            return self.grant_locked(num_process, request) and self.start_lease(num_process, request, ttl)
+        finally:
+            self.lock.release()
+
+    def request_blocking(self, num_process, request, timeout=None, ttl=None):
+        """Parks the caller until a release lets the request through, or until timeout seconds have passed.
+
+        Requests that exceed the need of num_process can never be granted and are refused right away. The trace
+        records the request once, at the attempt that decides it. Returns like request_optimistically.
+        """
+        deadline = None if timeout is None else monotonic() + timeout
+        waiter = Waiter(self.lock, num_process, request)
+
+        self.lock.acquire()
+        try:
+            while True:
+                if self.grant_locked(num_process, request):
+                    self.record_request(num_process, request)
+                    return self.start_lease(num_process, request, ttl)
+
+                resources = self.shortfall(num_process, request)
+                remaining = None if deadline is None else deadline - monotonic()
+                if resources is None or (remaining is not None and remaining <= 0):
+                    self.record_request(num_process, request)
+                    return False
+
+                self.park(waiter, resources)
+                waiter.condition.wait(remaining)
+                self.unpark(waiter)
+                if waiter.preempted:
+                    return False
+        finally:
+            self.lock.release()
+
+    def shortfall(self, num_process, request):
+        """Returns the resource types the request is waiting on, or None if no release can let it through.
+
+        If the request fits in available but leaves the state unsafe, these are the resource types that the
+        processes left over by the safety search are short of.
+        """
+        if not np.all(request <= self.need[num_process]):
+            return None
+
+        short = request > self.available
+        if short.any():
+            return np.flatnonzero(short).tolist()
+
+        allocation = self.allocation.copy()
+        allocation[num_process] += request
+        need = self.need.copy()
+        need[num_process] -= request
+        available = self.available - request
+        _, sequence = self.is_sequence_state_safe(allocation, available, need)
+
+        work = available + allocation[sequence].sum(axis=0)
+        pending = np.ones(len(need), dtype=bool)
+        pending[sequence] = False
+        return np.flatnonzero((need[pending] > work).any(axis=0)).tolist()
+
+    def park(self, waiter, resources) -> None:
+        waiter.resources = resources
+        for k in resources:
+            self.waiters[k].add(waiter)
+
+    def unpark(self, waiter) -> None:
+        for k in waiter.resources:
+            self.waiters[k].discard(waiter)
+        waiter.resources = ()
+
+    def wake_waiters(self, release) -> None:
+        """Wakes only the waiters short of a resource type that release returned. Must be called with the lock held."""
+        woken = set()
+        for k in np.flatnonzero(release):
+            woken.update(self.waiters[k])
+
+        for waiter in woken:
+            self.unpark(waiter)
+            waiter.condition.notify()
+
+    def grant_locked(self, num_process, request) -> bool:
+        """grant_if_safe that keeps published snapshots intact in optimistic mode. Must be called with the lock held."""
+        if not self.optimistic:
+            return self.grant_if_safe(num_process, request)
+
+        granted = self.grant_if_safe(num_process, request)
+        if granted:
+            self.publish_snapshot(grant=True)
+        return granted
+
+    def check_request_on_snapshot(self, snapshot, num_process, request) -> tuple:
+        """Returns (is_safe, sequence) for the request applied to snapshot.
+
+        sequence is None when the request is refused or when the snapshot's cached sequence still holds.
+        """
+        if not self.fits(request, snapshot.row(num_process)[1], snapshot.available):
+            return False, None
+
+        available = snapshot.available - request
+        if snapshot.safe_sequence is not None:
+            prefix = snapshot.safe_sequence[:snapshot.sequence_position[num_process]]
+            prefix_alloc, prefix_need = snapshot.rows(prefix)
+            if not prefix.size or self.rows_finish_in_order(prefix_alloc, available, prefix_need):
+                return True, None
+
+        allocation = snapshot.allocation.copy()
+        allocation[num_process] += request
+        need = snapshot.need.copy()
+        need[num_process] -= request
+        safe, sequence = self.is_sequence_state_safe(allocation, available, need)
+        return safe, sequence if safe else None
+
+    def take_snapshot(self) -> StateSnapshot:
+        """Returns an immutable snapshot of the state that can be read outside the lock.
+
+        In optimistic mode this is the published snapshot; otherwise the matrices are copied under the lock.
+        """
+        if self.optimistic:
+            return self.snapshot
+
+        self.lock.acquire()
+        try:
+            return StateSnapshot(
+                self.version, read_only_view(self.available.copy()), read_only_view(self.allocation.copy()),
+                read_only_view(self.need.copy()), None if self.safe_sequence is None else self.safe_sequence.copy(),
+                None if self.sequence_position is None else self.sequence_position.copy())
+        finally:
+            self.lock.release()
+
+    def bind_state(self, state: SystemState) -> None:
+        self.state = state
+        self.available = state.available
+        self.maximum = state.maximum
+        self.allocation = state.allocation
+        self.need = state.need
+        self.snapshot_base = None
+
+    def publish_snapshot(self, grant=False) -> None:
+        """Publishes the state by copying available and the dirty rows. Must be called with the lock held.
+
+        Every len(maximum) // 4 changed rows, or after the whole state changed, the matrices are copied in full
+        instead, so a commit costs O(m) amortized and readers never replay more than a quarter of the rows.
+        """
+        self.version += 1
+        if grant:
+            self.last_grant_version = self.version
+        if (self.snapshot_base is None
+                or len(self.snapshot_changes) + len(self.dirty_rows) > max(64, len(self.maximum) // 4)):
+            self.snapshot_base = (read_only_view(self.allocation.copy()), read_only_view(self.need.copy()))
+            self.snapshot_changes = []
+        else:
+            for num_process in self.dirty_rows:
+                self.snapshot_changes.append((num_process, self.allocation[num_process].copy(),
+                                              self.need[num_process].copy()))
+        self.dirty_rows.clear()
+        self.snapshot = StateSnapshot(self.version, read_only_view(self.available.copy()), *self.snapshot_base,
+                                      self.safe_sequence, self.sequence_position, self.snapshot_changes,
+                                      len(self.snapshot_changes))
+
+    def admission_order(self, vectors) -> list:
+        if not vectors:
+            return []
+        cost = (np.stack(vectors) / np.maximum(self.available, 1)).sum(axis=1)
+        return np.argsort(cost, kind="stable").tolist()
+
+    def grant_if_safe(self, num_process, request) -> bool:
+        """Grants the request if it is valid and, under the avoidance policy, leaves the state safe.
+
+        Must be called with the lock held.
+        """
+        if not self.request_is_valid(num_process, request):
+            self.count_decision("request", "denied_invalid")
+            return False
+
+        self.apply_delta(num_process, request)
+        if self.policy == DETECTION:
+            # The grant is not checked, so the cached sequence may no longer be a safe order.
+            self.invalidate_safe_sequence()
+        elif not self.state_is_safe_after_request(num_process):
+            self.undo_delta(num_process, request)
+            self.count_decision("request", "denied_unsafe")
+            return False
+
+        self.log_grant(num_process, request)
+        self.count_decision("request", "granted")
+        return True
+
+    def apply_delta(self, num_process, delta) -> None:
+        """Moves delta from available to the allocation of num_process, updating only its need row."""
+        self.allocation[num_process] += delta
+        self.need[num_process] -= delta
+        self.available -= delta
+        if self.fingerprint is not None:
+            self.update_fingerprint(num_process, delta)
+        if self.dirty_rows is not None:
+            self.dirty_rows.add(num_process)
+
+    def undo_delta(self, num_process, delta) -> None:
+        """Moves delta from the allocation of num_process back to available."""
+        self.allocation[num_process] -= delta
+        self.need[num_process] += delta
+        self.available += delta
+        if self.fingerprint is not None:
+            self.update_fingerprint(num_process, -delta)
+        if self.dirty_rows is not None:
+            self.dirty_rows.add(num_process)
+
+    def state_is_safe_after_request(self, num_process) -> bool:
+        start = perf_counter()
+        if self.safe_sequence is not None and self.safe_sequence_still_valid(num_process):
+            safe = True
+        else:
+            safe, sequence = self.check_current_state()
+            if safe:
+                self.cache_safe_sequence(sequence)
+        self.observe_safety_check(start)
+        return safe
+
+    def check_current_state(self) -> tuple:
+        """Full safety check of the live state, answered from the safety cache when the state was seen before."""
+        if self.safety_cache is None:
+            return self.is_sequence_state_safe(self.allocation, self.available, self.need)
+
+        fingerprint = self.current_fingerprint()
+        verdict = self.safety_cache.get(fingerprint)
+        if verdict is None:
+            safe, sequence = self.is_sequence_state_safe(self.allocation, self.available, self.need)
+            verdict = (safe, np.asarray(sequence, dtype=np.intp))
+            self.safety_cache.put(fingerprint, verdict)
+        return verdict
+
+    def current_fingerprint(self) -> int:
+        """64-bit hash of available, allocation and need, linear in their entries.
+
+        Entry (p, k) of allocation is weighted by a[p] * b[k] and of need by c[p] * u[k] with random odd weights, so
+        moving a delta between available and one row changes the hash by a dot product over m entries.
+        """
+        if self.fingerprint is None:
+            num_processes, num_resources = self.allocation.shape
+            if self.fingerprint_weights is None or len(self.fingerprint_weights[0]) != num_processes:
+                rng = np.random.default_rng()
+                self.fingerprint_weights = tuple(
+                    rng.integers(0, 1 << 64, size, dtype=np.uint64) | np.uint64(1)
+                    for size in (num_processes, num_processes, num_resources, num_resources, num_resources))
+            a, c, b, u, v = self.fingerprint_weights
+            fingerprint = (int(np.dot(self.allocation.astype(np.uint64) @ b, a))
+                           + int(np.dot(self.need.astype(np.uint64) @ u, c))
+                           + int(np.dot(self.available.astype(np.uint64), v)))
+            self.fingerprint = fingerprint & FINGERPRINT_MASK
+        return self.fingerprint
+
+    def update_fingerprint(self, num_process, delta) -> None:
+        """Accounts for delta moving from available to the allocation of num_process."""
+        a, c, b, u, v = self.fingerprint_weights
+        weights = a[num_process] * b - c[num_process] * u - v
+        self.fingerprint = (self.fingerprint + int(np.dot(delta.astype(np.uint64), weights))) & FINGERPRINT_MASK
+
+    def update_fingerprint_need(self, num_process, delta) -> None:
+        """Accounts for delta being added to the need of num_process alone, as when its maximum changes."""
+        weights = self.fingerprint_weights[1][num_process] * self.fingerprint_weights[3]
+        self.fingerprint = (self.fingerprint + int(np.dot(delta.astype(np.uint64), weights))) & FINGERPRINT_MASK
+
+    def safe_sequence_still_valid(self, num_process) -> bool:
+        """Checks the cached sequence against a state where only num_process was granted a request.
+
+        The work vector seen by processes after num_process in the sequence is unchanged by the grant, and
+        num_process itself still fits, so only the processes ahead of it have to be checked again.
+        """
+        prefix = self.safe_sequence[:self.sequence_position[num_process]]
+        return self.prefix_is_safe(prefix, self.allocation, self.available, self.need)
+
+    @staticmethod
+    def prefix_is_safe(prefix, allocation, available, need) -> bool:
+        if not prefix.size:
+            return True
+        return BankersAlgorithm.rows_finish_in_order(allocation[prefix], available, need[prefix])
+
+    @staticmethod
+    def rows_finish_in_order(allocation_rows, available, need_rows) -> bool:
+        """True if processes with these rows can finish one after another, in order, starting from available.
+
+        NumPy takes a cumulative sum down the rows one column at a time, striding a whole row per step, which costs
+        more than a full search on long prefixes. Each block of PREFIX_BLOCK rows is first checked against the work
+        vector at its start instead, which only needs block sums, and the running sum is taken only in the blocks
+        where that bound is too coarse, and in the last, partial block.
+        """
+        count, width = allocation_rows.shape
+        if count <= PREFIX_BLOCK:
+            return BankersAlgorithm.rows_fit_running_work(allocation_rows, available, need_rows)
+
+        full = count - count % PREFIX_BLOCK
+        # work[b] is the work vector when the first process of block b gets its turn.
+        work = np.empty((full // PREFIX_BLOCK + 1, width), dtype=np.int64)
+        work[0] = available
+        np.cumsum(allocation_rows[:full].reshape(-1, PREFIX_BLOCK, width).sum(axis=1), axis=0, out=work[1:])
+        work[1:] += available
+        coarse = (need_rows[:full].reshape(-1, PREFIX_BLOCK, width) <= work[:-1, None]).all(axis=(1, 2))
+        blocks = np.flatnonzero(~coarse).tolist()
+        if full < count:
+            blocks.append(full // PREFIX_BLOCK)
+        return all(BankersAlgorithm.rows_fit_running_work(allocation_rows[b * PREFIX_BLOCK:(b + 1) * PREFIX_BLOCK],
+                                                          work[b], need_rows[b * PREFIX_BLOCK:(b + 1) * PREFIX_BLOCK])
+                   for b in blocks)
+
+    @staticmethod
+    def rows_fit_running_work(allocation_rows, work, need_rows) -> bool:
+        running = np.cumsum(allocation_rows, axis=0)
+        running -= allocation_rows
+        running += work
+        return bool((need_rows <= running).all())
+
+    def cache_safe_sequence(self, sequence) -> None:
+        self.safe_sequence = np.asarray(sequence, dtype=np.intp)
+        self.sequence_position = np.empty(len(self.safe_sequence), dtype=np.intp)
+        self.sequence_position[self.safe_sequence] = np.arange(len(self.safe_sequence))
+
+    def invalidate_safe_sequence(self) -> None:
+        """Must be called after the state is changed outside request_resources and release_resources."""
+        self.safe_sequence = None
+        self.sequence_position = None
+        self.fingerprint = None
+
+    def request_is_valid(self, num_process, request_res) -> bool:
+        return self.fits(request_res, self.need[num_process], self.available)
+
+    @staticmethod
+    def fits(request_res, need_row, available) -> bool:
+        return bool(np.all(request_res <= need_row) and np.all(request_res <= available))
+
+    def log_grant(self, num_process, request) -> None:
+        if self.wal is not None:
+            self.wal.log_grant(num_process, request)
+
+    def log_release(self, num_process, release) -> None:
+        if self.wal is not None:
+            self.wal.log_release(num_process, release)
+
+    def record_request(self, num_process, request) -> None:
+        """Adds the request to the trace, if one is being recorded. Must be called with the lock held."""
+        if self.recorder is not None:
+            self.recorder.record_request(num_process, request)
+
+    def record_release(self, num_process, release) -> None:
+        if self.recorder is not None:
+            self.recorder.record_release(num_process, release)
+
+    def record_configure(self) -> None:
+        if self.recorder is not None:
+            self.recorder.record_configure(self.state)
+
+    def record_register(self, num_process, maximum_row) -> None:
+        if self.recorder is not None:
+            self.recorder.record_register(num_process, maximum_row)
+
+    def record_unregister(self, num_process, released) -> None:
+        if self.recorder is not None:
+            self.recorder.record_unregister(num_process, released)
+
+    def record_resize(self, num_processes) -> None:
+        if self.recorder is not None:
+            self.recorder.record_resize(num_processes)
+
+    def wait_durable(self) -> None:
+        """Blocks until everything logged so far is on disk, if the log commits synchronously."""
+        if self.wal is not None:
+            self.wal.wait_durable()
+
+    def count_decision(self, op, outcome) -> None:
+        if self.metrics is not None:
+            self.metrics.count_decision(op, outcome)
+
+    def observe_safety_check(self, start) -> None:
+        if self.metrics is not None:
+            self.metrics.observe(self.metrics.safety_check, perf_counter() - start)
+
+    def is_sequence_state_safe(self, allocation, available, need) -> tuple:
+        """Returns (is_safe, sequence) where sequence is the order in which processes can finish."""
+        return self.safety_engine.find_safe_sequence(allocation, available, need)
+
+    def detection_loop(self, interval) -> None:
+        while not self.stop_detection.wait(interval):
+            self.check_for_deadlock()
+
+    def stop_deadlock_detection(self) -> None:
+        self.stop_detection.set()
+
+    def check_for_deadlock(self) -> list:
+        """Runs deadlock detection once and returns the deadlocked processes.
+
+        If preempt_victims is set, the cheapest deadlocked processes are preempted until the rest can proceed.
+        on_deadlock, if given, is called with the deadlocked processes and the victims after the lock is released.
+        """
+        self.lock.acquire()
+        try:
+            deadlocked = self.find_deadlocked()
+            if not deadlocked:
+                return []
+            self.count_decision("deadlock", "detected")
+            victims = self.preempt_cheapest(deadlocked) if self.preempt_victims else []
+        finally:
+            self.lock.release()
+
+        if victims:
+            self.wait_durable()
+        if self.on_deadlock is not None:
+            self.on_deadlock(deadlocked, victims)
+        return deadlocked
+
+    def find_deadlocked(self) -> list:
+        """Deadlock detection over allocation and the requests of blocked callers. Must be called with the lock held.
+
+        This is the safety search with outstanding requests in place of need: processes that are not blocked
+        request nothing and always finish. Of those left over, only the ones holding resources are deadlocked.
+        """
+        requests = self.pending_requests()
+        _, sequence = self.is_sequence_state_safe(self.allocation, self.available, requests)
+        stuck = self.allocation.any(axis=1)
+        stuck[sequence] = False
+        return np.flatnonzero(stuck).tolist()
+
+    def pending_requests(self) -> np.ndarray:
+        requests = np.zeros_like(self.allocation)
+        for waiter in set().union(*self.waiters):
+            requests[waiter.num_process] += waiter.request
+        return requests
+
+    def preempt_cheapest(self, deadlocked) -> list:
+        """Preempts the deadlocked process holding the fewest units until no deadlock is left."""
+        victims = []
+        while deadlocked:
+            victim = deadlocked[int(np.argmin(self.allocation[deadlocked].sum(axis=1)))]
+            self.preempt(victim)
+            victims.append(victim)
+            deadlocked = self.find_deadlocked()
+        return victims
+
+    def preempt(self, num_process) -> None:
+        """Rolls num_process back to holding nothing and fails its blocked requests.
+
+        Must be called with the lock held.
+        """
+        released = self.allocation[num_process].copy()
+        self.record_release(num_process, released)
+        self.undo_delta(num_process, released)
+        self.log_release(num_process, released)
+        self.consume_leases(num_process, released)
+        self.fail_waiters_of(num_process)
+        self.wake_waiters(released)
+        self.count_decision("release", "preempted")
+
+    def fail_waiters_of(self, num_process) -> None:
+        """Makes every blocked request of num_process return False. Must be called with the lock held."""
+        for waiter in set().union(*self.waiters):
+            if waiter.num_process == num_process:
+                waiter.preempted = True
+                self.unpark(waiter)
+                waiter.condition.notify()
+
+    def release_resources(self, num_process, release_res, console_info):
+        release = np.asarray(release_res, dtype=np.int64)
+        self.lock.acquire()
+        try:
+            self.record_release(num_process, release)
+            released = self.release_is_valid(num_process, release)
+            if released:
+                # A release only grows the work vector ahead of num_process, so the cached sequence stays valid.
+                self.undo_delta(num_process, release)
+                self.log_release(num_process, release)
+                self.consume_leases(num_process, release)
+                if self.optimistic:
+                    self.publish_snapshot()
+                self.wake_waiters(release)
+            self.count_decision("release", "released" if released else "denied_invalid")
+        finally:
+            self.lock.release()
+        if released:
+            self.wait_durable()
+        time_stamp = perf_counter()
+        console_info.append([released, num_process, release_res, round(time_stamp - self.start, 4)])
+
+    def release_resources_batch(self, releases, console_info=None, clip=False) -> list:
+        """Applies a list of (num_process, release_res) pairs under a single lock acquisition.
+
+        Returns the release flags in the order of releases. With clip the releases are the vectors of leases being
+        reclaimed: each is cut down, under the lock, to what the process still holds, and then emptied in place, so
+        later releases are taken off the leases that remain instead.
+        """
+        vectors = [np.asarray(release_res, dtype=np.int64) for _, release_res in releases]
+        released = [False] * len(releases)
+        freed = np.zeros(self.len_resources, dtype=np.int64)
+
+        self.lock.acquire()
+        try:
+            for i, (num_process, _) in enumerate(releases):
+                if clip:
+                    vectors[i] = self.clip_lease(num_process, vectors[i])
+                self.record_release(num_process, vectors[i])
+                if self.release_is_valid(num_process, vectors[i]):
+                    self.undo_delta(num_process, vectors[i])
+                    self.log_release(num_process, vectors[i])
+                    if not clip:
+                        self.consume_leases(num_process, vectors[i])
+                    freed += vectors[i]
+                    released[i] = True
+                self.count_decision("release", "released" if released[i] else "denied_invalid")
+        finally:
+            if self.optimistic:
+                self.publish_snapshot()
+            self.wake_waiters(freed)
+            self.lock.release()
+        self.wait_durable()
+
+        if console_info is not None:
+            time_stamp = round(perf_counter() - self.start, 4)
+            for i, (num_process, release_res) in enumerate(releases):
+                shown = vectors[i].tolist() if clip else release_res
+                console_info.append([released[i], num_process, shown, time_stamp])
+        return released
+
+    def clip_lease(self, num_process, vector) -> np.ndarray:
+        """Returns what a lease being reclaimed still releases and empties it. Must be called with the lock held."""
+        release = np.minimum(vector, self.allocation[num_process])
+        vector[:] = 0
+        return release
+
+    def consume_leases(self, num_process, release) -> None:
+        """Takes a release that did not come from a lease off the leases of num_process. Must be called with the lock
+        held.
+        """
+        if self.leases is not None:
+            self.leases.consume(num_process, release)
+
+    def register_process(self, maximum_res) -> int:
+        """Adds a process that holds nothing yet and returns its id, reusing the slot of an unregistered one.
+
+        Raises ValueError if the maximum is all zeros or exceeds what the system owns, which could never be safe.
+        """
+        maximum_row = np.array(maximum_res, dtype=np.int64)
+        self.lock.acquire()
+        try:
+            if maximum_row.shape != (self.len_resources,) or (maximum_row < 0).any() or not maximum_row.any():
+                raise ValueError("a maximum must be non-negative, not all zeros and cover every resource type")
+            if (maximum_row > self.available + self.allocation.sum(axis=0)).any():
+                raise ValueError("the maximum exceeds what the system owns")
+
+            num_process = self.take_free_slot()
+            self.maximum[num_process] = maximum_row
+            self.need[num_process] = maximum_row
+            if self.dirty_rows is not None:
+                self.dirty_rows.add(num_process)
+            if self.fingerprint is not None:
+                self.update_fingerprint_need(num_process, maximum_row)
+            if self.safe_sequence is not None:
+                # The new process holds nothing, so it can finish last and the rest of the sequence stays valid.
+                position = self.sequence_position[num_process]
+                self.cache_safe_sequence(np.concatenate((self.safe_sequence[:position],
+                                                         self.safe_sequence[position + 1:], [num_process])))
+            self.log_register(num_process, maximum_row)
+            self.record_register(num_process, maximum_row)
+            if self.optimistic:
+                # Counts as a grant: a verdict checked against the slot's previous process must not commit.
+                self.publish_snapshot(grant=True)
+            self.count_decision("register", "registered")
+        finally:
+            self.lock.release()
+        self.wait_durable()
+        return num_process
+
+    def unregister_process(self, num_process, console_info=None) -> None:
+        """Removes a process, returning everything it holds and failing its blocked requests, and frees its slot."""
+        self.lock.acquire()
+        try:
+            if not self.is_registered(num_process):
+                raise ValueError(f"process {num_process} is not registered")
+
+            released = self.allocation[num_process].copy()
+            self.record_unregister(num_process, released)
+            # Like a release, this only grows the work vector, so the cached sequence stays valid.
+            self.undo_delta(num_process, released)
+            self.log_release(num_process, released)
+            if self.fingerprint is not None:
+                self.update_fingerprint_need(num_process, -self.need[num_process])
+            self.maximum[num_process] = 0
+            self.need[num_process] = 0
+            self.log_register(num_process, self.maximum[num_process])
+            if self.leases is not None:
+                # Under the lock, so no lease of this process can expire onto whoever registers into the slot next.
+                self.leases.cancel_process(num_process)
+            self.free_slots.append(num_process)
+            self.fail_waiters_of(num_process)
+            if self.optimistic:
+                self.publish_snapshot(grant=True)
+            self.wake_waiters(released)
+            self.count_decision("register", "unregistered")
+        finally:
+            self.lock.release()
+        self.wait_durable()
+        if console_info is not None:
+            console_info.append([True, num_process, released.tolist(), round(perf_counter() - self.start, 4)])
+
+    def is_registered(self, num_process) -> bool:
+        return 0 <= num_process < len(self.maximum) and bool(self.maximum[num_process].any())
+
+    def reset_free_slots(self) -> None:
+        """A slot whose maximum row is all zeros holds no process; lists them so the lowest is reused first."""
+        self.free_slots = np.flatnonzero(~self.maximum.any(axis=1))[::-1].tolist()
+
+    def take_free_slot(self) -> int:
+        """Pops a free slot, growing the state first if there is none. Must be called with the lock held."""
+        if not self.free_slots:
+            self.grow()
+        return self.free_slots.pop()
+
+    def reserve(self, num_processes) -> None:
+        """Grows the state to at least num_processes slots, so that many processes can register without a copy."""
+        self.lock.acquire()
+        try:
+            if num_processes > len(self.maximum):
+                self.grow(num_processes)
+                if self.optimistic:
+                    self.publish_snapshot()
+        finally:
+            self.lock.release()
+        self.wait_durable()
+
+    def grow(self, capacity=None) -> None:
+        """Doubles the number of process slots, or grows them to capacity. Must be called with the lock held.
+
+        Doubling means registering n processes copies the matrices O(log n) times.
+        """
+        num_processes = len(self.maximum)
+        if capacity is None:
+            capacity = num_processes + max(num_processes, MIN_CAPACITY_GROWTH)
+        self.bind_state(self.state.resized(capacity))
+        if self.wal is not None:
+            self.wal.log_configure(self.state)
+        self.record_resize(capacity)
+        if self.safe_sequence is not None:
+            # The new rows hold nothing and need nothing, so they can finish anywhere.
+            self.cache_safe_sequence(np.concatenate((self.safe_sequence, np.arange(num_processes, capacity))))
+        self.fingerprint = None
+        # Ahead of any slot already free, so the lowest free slot is still taken first.
+        self.free_slots[:0] = range(capacity - 1, num_processes - 1, -1)
+
+    def log_register(self, num_process, maximum_row) -> None:
+        if self.wal is not None:
+            self.wal.log_register(num_process, maximum_row)
+
+    def release_is_valid(self, num_process, release_res) -> bool:
+        return bool(np.all(release_res <= self.allocation[num_process]))
+
+    def configure(self, available=None, maximum=None, allocation=None) -> None:
+        """Replaces any of available, maximum and allocation, keeping the number of resource types."""
+        self.lock.acquire()
+        try:
+            available = self.available if available is None else np.array(available, dtype=np.int64)
+            maximum = self.maximum if maximum is None else np.array(maximum, dtype=np.int64)
+            allocation = self.allocation if allocation is None else np.array(allocation, dtype=np.int64)
+            if (available.shape != (self.len_resources,) or maximum.ndim != 2
+                    or maximum.shape != allocation.shape or maximum.shape[1] != self.len_resources):
+                raise ValueError("available, maximum and allocation do not describe the same resource types")
+
+            self.bind_state(SystemState.from_matrices(available, maximum, allocation))
+            if self.wal is not None:
+                self.wal.log_configure(self.state)
+            self.record_configure()
+            self.reset_free_slots()
+            self.invalidate_safe_sequence()
+            if self.optimistic:
+                self.publish_snapshot(grant=True)
+            self.wake_waiters(np.ones(self.len_resources, dtype=np.int64))
+        finally:
+            self.lock.release()
+        self.wait_durable()
+
+    def update_rows(self, maximum_rows=None, allocation_rows=None, available=None) -> None:
+        """Applies many row changes atomically, with one need recomputation and one safety check.
+
+        maximum_rows and allocation_rows are (processes, rows) pairs. Raises ValueError and leaves the state as it
+        was if the rows do not fit the matrices, give a process more than its maximum or leave the state unsafe.
+        """
+        self.lock.acquire()
+        try:
+            changes = []
+            for name, rows in (("maximum", maximum_rows), ("allocation", allocation_rows)):
+                if rows is None:
+                    continue
+                processes = np.asarray(rows[0], dtype=np.intp)
+                values = np.asarray(rows[1], dtype=np.int64)
+                if (values.shape != (len(processes), self.len_resources) or (values < 0).any()
+                        or ((processes < 0) | (processes >= len(self.maximum))).any()):
+                    raise ValueError(f"{name} rows do not match the processes and resource types")
+                changes.append((name, processes, values))
+            if available is not None:
+                available = np.asarray(available, dtype=np.int64)
+                if available.shape != (self.len_resources,) or (available < 0).any():
+                    raise ValueError("available does not match the resource types")
+
+            saved = [(name, processes, getattr(self, name)[processes]) for name, processes, _ in changes]
+            saved_available = self.available.copy()
+            for name, processes, values in changes:
+                getattr(self, name)[processes] = values
+            if available is not None:
+                self.available[:] = available
+            touched = np.unique(np.concatenate([processes for _, processes, _ in changes] or [[]])).astype(np.intp)
+            self.need[touched] = self.maximum[touched] - self.allocation[touched]
+
+            error = None
+            if (self.need[touched] < 0).any():
+                error = "an allocation exceeds the maximum of its process"
+            else:
+                safe, sequence = self.is_sequence_state_safe(self.allocation, self.available, self.need)
+                if not safe:
+                    error = "the update leaves the state unsafe"
+            if error is not None:
+                for name, processes, values in reversed(saved):
+                    getattr(self, name)[processes] = values
+                self.available[:] = saved_available
+                self.need[touched] = self.maximum[touched] - self.allocation[touched]
+                raise ValueError(error)
+
+            if self.wal is not None:
+                self.wal.log_configure(self.state)
+            self.record_configure()
+            if maximum_rows is not None:
+                self.reset_free_slots()
+            self.invalidate_safe_sequence()
+            self.cache_safe_sequence(sequence)
+            if self.optimistic:
+                self.snapshot_base = None
+                self.publish_snapshot(grant=True)
+            self.wake_waiters(np.ones(self.len_resources, dtype=np.int64))
+        finally:
+            self.lock.release()
+        self.wait_durable()
+
+    def export_state(self) -> dict:
+        self.lock.acquire()
+        try:
+            return {
+                "available": self.available.tolist(),
+                "maximum": self.maximum.tolist(),
+                "allocation": self.allocation.tolist(),
+                "need": self.need.tolist(),
+            }
+        finally:
+            self.lock.release()
+
+    def return_str_current_state_of_system(self) -> str:
+        str_info = ""
+        str_info += f"Available resources:\n {self.available.tolist()}"
+        str_info += f"\n\nCurrent allocation"
+
+        for i in range(len(self.allocation)):
+            str_info += f"\nProcess {i}: {self.allocation[i].tolist()}"
+
+        str_info += f"\n\nMaximum allocation"
+
+        for i in range(len(self.maximum)):
+            str_info += f"\nProcess {i}: {self.maximum[i].tolist()}"
+
+        return str_info
@@ -0,0 +1 @@
+"""Benchmarks for the Banker's algorithm allocator. Run with ``python -m benchmarks.run``."""
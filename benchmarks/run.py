@@ -0,0 +1,173 @@
+"""Measures throughput, latency, safety-check time and lock wait of BankersAlgorithm on synthetic workloads.
+
+Example::
+
+    python -m benchmarks.run --processes 10000 --resources 64 --threads 1 4 --output results.json
+"""
+import argparse
+import json
+import platform
+import threading
+from time import perf_counter, perf_counter_ns
+
+import numpy as np
+
+from bankers_algorithm import AVOIDANCE, DETECTION, BankersAlgorithm
+from benchmarks.workload import generate_operations, generate_system
+
+
+class ThreadTotals(threading.local):
+    def __init__(self):
+        self.safety_ns = 0
+        self.full_searches = 0
+        self.lock_wait_ns = 0
+
+
+class TimedBankersAlgorithm(BankersAlgorithm):
+    """Adds the time spent deciding whether a request is safe to the calling thread's totals.
+
+    That covers validating the cached sequence as well as the full searches, which are also counted.
+    """
+
+    def __init__(self, totals: ThreadTotals, *args, **kwargs):
+        self.totals = totals
+        super().__init__(*args, **kwargs)
+        self.lock = TimedLock(totals)
+
+    def state_is_safe_after_request(self, num_process) -> bool:
+        start = perf_counter_ns()
+        safe = super().state_is_safe_after_request(num_process)
+        self.totals.safety_ns += perf_counter_ns() - start
+        return safe
+
+    def check_request_on_snapshot(self, snapshot, num_process, request) -> tuple:
+        start = perf_counter_ns()
+        result = super().check_request_on_snapshot(snapshot, num_process, request)
+        self.totals.safety_ns += perf_counter_ns() - start
+        return result
+
+    def is_sequence_state_safe(self, allocation, available, need) -> tuple:
+        self.totals.full_searches += 1
+        return super().is_sequence_state_safe(allocation, available, need)
+
+
+class TimedLock:
+    """Drop-in for the engine lock that adds the time spent waiting in acquire to the calling thread's totals."""
+
+    def __init__(self, totals: ThreadTotals):
+        self.inner = threading.Lock()
+        self.totals = totals
+
+    def acquire(self, blocking=True, timeout=-1) -> bool:
+        start = perf_counter_ns()
+        acquired = self.inner.acquire(blocking, timeout)
+        self.totals.lock_wait_ns += perf_counter_ns() - start
+        return acquired
+
+    def release(self) -> None:
+        self.inner.release()
+
+    __enter__ = acquire
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+def percentile_us(latencies_ns: np.ndarray, q: float) -> float:
+    return round(float(np.percentile(latencies_ns, q)) / 1000, 2) if latencies_ns.size else 0.0
+
+
+def run_operations(system: dict, operations: list, threads: int, optimistic: bool, policy: str) -> dict:
+    totals = ThreadTotals()
+    system_management = TimedBankersAlgorithm(totals, system["available"], system["maximum"], system["allocation"],
+                                              optimistic=optimistic, policy=policy)
+
+    results = []
+    barrier = threading.Barrier(threads)
+
+    def worker(chunk: list) -> None:
+        latencies = np.empty(len(chunk), dtype=np.int64)
+        console_info = []
+        barrier.wait()
+        for i, (op, num_process, vector) in enumerate(chunk):
+            start = perf_counter_ns()
+            if op == "request":
+                system_management.request_resources(num_process, vector, console_info)
+            else:
+                system_management.release_resources(num_process, vector, console_info)
+            latencies[i] = perf_counter_ns() - start
+        results.append((latencies, sum(1 for entry in console_info if entry[0]), totals.safety_ns,
+                        totals.full_searches, totals.lock_wait_ns))
+
+    workers = [threading.Thread(target=worker, args=(operations[i::threads],)) for i in range(threads)]
+    start = perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    elapsed = perf_counter() - start
+
+    latencies = np.concatenate([result[0] for result in results])
+    return {
+        "threads": threads,
+        "operations": len(operations),
+        "seconds": round(elapsed, 6),
+        "operations_per_second": round(len(operations) / elapsed, 1),
+        "p50_us": percentile_us(latencies, 50),
+        "p99_us": percentile_us(latencies, 99),
+        "succeeded": sum(result[1] for result in results),
+        "safety_check_seconds": round(sum(result[2] for result in results) / 1e9, 6),
+        "full_searches": sum(result[3] for result in results),
+        "lock_wait_seconds": round(sum(result[4] for result in results) / 1e9, 6),
+    }
+
+
+def run_safety_checks(system: dict, repeats: int) -> dict:
+    """Times full safety checks on the initial state, without any request or lock around them."""
+    system_management = BankersAlgorithm(system["available"], system["maximum"], system["allocation"])
+    latencies = np.empty(repeats, dtype=np.int64)
+    for i in range(repeats):
+        start = perf_counter_ns()
+        system_management.is_sequence_state_safe(system_management.allocation, system_management.available,
+                                                 system_management.need)
+        latencies[i] = perf_counter_ns() - start
+    return {"repeats": repeats, "p50_us": percentile_us(latencies, 50), "p99_us": percentile_us(latencies, 99)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark BankersAlgorithm on a synthetic workload.")
+    parser.add_argument("--processes", type=int, default=1000)
+    parser.add_argument("--resources", type=int, default=16)
+    parser.add_argument("--contention", type=float, default=0.5)
+    parser.add_argument("--max-units", type=int, default=10)
+    parser.add_argument("--request-ratio", type=float, default=0.6, help="share of requests among operations")
+    parser.add_argument("--request-scale", type=float, default=0.25, help="largest vector as a share of maximum")
+    parser.add_argument("--operations", type=int, default=20000)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--safety-repeats", type=int, default=100)
+    parser.add_argument("--optimistic", action="store_true", help="use the optimistic concurrency mode")
+    parser.add_argument("--policy", choices=[AVOIDANCE, DETECTION], default=AVOIDANCE,
+                        help="check safety on every request, or grant what fits and detect deadlocks afterwards")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON results to this file instead of stdout")
+    args = parser.parse_args()
+
+    system = generate_system(args.processes, args.resources, args.contention, args.max_units, args.seed)
+    operations = generate_operations(system, args.operations, args.request_ratio, args.request_scale, args.seed)
+
+    report = {
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        "platform": {"python": platform.python_version(), "numpy": np.__version__, "machine": platform.machine()},
+        "safety_check": run_safety_checks(system, args.safety_repeats),
+        "runs": [run_operations(system, operations, threads, args.optimistic, args.policy) for threads in args.threads],
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
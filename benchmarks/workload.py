@@ -0,0 +1,34 @@
+"""Seeded synthetic systems and operation streams for the allocator benchmarks."""
+import numpy as np
+
+
+def generate_system(num_processes: int, num_resources: int, contention: float = 0.5, max_units: int = 10,
+                    seed: int = 0) -> dict:
+    """Returns available, maximum and allocation for a random safe state.
+
+    contention goes from 0 (enough available for every outstanding need at once) towards 1 (just enough for the
+    largest single need of each resource type, which still keeps the state safe).
+    """
+    rng = np.random.default_rng(seed)
+    maximum = rng.integers(0, max_units + 1, (num_processes, num_resources))
+    allocation = (maximum * rng.uniform(0, 0.5, (num_processes, num_resources))).astype(np.int64)
+    need = maximum - allocation
+    available = np.maximum(need.max(axis=0), np.round((1 - contention) * need.sum(axis=0))).astype(np.int64)
+    return {"available": available.tolist(), "maximum": maximum.tolist(), "allocation": allocation.tolist()}
+
+
+def generate_operations(system: dict, count: int, request_ratio: float = 0.6, request_scale: float = 0.25,
+                        seed: int = 0) -> list:
+    """Returns count ("request" | "release", num_process, vector) tuples.
+
+    Vectors are drawn up to request_scale of the process's maximum, so some of them will be invalid or unsafe
+    against the state they end up hitting, like real traffic.
+    """
+    rng = np.random.default_rng(seed)
+    maximum = np.asarray(system["maximum"], dtype=np.int64)
+    processes = rng.integers(0, len(maximum), count)
+    is_request = rng.random(count) < request_ratio
+    scales = rng.uniform(0, request_scale, (count, maximum.shape[1]))
+    vectors = np.ceil(maximum[processes] * scales).astype(np.int64)
+    return [("request" if is_request[i] else "release", int(processes[i]), vectors[i].tolist())
+            for i in range(count)]
@@ -0,0 +1,96 @@
+"""Blocking client for the JSON-lines allocator served by server.py."""
+import json
+import socket
+
+
+class AllocatorError(RuntimeError):
+    pass
+
+
+class AllocatorClient:
+    def __init__(self, host="127.0.0.1", port=8765, unix_path=None):
+        if unix_path:
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.connect(unix_path)
+        else:
+            self.sock = socket.create_connection((host, port))
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.file = self.sock.makefile("rwb")
+        self.next_id = 0
+
+    def pipeline(self, messages: list) -> list:
+        """Sends all messages in one write and returns their responses in the same order."""
+        payload = []
+        for message in messages:
+            self.next_id += 1
+            payload.append(json.dumps({**message, "id": self.next_id}).encode() + b"\n")
+        self.file.write(b"".join(payload))
+        self.file.flush()
+
+        responses = []
+        for _ in messages:
+            line = self.file.readline()
+            if not line:
+                raise AllocatorError("connection closed by the server")
+            responses.append(json.loads(line))
+        return responses
+
+    def call(self, message: dict) -> dict:
+        response = self.pipeline([message])[0]
+        if not response["ok"]:
+            raise AllocatorError(response["error"])
+        return response
+
+    def request(self, num_process: int, resources: list) -> bool:
+        return self.call({"op": "request", "process": num_process, "resources": resources})["granted"]
+
+    def request_lease(self, num_process: int, resources: list, ttl: float):
+        """Requests resources that are released again after ttl seconds unless renewed; the lease id, or None."""
+        return self.call({"op": "request", "process": num_process, "resources": resources, "ttl": ttl}).get("lease")
+
+    def renew(self, lease: int, ttl: float) -> bool:
+        return self.call({"op": "renew", "lease": lease, "ttl": ttl})["renewed"]
+
+    def release_lease(self, lease: int) -> bool:
+        return self.call({"op": "release_lease", "lease": lease})["released"]
+
+    def release(self, num_process: int, resources: list) -> bool:
+        return self.call({"op": "release", "process": num_process, "resources": resources})["released"]
+
+    def register(self, maximum: list) -> int:
+        """Adds a process with the given maximum and returns its number."""
+        return self.call({"op": "register", "maximum": maximum})["process"]
+
+    def unregister(self, num_process: int) -> None:
+        """Removes a process; everything it holds is released."""
+        self.call({"op": "unregister", "process": num_process})
+
+    def query(self) -> dict:
+        return self.call({"op": "query"})["state"]
+
+    def max_request(self, num_process=None):
+        """Largest request that would be granted for num_process, or one per process if num_process is None."""
+        if num_process is None:
+            return self.call({"op": "max_request"})["requests"]
+        return self.call({"op": "max_request", "process": num_process})["request"]
+
+    def evaluate(self, requests: list) -> list:
+        """Whether each (num_process, resources) pair would be granted now, without changing any state."""
+        return self.call({"op": "evaluate", "requests": [list(request) for request in requests]})["safe"]
+
+    def configure(self, available=None, maximum=None, allocation=None) -> None:
+        message = {"op": "configure"}
+        for key, value in (("available", available), ("maximum", maximum), ("allocation", allocation)):
+            if value is not None:
+                message[key] = value
+        self.call(message)
+
+    def close(self) -> None:
+        self.file.close()
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
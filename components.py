@@ -0,0 +1,479 @@
+"""BankersAlgorithm that splits the system into independent components with their own locks and safety checks.
+
+Two processes are dependent only if some resource type appears in both of their maximums, so the resource types
+fall into connected components and every process belongs to exactly one of them. A process with an all-zero
+maximum forms a component of its own. The system is safe exactly when each component is safe on its own columns,
+so a request only has to lock and check the component of the process making it, and requests in different
+components proceed in parallel.
+"""
+import threading
+from time import perf_counter
+
+import numpy as np
+
+from bankers_algorithm import BankersAlgorithm, StateSnapshot, SystemState, VectorizedSafetyEngine
+from metrics import InstrumentedLock
+
+
+def find_component_sequence(allocation, available, need) -> tuple:
+    """Runs the safety check for one component; defined at module level so a process pool can pickle it."""
+    return VectorizedSafetyEngine().find_safe_sequence(allocation, available, need)
+
+
+class Component:
+    """Processes and resource types that no process outside the component can touch.
+
+    safe_sequence holds process numbers and sequence_position is indexed by the position of a process in
+    processes.
+    """
+
+    def __init__(self, processes, resources, lock):
+        self.processes = processes
+        self.resources = resources
+        self.lock = lock
+        self.retired = False
+        self.safe_sequence = None
+        self.sequence_position = None
+
+    def cache_safe_sequence(self, local_sequence) -> None:
+        local_sequence = np.asarray(local_sequence, dtype=np.intp)
+        self.safe_sequence = self.processes[local_sequence]
+        self.sequence_position = np.empty(len(local_sequence), dtype=np.intp)
+        self.sequence_position[local_sequence] = np.arange(len(local_sequence))
+
+
+class ComponentBankersAlgorithm(BankersAlgorithm):
+    """BankersAlgorithm with one lock and one cached safe sequence per independent component.
+
+    Components are merged incrementally when a maximum grows into new resource types and rebuilt when one shrinks.
+    Pass a concurrent.futures executor, such as a ProcessPoolExecutor, to run whole-system checks with one task
+    per component. Blocking requests and the optimistic mode rely on the single engine lock and are not supported.
+    """
+
+    def __init__(self, available, maximum, allocation, safety_engine=None, max_retries=8, metrics=None, wal=None,
+                 executor=None):
+        self.init_engine(SystemState.from_matrices(available, maximum, allocation), safety_engine, False, max_retries,
+                         metrics, wal, executor)
+
+    def init_engine(self, state, safety_engine=None, optimistic=False, max_retries=8, metrics=None, wal=None,
+                    executor=None):
+        if optimistic:
+            raise ValueError("the optimistic mode is not supported with per-component locks")
+        super().init_engine(state, safety_engine, False, max_retries, metrics, wal)
+        self.executor = executor
+        # Taken before any component lock by everything that changes which components exist.
+        self.structure_lock = threading.Lock()
+        # Component ids are never reused, so a stale id read without a lock is simply missing from components.
+        self.next_component_id = 0
+        self.components = {}
+        self.build_components()
+
+    def new_component_lock(self):
+        return threading.Lock() if self.metrics is None else InstrumentedLock(self.metrics)
+
+    def build_components(self) -> None:
+        """Recomputes the components from scratch with a union-find over resource types.
+
+        The new mapping is published only once it is complete, so threads racing with a rebuild retry on it.
+        """
+        num_processes, num_resources = self.maximum.shape
+        parent = list(range(num_resources))
+
+        def find(x):
+            while parent[x] != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+
+        uses = self.maximum > 0
+        for row in uses:
+            columns = np.flatnonzero(row).tolist()
+            for column in columns[1:]:
+                parent[find(column)] = find(columns[0])
+
+        roots = np.array([find(column) for column in range(num_resources)], dtype=np.intp)
+        has_resources = uses.any(axis=1)
+        # Processes without resource types get keys past the last root, one each.
+        process_root = np.where(has_resources, roots[uses.argmax(axis=1)] if num_resources else 0,
+                                num_resources + np.arange(num_processes))
+
+        components = {}
+        component_of = np.empty(num_processes, dtype=np.intp)
+        local_index = np.empty(num_processes, dtype=np.intp)
+        component_of_resource = np.full(num_resources, -1, dtype=np.intp)
+        order = np.argsort(process_root, kind="stable")
+        _, starts = np.unique(process_root[order], return_index=True)
+        for processes in np.split(order, starts[1:]) if num_processes else []:
+            key = process_root[processes[0]]
+            resources = np.flatnonzero(roots == key) if key < num_resources else np.empty(0, dtype=np.intp)
+            component_id = self.next_component_id
+            self.next_component_id += 1
+            components[component_id] = Component(processes, resources, self.new_component_lock())
+            component_of[processes] = component_id
+            local_index[processes] = np.arange(len(processes))
+            component_of_resource[resources] = component_id
+
+        for component in self.components.values():
+            component.retired = True
+        self.local_index = local_index
+        self.component_of_resource = component_of_resource
+        self.components = components
+        self.component_of = component_of
+
+    def merge_components(self, num_process, columns) -> None:
+        """Merges the component of num_process with every component that owns one of columns.
+
+        Must be called with the structure lock and every component lock held.
+        """
+        component_ids = {int(self.component_of[num_process])}
+        component_ids.update(int(c) for c in self.component_of_resource[columns] if c >= 0)
+        owned = self.components[int(self.component_of[num_process])].resources
+        if len(component_ids) == 1 and np.isin(columns, owned).all():
+            return
+
+        merged = [self.components.pop(component_id) for component_id in sorted(component_ids)]
+        processes = np.concatenate([component.processes for component in merged])
+        resources = np.union1d(np.concatenate([component.resources for component in merged]), columns)
+        for component in merged:
+            component.retired = True
+
+        component_id = self.next_component_id
+        self.next_component_id += 1
+        self.local_index[processes] = np.arange(len(processes))
+        self.component_of_resource[resources] = component_id
+        self.components[component_id] = Component(processes, resources.astype(np.intp), self.new_component_lock())
+        self.component_of[processes] = component_id
+
+    def add_component(self, processes, resources) -> None:
+        """Publishes a new component. Must be called with the structure lock and every component lock held."""
+        component_id = self.next_component_id
+        self.next_component_id += 1
+        self.local_index[processes] = np.arange(len(processes))
+        self.component_of_resource[resources] = component_id
+        self.components[component_id] = Component(processes, resources, self.new_component_lock())
+        self.component_of[processes] = component_id
+
+    def detach_process(self, num_process) -> None:
+        """Moves a process that no longer uses any resource type into a component of its own.
+
+        The rest of its component keeps its resource types together even if they could now be split; that is only
+        coarser, never wrong, and the next rebuild splits them. Must be called with the structure lock and every
+        component lock held.
+        """
+        component = self.components.pop(int(self.component_of[num_process]))
+        component.retired = True
+        rest = component.processes[component.processes != num_process]
+        if len(rest):
+            self.add_component(rest, component.resources)
+        else:
+            self.component_of_resource[component.resources] = -1
+        self.add_component(np.array([num_process], dtype=np.intp), np.empty(0, dtype=np.intp))
+
+    def lock_component_of(self, num_process) -> Component:
+        """Acquires and returns the current component of num_process."""
+        while True:
+            component = self.components.get(int(self.component_of[num_process]))
+            if component is None:
+                # A rebuild is being published; wait for it instead of spinning.
+                with self.structure_lock:
+                    continue
+            component.lock.acquire()
+            if not component.retired:
+                return component
+            component.lock.release()
+
+    def lock_all_components(self) -> list:
+        """Acquires every component lock in id order. Must be called with the structure lock held."""
+        locked = [self.components[component_id] for component_id in sorted(self.components)]
+        for component in locked:
+            component.lock.acquire()
+        return locked
+
+    @staticmethod
+    def release_components(locked) -> None:
+        for component in reversed(locked):
+            component.lock.release()
+
+    def request_resources(self, num_process, request_res, console_info, wait=False, timeout=None, ttl=None):
+        if wait:
+            raise ValueError("blocking requests are not supported with per-component locks")
+        request = np.asarray(request_res, dtype=np.int64)
+        if ttl is not None:
+            self.lease_manager()
+        granted = self.grant_in_component(num_process, request, ttl)
+        self.wait_durable()
+        time_stamp = perf_counter()
+        console_info.append([bool(granted), num_process, request_res, round(time_stamp - self.start, 4)])
+        if granted and ttl is not None:
+            return granted
+        return None
+
+    def request_resources_batch(self, requests, maximize_grants=False, console_info=None, ttls=None) -> list:
+        """Evaluates a list of (num_process, request_res) pairs, each under the lock of its own component."""
+        vectors = [np.asarray(request_res, dtype=np.int64) for _, request_res in requests]
+        granted = [False] * len(requests)
+        if ttls is None:
+            ttls = [None] * len(requests)
+        elif any(ttl is not None for ttl in ttls):
+            self.lease_manager()
+        order = self.admission_order(vectors) if maximize_grants else range(len(requests))
+        for i in order:
+            granted[i] = self.grant_in_component(requests[i][0], vectors[i], ttls[i])
+        self.wait_durable()
+
+        if console_info is not None:
+            time_stamp = round(perf_counter() - self.start, 4)
+            for i in order:
+                console_info.append([bool(granted[i]), requests[i][0], requests[i][1], time_stamp])
+        return granted
+
+    def grant_in_component(self, num_process, request, ttl=None):
+        """Returns what start_lease does for a granted request and False otherwise.
+
+        Unregistering takes every component lock, so leasing under this one keeps the slot with num_process.
+        """
+        component = self.lock_component_of(num_process)
+        try:
+            # Components never share a resource type, so recording under the component lock keeps every order
+            # that matters.
+            self.record_request(num_process, request)
+            if not (self.request_is_valid(num_process, request) and self.within_component(component, request)):
+                self.count_decision("request", "denied_invalid")
+                return False
+
+            self.apply_component_delta(component, num_process, request)
+            if self.component_is_safe_after_request(component, num_process):
+                self.log_grant(num_process, request)
+                self.count_decision("request", "granted")
+                return self.start_lease(num_process, request, ttl)
+
+            self.undo_component_delta(component, num_process, request)
+            self.count_decision("request", "denied_unsafe")
+            return False
+        finally:
+            component.lock.release()
+
+    @staticmethod
+    def within_component(component, delta) -> bool:
+        return np.count_nonzero(delta) == np.count_nonzero(delta[component.resources])
+
+    def apply_component_delta(self, component, num_process, delta) -> None:
+        """Like apply_delta, but only writes the columns of the component, which other threads never touch."""
+        columns = component.resources
+        self.allocation[num_process, columns] += delta[columns]
+        self.need[num_process, columns] -= delta[columns]
+        self.available[columns] -= delta[columns]
+
+    def undo_component_delta(self, component, num_process, delta) -> None:
+        columns = component.resources
+        self.allocation[num_process, columns] -= delta[columns]
+        self.need[num_process, columns] += delta[columns]
+        self.available[columns] += delta[columns]
+
+    def component_is_safe_after_request(self, component, num_process) -> bool:
+        start = perf_counter()
+        if component.safe_sequence is not None and self.component_sequence_still_valid(component, num_process):
+            safe = True
+        else:
+            safe, sequence = self.is_sequence_state_safe(*self.component_matrices(component))
+            if safe:
+                component.cache_safe_sequence(sequence)
+        self.observe_safety_check(start)
+        return safe
+
+    def component_sequence_still_valid(self, component, num_process) -> bool:
+        # Rows of the prefix are zero outside the component, so checking them on full rows is exact.
+        prefix = component.safe_sequence[:component.sequence_position[self.local_index[num_process]]]
+        return self.prefix_is_safe(prefix, self.allocation, self.available, self.need)
+
+    def component_matrices(self, component) -> tuple:
+        rows = np.ix_(component.processes, component.resources)
+        return self.allocation[rows], self.available[component.resources], self.need[rows]
+
+    def release_resources(self, num_process, release_res, console_info):
+        release = np.asarray(release_res, dtype=np.int64)
+        released = self.release_in_component(num_process, release) is not None
+        self.wait_durable()
+        time_stamp = perf_counter()
+        console_info.append([released, num_process, release_res, round(time_stamp - self.start, 4)])
+
+    def release_resources_batch(self, releases, console_info=None, clip=False) -> list:
+        """Applies a list of (num_process, release_res) pairs, each under the lock of its own component."""
+        applied = [self.release_in_component(num_process, np.asarray(release_res, dtype=np.int64), clip)
+                   for num_process, release_res in releases]
+        released = [vector is not None for vector in applied]
+        self.wait_durable()
+
+        if console_info is not None:
+            time_stamp = round(perf_counter() - self.start, 4)
+            for i, (num_process, release_res) in enumerate(releases):
+                shown = applied[i].tolist() if clip and released[i] else release_res
+                console_info.append([released[i], num_process, shown, time_stamp])
+        return released
+
+    def release_in_component(self, num_process, release, clip=False):
+        """Returns the vector released, or None if refused. With clip, release is a lease being reclaimed."""
+        component = self.lock_component_of(num_process)
+        try:
+            if clip:
+                release = self.clip_lease(num_process, release)
+            self.record_release(num_process, release)
+            if not (self.release_is_valid(num_process, release) and self.within_component(component, release)):
+                self.count_decision("release", "denied_invalid")
+                return None
+
+            # A release only grows the work vector ahead of num_process, so the cached sequence stays valid.
+            self.undo_component_delta(component, num_process, release)
+            self.log_release(num_process, release)
+            if not clip:
+                self.consume_leases(num_process, release)
+            self.count_decision("release", "released")
+            return release
+        finally:
+            component.lock.release()
+
+    def check_components(self) -> bool:
+        """Runs a full safety check of every component, caching the sequences it finds.
+
+        The checks are spread over the executor given at construction when there is one.
+        """
+        with self.structure_lock:
+            locked = self.lock_all_components()
+            try:
+                return self.check_locked_components(locked)
+            finally:
+                self.release_components(locked)
+
+    def check_locked_components(self, components) -> bool:
+        # Components without resource types are always safe, and there can be one per process.
+        components = [component for component in components if component.resources.size]
+        matrices = [self.component_matrices(component) for component in components]
+        if self.executor is not None and len(components) > 1:
+            chunksize = max(1, len(components) // 64)
+            results = self.executor.map(find_component_sequence, *zip(*matrices), chunksize=chunksize)
+        else:
+            results = (self.is_sequence_state_safe(*component_matrices) for component_matrices in matrices)
+
+        all_safe = True
+        for component, (safe, sequence) in zip(components, results):
+            if safe:
+                component.cache_safe_sequence(sequence)
+            all_safe = all_safe and safe
+        return all_safe
+
+    def set_maximum(self, num_process, maximum_res) -> None:
+        """Replaces the maximum of one process, updating its need and the components incrementally."""
+        maximum_row = np.asarray(maximum_res, dtype=np.int64)
+        with self.structure_lock:
+            locked = self.lock_all_components()
+            self.lock.acquire()
+            try:
+                if maximum_row.shape != (self.len_resources,) or (maximum_row < self.allocation[num_process]).any():
+                    raise ValueError("the maximum must cover every resource type and the current allocation")
+
+                shrinks = bool((self.maximum[num_process] > 0)[maximum_row == 0].any())
+                if self.maximum[num_process].any() != maximum_row.any():
+                    # Zeroing a maximum frees the slot and filling in a free one takes it.
+                    if maximum_row.any():
+                        self.free_slots.remove(num_process)
+                    else:
+                        self.free_slots.append(num_process)
+                self.maximum[num_process] = maximum_row
+                np.subtract(maximum_row, self.allocation[num_process], out=self.need[num_process])
+                if self.wal is not None:
+                    self.wal.log_configure(self.state)
+                self.record_configure()
+                if shrinks:
+                    # Dropping a resource type can split a component, which union-find cannot undo.
+                    self.build_components()
+                else:
+                    self.merge_components(num_process, np.flatnonzero(maximum_row))
+                    self.components[int(self.component_of[num_process])].safe_sequence = None
+            finally:
+                self.lock.release()
+                self.release_components(locked)
+        self.wait_durable()
+
+    def register_process(self, maximum_res) -> int:
+        """Registers the process under every component lock, then merges it into the components it uses."""
+        with self.structure_lock:
+            locked = self.lock_all_components()
+            try:
+                num_process = super().register_process(maximum_res)
+                self.invalidate_safe_sequence()
+                self.merge_components(num_process, np.flatnonzero(self.maximum[num_process]))
+                self.components[int(self.component_of[num_process])].safe_sequence = None
+            finally:
+                self.release_components(locked)
+        return num_process
+
+    def unregister_process(self, num_process, console_info=None) -> None:
+        with self.structure_lock:
+            locked = self.lock_all_components()
+            try:
+                super().unregister_process(num_process, console_info)
+                self.detach_process(num_process)
+            finally:
+                self.release_components(locked)
+
+    def reserve(self, num_processes) -> None:
+        with self.structure_lock:
+            locked = self.lock_all_components()
+            try:
+                super().reserve(num_processes)
+            finally:
+                self.release_components(locked)
+
+    def grow(self, capacity=None) -> None:
+        """Also gives every new slot a component of its own. Must be called with every component lock held."""
+        num_processes = len(self.maximum)
+        super().grow(capacity)
+        added = len(self.maximum) - num_processes
+        self.component_of = np.concatenate((self.component_of, np.empty(added, dtype=np.intp)))
+        self.local_index = np.concatenate((self.local_index, np.empty(added, dtype=np.intp)))
+        for num_process in range(num_processes, len(self.maximum)):
+            self.add_component(np.array([num_process], dtype=np.intp), np.empty(0, dtype=np.intp))
+
+    def configure(self, available=None, maximum=None, allocation=None) -> None:
+        with self.structure_lock:
+            locked = self.lock_all_components()
+            try:
+                super().configure(available, maximum, allocation)
+                self.build_components()
+                if self.executor is not None:
+                    fresh = self.lock_all_components()
+                    try:
+                        self.check_locked_components(fresh)
+                    finally:
+                        self.release_components(fresh)
+            finally:
+                self.release_components(locked)
+
+    def take_snapshot(self):
+        """Copies the state under every component lock; the snapshot carries no system-wide safe sequence."""
+        with self.structure_lock:
+            locked = self.lock_all_components()
+            try:
+                snapshot = super().take_snapshot()
+            finally:
+                self.release_components(locked)
+        return StateSnapshot(snapshot.version, snapshot.available, snapshot.allocation, snapshot.need, None, None)
+
+    def update_rows(self, maximum_rows=None, allocation_rows=None, available=None) -> None:
+        with self.structure_lock:
+            locked = self.lock_all_components()
+            try:
+                super().update_rows(maximum_rows, allocation_rows, available)
+                # Component grants never maintain the system-wide sequence update_rows cached.
+                self.invalidate_safe_sequence()
+                self.build_components()
+            finally:
+                self.release_components(locked)
+
+    def export_state(self) -> dict:
+        with self.structure_lock:
+            locked = self.lock_all_components()
+            try:
+                return super().export_state()
+            finally:
+                self.release_components(locked)
@@ -0,0 +1,223 @@
+"""Bulk loading of configurations from CSV, JSON lines or .npy files.
+
+CSV files hold one row per line, ``matrix,process,v0,...,v(m-1)``, where matrix is maximum or allocation, or
+available with an empty process. JSON-lines files hold one object per line, either a row like
+``{"matrix": "maximum", "process": 3, "values": [...]}`` or whole matrices keyed by available, maximum and
+allocation, as returned by BankersAlgorithm.export_state. A directory is read as available.npy, maximum.npy and
+allocation.npy, whichever exist, memory-mapped rather than read.
+
+Files only have to list the rows that change. apply_update applies them with BankersAlgorithm.update_rows, or with
+configure when they describe a whole system of a different size.
+"""
+import argparse
+import json
+import os
+from array import array
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+from bankers_algorithm import BankersAlgorithm, VectorizedSafetyEngine
+
+ROW_MATRICES = ("maximum", "allocation")
+# CSV rows are parsed in chunks of this many lines by one NumPy call per chunk.
+CHUNK_ROWS = 65536
+
+
+class BulkUpdate(NamedTuple):
+    """available, plus (processes, rows) pairs for maximum and allocation; None for whatever is unchanged."""
+    available: Optional[np.ndarray]
+    maximum: Optional[tuple]
+    allocation: Optional[tuple]
+
+    def is_complete(self) -> bool:
+        """True if the update describes a whole system: available and every row of both matrices, in order."""
+        if self.available is None or self.maximum is None or self.allocation is None:
+            return False
+        expected = np.arange(len(self.maximum[0]))
+        return (np.array_equal(self.maximum[0], expected) and np.array_equal(self.allocation[0], expected)
+                and len(self.maximum[1]) == len(self.allocation[1]))
+
+
+class BulkUpdateBuilder:
+    """Collects rows into flat int64 arrays while a file is streamed, so no per-row objects are kept."""
+
+    def __init__(self):
+        self.available = None
+        self.width = None
+        self.processes = {name: array("q") for name in ROW_MATRICES}
+        self.values = {name: array("q") for name in ROW_MATRICES}
+        self.matrices = {}
+
+    def check_width(self, width: int) -> None:
+        if self.width is None:
+            self.width = width
+        elif width != self.width:
+            raise ValueError(f"expected {self.width} resource types, got {width}")
+
+    def add_row(self, matrix: str, num_process, values) -> None:
+        if matrix == "available":
+            self.set_available(values)
+            return
+        if matrix not in ROW_MATRICES:
+            raise ValueError(f"unknown matrix {matrix!r}")
+        start = len(self.values[matrix])
+        self.values[matrix].extend(values)
+        self.check_width(len(self.values[matrix]) - start)
+        self.processes[matrix].append(int(num_process))
+
+    def add_text_rows(self, matrix: str, processes: list, text_rows: list) -> None:
+        """Adds rows given as comma-separated values, parsing all of them at once."""
+        if matrix not in ROW_MATRICES:
+            raise ValueError(f"unknown matrix {matrix!r}")
+        self.check_width(text_rows[0].count(",") + 1)
+        if not all(row.count(",") == self.width - 1 for row in text_rows):
+            raise ValueError(f"every {matrix} row must hold {self.width} integers")
+        values = np.fromstring(",".join(text_rows), dtype=np.int64, sep=",")
+        if values.size != len(text_rows) * self.width:
+            raise ValueError(f"every {matrix} row must hold {self.width} integers")
+        self.values[matrix].frombytes(values.tobytes())
+        self.processes[matrix].extend(processes)
+
+    def add_matrix(self, matrix: str, rows) -> None:
+        """Takes a whole matrix, such as a memory-mapped .npy array, without copying it."""
+        if matrix == "available":
+            self.set_available(rows)
+            return
+        if matrix not in ROW_MATRICES:
+            raise ValueError(f"unknown matrix {matrix!r}")
+        rows = rows if isinstance(rows, np.ndarray) else np.asarray(rows, dtype=np.int64)
+        if rows.ndim != 2:
+            raise ValueError(f"{matrix} must be a matrix")
+        self.check_width(rows.shape[1])
+        self.matrices[matrix] = rows
+
+    def set_available(self, values) -> None:
+        self.available = np.array(list(values), dtype=np.int64)
+        self.check_width(len(self.available))
+
+    def build(self) -> BulkUpdate:
+        rows = {}
+        for matrix in ROW_MATRICES:
+            if matrix in self.matrices:
+                if self.processes[matrix]:
+                    raise ValueError(f"{matrix} is given both as a whole matrix and row by row")
+                rows[matrix] = (np.arange(len(self.matrices[matrix])), self.matrices[matrix])
+            elif self.processes[matrix]:
+                processes = np.frombuffer(self.processes[matrix], dtype=np.int64)
+                values = np.frombuffer(self.values[matrix], dtype=np.int64).reshape(len(processes), self.width)
+                rows[matrix] = (processes, values)
+            else:
+                rows[matrix] = None
+        return BulkUpdate(self.available, rows["maximum"], rows["allocation"])
+
+
+def read_csv(path: str) -> BulkUpdate:
+    builder = BulkUpdateBuilder()
+    pending = {matrix: ([], []) for matrix in ROW_MATRICES}
+    with open(path) as f:
+        for line in f:
+            fields = line.rstrip("\r\n").split(",", 2)
+            if len(fields) < 3 or fields[0].startswith("#") or fields[0] == "matrix":
+                continue
+            matrix, num_process, values = fields
+            if matrix == "available":
+                builder.set_available(int(value) for value in values.split(","))
+                continue
+            if matrix not in pending:
+                raise ValueError(f"unknown matrix {matrix!r}")
+            processes, text_rows = pending[matrix]
+            processes.append(int(num_process))
+            text_rows.append(values)
+            if len(text_rows) >= CHUNK_ROWS:
+                builder.add_text_rows(matrix, processes, text_rows)
+                processes.clear()
+                text_rows.clear()
+
+    for matrix, (processes, text_rows) in pending.items():
+        if text_rows:
+            builder.add_text_rows(matrix, processes, text_rows)
+    return builder.build()
+
+
+def read_json_lines(path: str) -> BulkUpdate:
+    builder = BulkUpdateBuilder()
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if "matrix" in record:
+                builder.add_row(record["matrix"], record.get("process"), record["values"])
+                continue
+            for matrix in ("available",) + ROW_MATRICES:
+                if matrix in record:
+                    builder.add_matrix(matrix, record[matrix])
+    return builder.build()
+
+
+def read_npy(directory: str) -> BulkUpdate:
+    builder = BulkUpdateBuilder()
+    for matrix in ("available",) + ROW_MATRICES:
+        path = os.path.join(directory, f"{matrix}.npy")
+        if os.path.exists(path):
+            values = np.load(path, mmap_mode="r")
+            if values.dtype != np.int64:
+                values = values.astype(np.int64)
+            builder.add_matrix(matrix, values)
+    return builder.build()
+
+
+def read_update(path: str) -> BulkUpdate:
+    """Reads a directory of .npy files, a .csv file or a JSON-lines file, chosen by the path."""
+    if os.path.isdir(path):
+        return read_npy(path)
+    if path.endswith(".csv"):
+        return read_csv(path)
+    if path.endswith((".json", ".jsonl")):
+        return read_json_lines(path)
+    raise ValueError(f"cannot tell the format of {path}")
+
+
+def load_configuration(path: str) -> dict:
+    """Reads a whole system as the available, maximum and allocation arguments of BankersAlgorithm."""
+    update = read_update(path)
+    if not update.is_complete():
+        raise ValueError(f"{path} does not describe available and every row of maximum and allocation")
+    return {"available": update.available, "maximum": update.maximum[1], "allocation": update.allocation[1]}
+
+
+def apply_update(system_management: BankersAlgorithm, update: BulkUpdate) -> None:
+    """Applies the update atomically; raises ValueError and leaves the state unchanged if it is invalid or unsafe."""
+    if update.is_complete() and len(update.maximum[1]) != len(system_management.maximum):
+        maximum, allocation = update.maximum[1], update.allocation[1]
+        need = maximum - allocation
+        if (need < 0).any():
+            raise ValueError("an allocation exceeds the maximum of its process")
+        if not system_management.is_sequence_state_safe(np.asarray(allocation), update.available, need)[0]:
+            raise ValueError("the update leaves the state unsafe")
+        system_management.configure(update.available, maximum, allocation)
+    else:
+        system_management.update_rows(update.maximum, update.allocation, update.available)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Check a configuration file and print what it describes.")
+    parser.add_argument("path", help="a .csv file, a JSON-lines file or a directory of .npy files")
+    args = parser.parse_args()
+
+    update = read_update(args.path)
+    summary = {"complete": update.is_complete(),
+               "available": update.available is not None,
+               "maximum_rows": 0 if update.maximum is None else len(update.maximum[0]),
+               "allocation_rows": 0 if update.allocation is None else len(update.allocation[0])}
+    if update.is_complete():
+        allocation = np.asarray(update.allocation[1])
+        need = np.asarray(update.maximum[1]) - allocation
+        summary["safe"] = bool((need >= 0).all()) and VectorizedSafetyEngine().find_safe_sequence(
+            allocation, update.available, need)[0]
+    print(json.dumps(summary))
+
+
+if __name__ == '__main__':
+    main()
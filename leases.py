@@ -0,0 +1,180 @@
+"""Leases on granted requests, expired by one hashed timer wheel and reclaimed through the release path.
+
+A lease remembers which process was granted which vector. Releases by the process are taken off what its leases
+still cover, oldest lease first. If a lease is not renewed before its TTL runs out, what it still covers is released
+on the holder's behalf, clipped to what the process holds, so capacity held by dead clients comes back. Leases live
+in memory only and do not survive a restart.
+"""
+import threading
+from math import ceil
+from time import monotonic
+
+import numpy as np
+
+
+class TimerWheel:
+    """Hashed timer wheel: entries are hashed into slots by the tick they are due on.
+
+    Scheduling, cancelling and rescheduling are O(1). Advancing by one tick only looks at one slot, where entries
+    due on a later turn of the wheel are skipped.
+    """
+
+    def __init__(self, slots=1024, tick=0.1):
+        self.slots = [{} for _ in range(slots)]
+        self.tick = tick
+        self.origin = monotonic()
+        self.current = 0
+
+    def due_tick(self, deadline: float) -> int:
+        return max(self.current + 1, ceil((deadline - self.origin) / self.tick))
+
+    def schedule(self, key, deadline: float) -> int:
+        """Schedules key for deadline (a monotonic time) and returns the tick to cancel it with."""
+        due = self.due_tick(deadline)
+        self.slots[due % len(self.slots)][key] = due
+        return due
+
+    def cancel(self, key, due: int) -> None:
+        self.slots[due % len(self.slots)].pop(key, None)
+
+    def advance(self, now: float) -> list:
+        """Moves the wheel up to now and returns the keys that fell due on the way."""
+        expired = []
+        target = int((now - self.origin) / self.tick)
+        while self.current < target:
+            self.current += 1
+            bucket = self.slots[self.current % len(self.slots)]
+            due = [key for key, tick in bucket.items() if tick <= self.current]
+            for key in due:
+                del bucket[key]
+            expired.extend(due)
+        return expired
+
+
+class LeaseManager:
+    """Tracks leases for one BankersAlgorithm and reclaims expired ones from a background thread, one batch per tick."""
+
+    def __init__(self, system_management, tick=0.1, slots=1024):
+        self.system_management = system_management
+        self.lock = threading.Lock()
+        self.wheel = TimerWheel(slots, tick)
+        # lease id -> (num_process, vector, due tick)
+        self.leases = {}
+        # num_process -> ids of its leases, so they can be dropped when the process is unregistered
+        self.by_process = {}
+        # lease id -> (num_process, vector) for expired or cancelled leases whose release is on its way to the engine
+        self.reclaiming = {}
+        self.next_id = 1
+        self.expired = 0
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def grant(self, num_process, vector, ttl: float) -> int:
+        """Starts a lease on vector for num_process and returns its id, which is never 0."""
+        vector = np.array(vector, dtype=np.int64)
+        with self.lock:
+            lease_id = self.next_id
+            self.next_id += 1
+            due = self.wheel.schedule(lease_id, monotonic() + ttl)
+            self.leases[lease_id] = (num_process, vector, due)
+            self.by_process.setdefault(num_process, set()).add(lease_id)
+        return lease_id
+
+    def renew(self, lease_id: int, ttl: float) -> bool:
+        """Moves the expiry of a lease to ttl seconds from now; False if it is unknown or already expired."""
+        deadline = monotonic() + ttl
+        with self.lock:
+            lease = self.leases.get(lease_id)
+            if lease is None:
+                return False
+            num_process, vector, due = lease
+            self.wheel.cancel(lease_id, due)
+            due = self.wheel.schedule(lease_id, deadline)
+            self.leases[lease_id] = (num_process, vector, due)
+        return True
+
+    def cancel(self, lease_id: int):
+        """Ends a lease early and returns its (num_process, vector) for release, or None.
+
+        The lease is reclaiming until finish_reclaiming is called, so releases and unregistering still cut it down.
+        """
+        with self.lock:
+            lease = self.leases.pop(lease_id, None)
+            if lease is None:
+                return None
+            self.wheel.cancel(lease_id, lease[2])
+            self.forget(lease_id, lease[0])
+            self.reclaiming[lease_id] = lease[:2]
+        return lease[:2]
+
+    def finish_reclaiming(self, lease_ids) -> None:
+        with self.lock:
+            for lease_id in lease_ids:
+                del self.reclaiming[lease_id]
+
+    def consume(self, num_process, release) -> None:
+        """Takes a release by num_process off what its leases still cover, reclaiming ones first, then oldest first.
+
+        Must be called under the lock that applied the release, so no lease reclaims what the process returned and
+        was granted again since.
+        """
+        remaining = np.array(release, dtype=np.int64)
+        with self.lock:
+            vectors = [vector for owner, vector in self.reclaiming.values() if owner == num_process]
+            vectors += [self.leases[lease_id][1] for lease_id in sorted(self.by_process.get(num_process, ()))]
+            for vector in vectors:
+                if not remaining.any():
+                    break
+                taken = np.minimum(vector, remaining)
+                vector -= taken
+                remaining -= taken
+
+    def cancel_process(self, num_process) -> None:
+        """Ends every lease of num_process without releasing anything, before its slot goes to another process.
+
+        Must be called with the engine lock held, so expired leases of num_process that are still being reclaimed
+        can be emptied before the reclaiming batch reads them.
+        """
+        with self.lock:
+            for lease_id in self.by_process.pop(num_process, ()):
+                self.wheel.cancel(lease_id, self.leases.pop(lease_id)[2])
+            for reclaimed_process, vector in self.reclaiming.values():
+                if reclaimed_process == num_process:
+                    vector[:] = 0
+
+    def forget(self, lease_id, num_process) -> None:
+        leases = self.by_process[num_process]
+        leases.discard(lease_id)
+        if not leases:
+            del self.by_process[num_process]
+
+    def run(self) -> None:
+        while not self.stop_event.wait(self.wheel.tick):
+            self.reclaim_expired()
+
+    def reclaim_expired(self) -> int:
+        """Releases every lease that is due, in one batch, and returns how many expired."""
+        with self.lock:
+            expired = self.wheel.advance(monotonic())
+            for lease_id in expired:
+                num_process, vector, _ = self.leases.pop(lease_id)
+                self.forget(lease_id, num_process)
+                self.reclaiming[lease_id] = (num_process, vector)
+            releases = [self.reclaiming[lease_id] for lease_id in expired]
+        if not expired:
+            return 0
+
+        # Clipped to what each process still holds under the engine lock, and emptied there once released.
+        self.system_management.release_resources_batch(releases, clip=True)
+        self.finish_reclaiming(expired)
+        self.expired += len(expired)
+        for _ in expired:
+            self.system_management.count_decision("lease", "expired")
+        return len(expired)
+
+    def active(self) -> int:
+        return len(self.leases)
+
+    def stop(self) -> None:
+        self.stop_event.set()
@@ -0,0 +1,65 @@
+"""Load-test client for server.py: several connections sending pipelined random requests and releases."""
+import argparse
+import json
+import random
+import threading
+from time import perf_counter
+
+from client import AllocatorClient
+
+
+def run_client(args, seed: int, results: list) -> None:
+    rng = random.Random(seed)
+    with AllocatorClient(args.host, args.port, args.unix_path) as client:
+        state = client.query()
+        num_processes = len(state["allocation"])
+        num_resources = len(state["available"])
+
+        counts = {"granted": 0, "denied": 0, "released": 0, "refused": 0}
+        sent = 0
+        while sent < args.messages:
+            messages = []
+            for _ in range(min(args.pipeline, args.messages - sent)):
+                op = "release" if rng.random() < args.release_ratio else "request"
+                resources = [rng.randint(0, args.max_units) for _ in range(num_resources)]
+                messages.append({"op": op, "process": rng.randrange(num_processes), "resources": resources})
+
+            for response in client.pipeline(messages):
+                if "granted" in response:
+                    counts["granted" if response["granted"] else "denied"] += 1
+                else:
+                    counts["released" if response.get("released") else "refused"] += 1
+            sent += len(messages)
+        results.append(counts)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load-test the JSON-lines allocator server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", dest="unix_path")
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--messages", type=int, default=10000, help="messages sent by each client")
+    parser.add_argument("--pipeline", type=int, default=64, help="messages sent per write")
+    parser.add_argument("--release-ratio", type=float, default=0.4)
+    parser.add_argument("--max-units", type=int, default=1, help="largest unit count per resource type")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    results = []
+    threads = [threading.Thread(target=run_client, args=(args, args.seed + i, results)) for i in range(args.clients)]
+    start = perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = perf_counter() - start
+
+    totals = {key: sum(counts[key] for counts in results) for key in ("granted", "denied", "released", "refused")}
+    total_messages = args.clients * args.messages
+    print(json.dumps({"messages": total_messages, "seconds": round(elapsed, 4),
+                      "messages_per_second": round(total_messages / elapsed, 1), **totals}))
+
+
+if __name__ == '__main__':
+    main()
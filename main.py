@@ -1,128 +1,68 @@
+import logging
+import queue
+import re
 import threading
-from time import perf_counter
 import tkinter as tk
 
-DEFAULT_PARAMETERS = {
-    "available": [10, 9, 10],
-    "maximum": [[7, 5, 3], [3, 2, 2], [9, 0, 2], [2, 2, 2], [4, 3, 3]],
-    "allocation": [[0, 1, 0], [2, 0, 0], [3, 0, 2], [2, 1, 1], [0, 0, 2]]
-}
-
-
-class BankersAlgorithm:
-    def __init__(self, available, maximum, allocation):
-        self.available = available
-        self.maximum = maximum
-        self.allocation = allocation
-        self.lock = threading.Lock()
-        self.need = [[i - j for i, j in zip(max_i, alloc_j)] for max_i, alloc_j in zip(maximum, allocation)]
-        self.len_resources = len(available)
-        self.start = perf_counter()
-
-    def request_resources(self, num_process, request_res,  console_info):
-
-        self.lock.acquire()
-        if self.request_is_valid(num_process, request_res):
-            alloc_copy = self.allocation.copy()
-            avail_copy = self.available.copy()
-            need_copy = self.need.copy()
-
-            for i in range(self.len_resources):
-                alloc_copy[num_process][i] += request_res[i]
-                need_copy[num_process][i] -= request_res[i]
-                avail_copy[i] -= request_res[i]
-
-            if self.is_sequence_state_safe(alloc_copy, avail_copy, need_copy):
-                self.allocation = alloc_copy
-                self.available = avail_copy
-                self.need = [[i - j for i, j in zip(max_i, alloc_j)] for max_i, alloc_j
-                             in zip(self.maximum, alloc_copy)]
-                self.lock.release()
-                time_stamp = perf_counter()
-                console_info.append([True, num_process, request_res, round(time_stamp - self.start, 4)])
-
-            else:
-                self.lock.release()
-                time_stamp = perf_counter()
-                console_info.append([True, num_process, request_res, round(time_stamp - self.start, 4)])
+from bankers_algorithm import DEFAULT_PARAMETERS, BankersAlgorithm
 
-        else:
-            self.lock.release()
-            time_stamp = perf_counter()
-            console_info.append([False, num_process, request_res, round(time_stamp - self.start, 4)])
-
-    def request_is_valid(self, num_process, request_res):
-        for k in range(self.len_resources):
-            if request_res[k] > self.need[num_process][k]:
-                return False
-            if request_res[k] > self.available[k]:
-                return False
-        return True
-
-    def is_sequence_state_safe(self, allocation, available, need):
-        work = available.copy()
-        finish = [False] * len(allocation)
-        i = 0  # Initialize i
-        while not all(finish):
-            if finish[i] is False and self.is_less_or_equal(need[i], work):
-                work = [work[j] + allocation[i][j] for j in range(self.len_resources)]
-                finish[i] = True
-
-            i += 1
-            if i == len(allocation):
-                i = 0
-
-        return all(finish)
-
-    def release_resources(self, num_process, release_res, console_info):
-        self.lock.acquire()
-        if self.release_is_valid(num_process, release_res):
-            alloc_copy = self.allocation.copy()
-            avail_copy = self.available.copy()
-
-            for i in range(self.len_resources):
-                alloc_copy[num_process][i] -= release_res[i]
-                avail_copy[i] += release_res[i]
-
-            self.allocation = alloc_copy
-            self.available = avail_copy
-            self.need = [[i - j for i, j in zip(max_i, alloc_j)] for max_i, alloc_j in zip(self.maximum, alloc_copy)]
-            self.lock.release()
-            time_stamp = perf_counter()
-
-            console_info.append([True, num_process, release_res, round(time_stamp - self.start, 4)])
-        else:
-            self.lock.release()
-            time_stamp = perf_counter()
-            console_info.append([False, num_process, release_res, round(time_stamp - self.start, 4)])
+# Requests and releases are handed to the engine in batches of this size, so results stream back while a long list
+# is still being processed.
+BATCH_SIZE = 1000
+POLL_INTERVAL_MS = 50
+# The console only keeps the most recent lines.
+CONSOLE_LINES = 5000
 
-    def release_is_valid(self, num_process, release_res) -> bool:
-        for i in range(self.len_resources):
-            if release_res[i] > self.allocation[num_process][i]:
-                return False
-        return True
 
-    def return_str_current_state_of_system(self) -> str:
-        str_info = ""
-        str_info += f"Available resources:\n {self.available}"
-        str_info += f"\n\nCurrent allocation"
+class VirtualList:
+    """Listbox that only holds the rows currently in view, so it can page through any number of entries.
 
-        for i in range(len(self.allocation)):
-            str_info += f"\nProcess {i}: {self.allocation[i]}"
+    row_count() returns the number of rows and row_text(i) renders row i; call refresh() after either changes.
+    """
 
-        str_info += f"\n\nMaximum allocation"
+    def __init__(self, master, row_count, row_text, rows, font):
+        self.row_count = row_count
+        self.row_text = row_text
+        self.rows = rows
+        self.first = 0
+        self.listbox = tk.Listbox(master, selectmode=tk.NONE, font=font, bd=0, height=rows, activestyle="none")
+        self.scrollbar = tk.Scrollbar(master, command=self.scroll)
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.listbox.bind(sequence, self.wheel)
 
-        for i in range(len(self.maximum)):
-            str_info += f"\nProcess {i}: {self.maximum[i]}"
+    def place(self, x, y, width, height) -> None:
+        self.listbox.place(x=x, y=y, width=width - 15, height=height)
+        self.scrollbar.place(x=x + width - 15, y=y, width=15, height=height)
 
-        return str_info
+    def scroll(self, action, amount, unit=None) -> None:
+        if action == "moveto":
+            self.first = int(float(amount) * self.row_count())
+        else:
+            self.first += int(amount) * (self.rows if unit == "pages" else 1)
+        self.refresh()
 
-    @staticmethod
-    def is_less_or_equal(a, b):
-        for i in range(len(a)):
-            if a[i] > b[i]:
-                return False
-        return True
+    def wheel(self, event) -> str:
+        if event.num == 4 or event.delta > 0:
+            self.scroll("scroll", -3)
+        else:
+            self.scroll("scroll", 3)
+        return "break"
+
+    def scroll_to_end(self) -> None:
+        self.first = self.row_count()
+        self.refresh()
+
+    def refresh(self) -> None:
+        total = self.row_count()
+        self.first = max(0, min(self.first, total - self.rows))
+        last = min(total, self.first + self.rows)
+        self.listbox.delete(0, tk.END)
+        for i in range(self.first, last):
+            self.listbox.insert(tk.END, self.row_text(i))
+        if total:
+            self.scrollbar.set(self.first / total, last / total)
+        else:
+            self.scrollbar.set(0, 1)
 
 
 def hide_indicators() -> None:
@@ -146,290 +86,255 @@ def indicate_button(label: tk.Label, button: tk.Button, page) -> None:
     page()
 
 
-def add_to_list(listbox: tk.Listbox, entry_process: tk.Entry, entry_res_1: tk.Entry, entry_res_2: tk.Entry,
-                entry_res_3: tk.Entry, data_list: list) -> None:
-    process = entry_process.get()
-    res_1 = entry_res_1.get()
-    res_2 = entry_res_2.get()
-    res_3 = entry_res_3.get()
-    if int(process) < 0 or int(process) > 4 or process == "" or res_1 == "" or res_2 == "" or res_3 == "":
+def parse_process(entry_process: tk.Entry):
+    """Returns the process number typed in entry_process, or None if it is not a registered process."""
+    try:
+        process = int(entry_process.get())
+    except ValueError:
+        return None
+    return process if system_management.is_registered(process) else None
+
+
+def parse_vector(entry_vector: tk.Entry):
+    """Returns one non-negative integer per resource type from a comma or space separated entry, or None."""
+    try:
+        vector = [int(value) for value in re.split(r"[\s,]+", entry_vector.get().strip(" []")) if value]
+    except ValueError:
+        return None
+    if len(vector) != system_management.len_resources or min(vector, default=0) < 0:
+        return None
+    return vector
+
+
+def add_to_list(request_list: VirtualList, entry_process: tk.Entry, entry_vector: tk.Entry, data_list: list) -> None:
+    process = parse_process(entry_process)
+    vector = parse_vector(entry_vector)
+    if process is None or vector is None:
         return
-    listbox.insert(tk.END, f"Process {process}: [{res_1}, {res_2}, {res_3}]")
-    data_list.append([process, res_1, res_2, res_3])
-
-
-def submit_requests(data_list: list, request_listbox: tk.Listbox, data_l: tk.Label, data_console_l: tk.Text) -> None:
-    threads = []
-    info_to_console = []
-    for i in range(len(data_list)):
-        t = threading.Thread(target=system_management.request_resources, args=(int(data_list[i][0]),
-                                                                               [int(data_list[i][1]),
-                                                                                int(data_list[i][2]),
-                                                                                int(data_list[i][3])],
-                                                                               info_to_console))
-        threads.append(t)
-
-    for t in threads:
-        t.start()
-        t.join()
-
-    str_info = ""
-    for i in range(len(info_to_console)):
-        if info_to_console[i][0]:
-            str_info += (f"{info_to_console[i][3]}s :Request {info_to_console[i][2]} for process "
-                         f"{info_to_console[i][1]} is valid\n")
-        else:
-            str_info += (f"{info_to_console[i][3]}s :Request {info_to_console[i][2]} for process "
-                         f"{info_to_console[i][1]} is invalid\n")
-
-    data_l.config(text=system_management.return_str_current_state_of_system())
-    data_console_l.config(state="normal")
-    data_console_l.delete("1.0", tk.END)  # Clear previous content
-    data_console_l.insert(tk.END, "".join(str_info))  # Join list elements with newline
-    data_console_l.config(state="disabled")
-    request_listbox.delete(0, tk.END)
+    data_list.append((process, vector))
+    request_list.scroll_to_end()
+
+
+def run_engine_jobs() -> None:
+    """Runs on the engine thread, so the Tk main loop never waits for the Banker's algorithm.
+
+    A job that raises is logged and reported in the console, and the thread goes on with the next one.
+    """
+    while True:
+        job = engine_jobs.get()
+        try:
+            job()
+        except Exception as error:
+            logging.exception("engine job failed")
+            engine_results.put([f"Engine job failed: {error!r}\n"])
+
+
+def run_batches(method, items: list, kind: str) -> None:
+    for start in range(0, len(items), BATCH_SIZE):
+        info_to_console = []
+        method(items[start:start + BATCH_SIZE], console_info=info_to_console)
+        engine_results.put([f"{info[3]}s :{kind} {info[2]} for process {info[1]} is "
+                            f"{'valid' if info[0] else 'invalid'}\n" for info in info_to_console])
+
+
+def submit_requests(data_list: list, request_list: VirtualList) -> None:
+    requests = data_list[:]
     data_list.clear()
+    request_list.refresh()
+    engine_jobs.put(lambda: run_batches(system_management.request_resources_batch, requests, "Request"))
 
 
-def submit_releases(data_list: list, release_listbox: tk.Listbox, data_l: tk.Label, data_console_l: tk.Text) -> None:
-    threads = []
-    info_to_console = []
-    for i in range(len(data_list)):
-        t = threading.Thread(target=system_management.release_resources, args=(int(data_list[i][0]),
-                                                                               [int(data_list[i][1]),
-                                                                                int(data_list[i][2]),
-                                                                                int(data_list[i][3])],
-                                                                               info_to_console))
-        threads.append(t)
-
-    for t in threads:
-        t.start()
-
-    for t in threads:
-        t.join()
-
-    str_info = ""
-    for i in range(len(info_to_console)):
-        if info_to_console[i][0]:
-            str_info += (f"{info_to_console[i][3]}s :Release {info_to_console[i][2]} for process "
-                         f"{info_to_console[i][1]} is valid\n")
-        else:
-            str_info += (f"{info_to_console[i][3]}s :Release {info_to_console[i][2]} for process "
-                         f"{info_to_console[i][1]} is invalid\n")
-
-    data_l.config(text=system_management.return_str_current_state_of_system())
-    data_console_l.config(state="normal")
-    data_console_l.delete("1.0", tk.END)  # Clear previous content
-    data_console_l.insert(tk.END, "".join(str_info))  # Join list elements with newline
-    data_console_l.config(state="disabled")
-    release_listbox.delete(0, tk.END)
+def submit_releases(data_list: list, release_list: VirtualList) -> None:
+    releases = data_list[:]
     data_list.clear()
+    release_list.refresh()
+    engine_jobs.put(lambda: run_batches(system_management.release_resources_batch, releases, "Release"))
+
+
+def poll_engine_results() -> None:
+    """Drains whatever the engine thread produced since the last poll into the console and state panel."""
+    lines = []
+    received = False
+    try:
+        while True:
+            lines.extend(engine_results.get_nowait())
+            received = True
+    except queue.Empty:
+        pass
+
+    if lines:
+        append_to_console(lines)
+    if received:
+        state_list.refresh()
+    root.after(POLL_INTERVAL_MS, poll_engine_results)
+
+
+def append_to_console(lines: list) -> None:
+    lines = lines[-CONSOLE_LINES:]
+    data_console_info.config(state="normal")
+    data_console_info.insert(tk.END, "".join(lines))
+    excess = int(data_console_info.index("end-1c").split(".")[0]) - CONSOLE_LINES
+    if excess > 0:
+        data_console_info.delete("1.0", f"{excess + 1}.0")
+    data_console_info.see(tk.END)
+    data_console_info.config(state="disabled")
+
+
+def state_row_count() -> int:
+    return 1 + len(system_management.maximum)
+
+
+def state_row_text(i: int) -> str:
+    if i == 0:
+        return f"Available: {system_management.available.tolist()}"
+    process = i - 1
+    if not system_management.is_registered(process):
+        return f"P{process}: free"
+    return (f"P{process}: alloc {system_management.allocation[process].tolist()} "
+            f"max {system_management.maximum[process].tolist()}")
+
+
+def update_state(description: str, **rows) -> None:
+    """Queues a change of the matrices for the engine thread, which rejects it if it leaves the state unsafe."""
+
+    def job():
+        try:
+            system_management.update_rows(**rows)
+            engine_results.put([f"{description} applied\n"])
+        except ValueError as error:
+            engine_results.put([f"{description} rejected: {error}\n"])
+
+    engine_jobs.put(job)
+
+
+def change_max_system(entry_process: tk.Entry, entry_vector: tk.Entry) -> None:
+    process = parse_process(entry_process)
+    vector = parse_vector(entry_vector)
+    if process is None or vector is None:
+        return
+    update_state(f"Maximum {vector} for process {process}", maximum_rows=([process], [vector]))
 
 
-def request_page(data_l: tk.Label, data_console_label: tk.Label):
-    request_frame = tk.Frame(main_frame, bg="#f2f2f2", height=600, width=524, bd=0)
-    lb = tk.Label(request_frame, text="Which process? (0-4)", font=('bold', 15), bg="#f2f2f2", bd=0)
+def change_alloc_system(entry_process: tk.Entry, entry_vector: tk.Entry) -> None:
+    process = parse_process(entry_process)
+    vector = parse_vector(entry_vector)
+    if process is None or vector is None:
+        return
+    update_state(f"Allocation {vector} for process {process}", allocation_rows=([process], [vector]))
 
-    lb.place(x=45, y=20)
-    entry_process = tk.Entry(request_frame, font=('bold', 15), bg="#b3b3b3", bd=0)
-    entry_process.place(x=45, y=60, width=150, height=35)
-    lb_res_1 = tk.Label(request_frame, text="Resource nr. 1", font=('bold', 15), bg="#f2f2f2",
-                        bd=0, )
-    lb_res_1.place(x=45, y=120)
-    entry_res_1 = tk.Entry(request_frame, font=('bold', 15), bg="#b3b3b3", bd=0)
-    entry_res_1.place(x=45, y=160, width=150, height=35)
-
-    lb_res_2 = tk.Label(request_frame, text="Resource nr. 2", font=('bold', 15), bg="#f2f2f2",
-                        bd=0, )
-    lb_res_2.place(x=45, y=210)
-    entry_res_2 = tk.Entry(request_frame, font=('bold', 15), bg="#b3b3b3", bd=0)
-    entry_res_2.place(x=45, y=250, width=150, height=35)
-
-    lb_res_3 = tk.Label(request_frame, text="Resource nr. 3", font=('bold', 15), bg="#f2f2f2",
-                        bd=0, )
-    lb_res_3.place(x=45, y=300)
-    entry_res_3 = tk.Entry(request_frame, font=('bold', 15), bg="#b3b3b3", bd=0)
-    entry_res_3.place(x=45, y=340, width=150, height=35)
-
-    # Creating a Listbox in request_frame
-    request_listbox = tk.Listbox(request_frame, selectmode=tk.NONE, font=('bold', 12), bd=0)
-    request_listbox.place(x=300, y=20, width=190, height=350)
-    data_list = []
-    add_to_list_btn = tk.Button(request_frame, font=('bold', 15), text="Add request to list", width=20, height=2,
-                                bg="#b3b3b3", bd=0,
-                                command=lambda: add_to_list(request_listbox, entry_process, entry_res_1, entry_res_2,
-                                                            entry_res_3, data_list))
-    add_to_list_btn.place(x=45, y=400)
 
-    # Add sample items to the Listbox for demonstration
+def register_process(entry_vector: tk.Entry) -> None:
+    vector = parse_vector(entry_vector)
+    if vector is None:
+        return
 
-    submit_btn = tk.Button(request_frame, font=('bold', 14), text="Send requests at once", width=17, height=2,
-                           bg="#b3b3b3", bd=0, command=lambda: submit_requests(data_list, request_listbox, data_l,
-                                                                               data_console_label))
-    submit_btn.place(x=300, y=400)
+    def job():
+        try:
+            process = system_management.register_process(vector)
+            engine_results.put([f"Registered process {process} with maximum {vector}\n"])
+        except ValueError as error:
+            engine_results.put([f"Registering maximum {vector} rejected: {error}\n"])
+
+    engine_jobs.put(job)
+
+
+def unregister_process(entry_process: tk.Entry) -> None:
+    process = parse_process(entry_process)
+    if process is None:
+        return
+
+    def job():
+        console_info = []
+        try:
+            system_management.unregister_process(process, console_info)
+            engine_results.put([f"Unregistered process {process}, released {console_info[0][2]}\n"])
+        except ValueError as error:
+            engine_results.put([f"Unregistering process {process} rejected: {error}\n"])
+
+    engine_jobs.put(job)
 
-    request_frame.pack()
+
+def change_avail_system(entry_vector: tk.Entry) -> None:
+    vector = parse_vector(entry_vector)
+    if vector is None:
+        return
+    update_state(f"Available {vector}", available=vector)
 
 
-def release_page(data_l: tk.Label, data_console_label: tk.Label):
-    release_frame = tk.Frame(main_frame, bg="#f2f2f2", height=600, width=524, bd=0)
-    lb = tk.Label(release_frame, text="Which process? (0-4)", font=('bold', 15), bg="#f2f2f2",
-                  bd=0, )
+def operation_page(kind: str, submit):
+    """Builds the request or release page for however many processes and resource types the system has."""
+    frame = tk.Frame(main_frame, bg="#f2f2f2", height=600, width=524, bd=0)
+    lb = tk.Label(frame, text="Which process?", font=('bold', 15), bg="#f2f2f2", bd=0)
     lb.place(x=45, y=20)
-    entry_process = tk.Entry(release_frame, font=('bold', 15), bg="#b3b3b3", bd=0)
+    entry_process = tk.Entry(frame, font=('bold', 15), bg="#b3b3b3", bd=0)
     entry_process.place(x=45, y=60, width=150, height=35)
-    lb_res_1 = tk.Label(release_frame, text="Resource nr. 1", font=('bold', 15), bg="#f2f2f2",
-                        bd=0, )
-    lb_res_1.place(x=45, y=120)
-    entry_res_1 = tk.Entry(release_frame, font=('bold', 15), bg="#b3b3b3", bd=0)
-    entry_res_1.place(x=45, y=160, width=150, height=35)
-
-    lb_res_2 = tk.Label(release_frame, text="Resource nr. 2", font=('bold', 15), bg="#f2f2f2",
-                        bd=0, )
-    lb_res_2.place(x=45, y=210)
-    entry_res_2 = tk.Entry(release_frame, font=('bold', 15), bg="#b3b3b3", bd=0)
-    entry_res_2.place(x=45, y=250, width=150, height=35)
-
-    lb_res_3 = tk.Label(release_frame, text="Resource nr. 3", font=('bold', 15), bg="#f2f2f2",
-                        bd=0, )
-    lb_res_3.place(x=45, y=300)
-    entry_res_3 = tk.Entry(release_frame, font=('bold', 15), bg="#b3b3b3", bd=0)
-    entry_res_3.place(x=45, y=340, width=150, height=35)
-
-    # Creating a Listbox in request_frame
-    request_listbox = tk.Listbox(release_frame, selectmode=tk.NONE, font=('bold', 12), bd=0)
-    request_listbox.place(x=300, y=20, width=190, height=350)
+
+    lb_res = tk.Label(frame, text=f"Resources ({system_management.len_resources} values)", font=('bold', 15),
+                      bg="#f2f2f2", bd=0)
+    lb_res.place(x=45, y=120)
+    entry_vector = tk.Entry(frame, font=('bold', 15), bg="#b3b3b3", bd=0)
+    entry_vector.place(x=45, y=160, width=230, height=35)
+
     data_list = []
-    add_to_list_btn = tk.Button(release_frame, font=('bold', 15), text="Add release to list", width=20, height=2,
+    operation_list = VirtualList(frame, lambda: len(data_list),
+                                 lambda i: f"Process {data_list[i][0]}: {data_list[i][1]}", rows=17,
+                                 font=('bold', 12))
+    operation_list.place(x=300, y=20, width=190, height=350)
+    operation_list.refresh()
+
+    add_to_list_btn = tk.Button(frame, font=('bold', 15), text=f"Add {kind} to list", width=20, height=2,
                                 bg="#b3b3b3", bd=0,
-                                command=lambda: add_to_list(request_listbox, entry_process, entry_res_1, entry_res_2,
-                                                            entry_res_3, data_list))
+                                command=lambda: add_to_list(operation_list, entry_process, entry_vector, data_list))
     add_to_list_btn.place(x=45, y=400)
 
-    # Add sample items to the Listbox for demonstration
-
-    submit_btn = tk.Button(release_frame, font=('bold', 14), text="Send releases at once", width=17, height=2,
-                           bg="#b3b3b3", bd=0, command=lambda: submit_releases(data_list, request_listbox, data_l,
-                                                                               data_console_label))
+    submit_btn = tk.Button(frame, font=('bold', 14), text=f"Send {kind}s at once", width=17, height=2,
+                           bg="#b3b3b3", bd=0, command=lambda: submit(data_list, operation_list))
     submit_btn.place(x=300, y=400)
 
-    release_frame.pack()
-
-
-def change_max_system(entry_process_max, entry_res1, entry_res2, entry_res3, data_l: tk.Label):
-    if (int(entry_process_max.get()) > 4 or int(entry_process_max.get()) < 0 or entry_res1.get() == ""
-            or entry_res2.get() == "" or entry_res3.get() == ""):
-        return
-
-    system_management.maximum[int(entry_process_max.get())] = [int(entry_res1.get()), int(entry_res2.get()),
-                                                               int(entry_res3.get())]
-    system_management.need = [[i - j for i, j in zip(max_i, alloc_j)] for max_i, alloc_j in
-                              zip(system_management.maximum, system_management.allocation)]
-    data_l.config(text=system_management.return_str_current_state_of_system())
-
+    frame.pack()
 
-def change_alloc_system(entry_process_alloc, entry_res1, entry_res2, entry_res3, data_l: tk.Label):
-    if (int(entry_process_alloc.get()) > 4 or int(entry_process_alloc.get()) < 0 or entry_res1.get() == ""
-            or entry_res2.get() == "" or entry_res3.get() == ""):
-        return
-    if (int(entry_res1.get()) > system_management.maximum[int(entry_process_alloc.get())][0] or int(entry_res2.get()) >
-            system_management.maximum[int(entry_process_alloc.get())][1] or int(entry_res3.get()) >
-            system_management.maximum[int(entry_process_alloc.get())][2]):
-        return
-    
-    
-    system_management.allocation[int(entry_process_alloc.get())] = [int(entry_res1.get()), int(entry_res2.get()),
-                                                                    int(entry_res3.get())]
-    system_management.need = [[i - j for i, j in zip(max_i, alloc_j)] for max_i, alloc_j in
-                              zip(system_management.maximum, system_management.allocation)]
-    data_l.config(text=system_management.return_str_current_state_of_system())
 
+def request_page():
+    operation_page("request", submit_requests)
 
-def change_avail_system(entry_res1, entry_res2, entry_res3, data_l: tk.Label):
-    if entry_res1.get() == "" or entry_res2.get() == "" or entry_res3.get() == "":
-        return
 
-    system_management.available = [int(entry_res1.get()), int(entry_res2.get()), int(entry_res3.get())]
-    data_l.config(text=system_management.return_str_current_state_of_system())
+def release_page():
+    operation_page("release", submit_releases)
 
 
-def settings_page(data_l: tk.Label):
+def settings_page():
     settings_frame = tk.Frame(main_frame, bg="#f2f2f2", height=600, width=524)
     lb = tk.Label(settings_frame, width=20, height=2, text="System parameters",
                   font=('bold', 15), bg="#f2f2f2", bd=0)
     lb.place(x=150, y=20)
 
-    # Maximum values
-    lb_process = tk.Label(settings_frame, width=20, height=2, text="Process nr",
-                          font=('bold', 15), bg="#f2f2f2", bd=0)
-    lb_process.place(x=70, y=55)
-    entry_process_max = tk.Entry(settings_frame, font=('bold', 15), bg="#b3b3b3", bd=0)
-    entry_process_max.place(x=130, y=110, width=50, height=25)
-
-    entry_process_alloc = tk.Entry(settings_frame, font=('bold', 15), bg="#b3b3b3", bd=0)
-    entry_process_alloc.place(x=230, y=110, width=50, height=25)
-
-    lb_res_1_max = tk.Label(settings_frame, text="Max 1", font=('bold', 15), bg="#f2f2f2", bd=0)
-    lb_res_1_max.place(x=130, y=150)  # Adjusted x and y coordinates
-    entry_res_1_max = tk.Entry(settings_frame, font=('bold', 15), bg="#b3b3b3", bd=0)
-    entry_res_1_max.place(x=130, y=190, width=50, height=25)
-
-    lb_res_2_max = tk.Label(settings_frame, text="Max 2", font=('bold', 15), bg="#f2f2f2", bd=0)
-    lb_res_2_max.place(x=130, y=250)  # Adjusted x and y coordinates
-    entry_res_2_max = tk.Entry(settings_frame, font=('bold', 15), bg="#b3b3b3", bd=0)
-    entry_res_2_max.place(x=130, y=290, width=50, height=25)
-
-    lb_res_3_max = tk.Label(settings_frame, text="Max 3", font=('bold', 15), bg="#f2f2f2", bd=0)
-    lb_res_3_max.place(x=130, y=350)  # Adjusted x and y coordinates
-    entry_res_3_max = tk.Entry(settings_frame, font=('bold', 15), bg="#b3b3b3", bd=0)
-    entry_res_3_max.place(x=130, y=390, width=50, height=25)
-    entry_button_max = tk.Button(settings_frame, font=('bold', 9), text="Change max", width=13, height=1, bg="#b3b3b3",
-                                 bd=0, command=lambda: change_max_system(entry_process_max, entry_res_1_max,
-                                                                         entry_res_2_max, entry_res_3_max, data_l))
-    entry_button_max.place(x=100, y=450)
-
-    # Allocation values
-    lb_res_1_alloc = tk.Label(settings_frame, text="Alloc 1", font=('bold', 15), bg="#f2f2f2", bd=0)
-    lb_res_1_alloc.place(x=230, y=150)  # Adjusted x and y coordinates
-    entry_res_1_alloc = tk.Entry(settings_frame, font=('bold', 15), bg="#b3b3b3", bd=0)
-    entry_res_1_alloc.place(x=230, y=190, width=50, height=25)
-
-    lb_res_2_alloc = tk.Label(settings_frame, text="Alloc 2", font=('bold', 15), bg="#f2f2f2", bd=0)
-    lb_res_2_alloc.place(x=230, y=250)  # Adjusted x and y coordinates
-    entry_res_2_alloc = tk.Entry(settings_frame, font=('bold', 15), bg="#b3b3b3", bd=0)
-    entry_res_2_alloc.place(x=230, y=290, width=50, height=25)
-
-    lb_res_3_alloc = tk.Label(settings_frame, text="Alloc 3", font=('bold', 15), bg="#f2f2f2", bd=0)
-    lb_res_3_alloc.place(x=230, y=350)  # Adjusted x and y coordinates
-    entry_res_3_alloc = tk.Entry(settings_frame, font=('bold', 15), bg="#b3b3b3", bd=0)
-    entry_res_3_alloc.place(x=230, y=390, width=50, height=25)
-    entry_button_alloc = tk.Button(settings_frame, font=('bold', 9), text="Change allocated", width=13, height=1,
-                                   bg="#b3b3b3", bd=0, command=lambda: change_alloc_system(entry_process_alloc,
-                                                                                           entry_res_1_alloc,
-                                                                                           entry_res_2_alloc,
-                                                                                           entry_res_3_alloc, data_l))
-    entry_button_alloc.place(x=210, y=450)
-
-    # Available values
-    lb_res_1_avail = tk.Label(settings_frame, text="Avail 1", font=('bold', 15), bg="#f2f2f2", bd=0)
-    lb_res_1_avail.place(x=330, y=150)  # Adjusted x and y coordinates
-    entry_res_1_avail = tk.Entry(settings_frame, font=('bold', 15), bg="#b3b3b3", bd=0)
-    entry_res_1_avail.place(x=330, y=190, width=50, height=25)
-
-    lb_res_2_avail = tk.Label(settings_frame, text="Avail 2", font=('bold', 15), bg="#f2f2f2", bd=0)
-    lb_res_2_avail.place(x=330, y=250)  # Adjusted x and y coordinates
-    entry_res_2_avail = tk.Entry(settings_frame, font=('bold', 15), bg="#b3b3b3", bd=0)
-    entry_res_2_avail.place(x=330, y=290, width=50, height=25)
-
-    lb_res_3_avail = tk.Label(settings_frame, text="Avail 3", font=('bold', 15), bg="#f2f2f2", bd=0)
-    lb_res_3_avail.place(x=330, y=350)  # Adjusted x and y coordinates
-    entry_res_3_avail = tk.Entry(settings_frame, font=('bold', 15), bg="#b3b3b3", bd=0)
-    entry_res_3_avail.place(x=330, y=390, width=50, height=25)
-    entry_button_avail = tk.Button(settings_frame, font=('bold', 9), text="Change available", width=13, height=1,
-                                   bg="#b3b3b3", bd=0, command=lambda: change_avail_system(entry_res_1_avail,
-                                                                                           entry_res_2_avail,
-                                                                                           entry_res_3_avail, data_l))
-    entry_button_avail.place(x=320, y=450)
+    lb_process = tk.Label(settings_frame, text="Process nr", font=('bold', 15), bg="#f2f2f2", bd=0)
+    lb_process.place(x=45, y=80)
+    entry_process = tk.Entry(settings_frame, font=('bold', 15), bg="#b3b3b3", bd=0)
+    entry_process.place(x=45, y=115, width=100, height=25)
+    unregister_btn = tk.Button(settings_frame, font=('bold', 9), text="Unregister", width=13, height=1,
+                               bg="#b3b3b3", bd=0, command=lambda: unregister_process(entry_process))
+    unregister_btn.place(x=160, y=115)
+
+    rows = (("Max", change_max_system), ("Alloc", change_alloc_system), ("Avail", None))
+    for i, (name, change) in enumerate(rows):
+        y = 170 + 90 * i
+        lb_vector = tk.Label(settings_frame, text=f"{name} ({system_management.len_resources} values)",
+                             font=('bold', 15), bg="#f2f2f2", bd=0)
+        lb_vector.place(x=45, y=y)
+        entry_vector = tk.Entry(settings_frame, font=('bold', 15), bg="#b3b3b3", bd=0)
+        entry_vector.place(x=45, y=y + 35, width=300, height=25)
+        if change is None:
+            command = lambda entry=entry_vector: change_avail_system(entry)
+        else:
+            command = lambda entry=entry_vector, change=change: change(entry_process, entry)
+        button = tk.Button(settings_frame, font=('bold', 9), text=f"Change {name.lower()}", width=13, height=1,
+                           bg="#b3b3b3", bd=0, command=command)
+        button.place(x=370, y=y + 35)
+        if name == "Max":
+            register_btn = tk.Button(settings_frame, font=('bold', 9), text="Register new", width=13, height=1,
+                                     bg="#b3b3b3", bd=0, command=lambda entry=entry_vector: register_process(entry))
+            register_btn.place(x=370, y=y)
 
     settings_frame.pack()
 
@@ -442,6 +347,9 @@ def destroy_pages():
 if __name__ == '__main__':
     system_management = BankersAlgorithm(DEFAULT_PARAMETERS["available"], DEFAULT_PARAMETERS["maximum"],
                                          DEFAULT_PARAMETERS["allocation"])
+    engine_jobs = queue.Queue()
+    engine_results = queue.Queue()
+    threading.Thread(target=run_engine_jobs, daemon=True).start()
 
     root = tk.Tk()
     root.geometry("1024x500")
@@ -458,9 +366,9 @@ if __name__ == '__main__':
                           highlightbackground="#c7c8c9", bd=5)
     data_frame.place(x=20, y=80, width=210, height=400)
 
-    data_label = tk.Label(data_frame, text=system_management.return_str_current_state_of_system(), font=('bold', 8),
-                          bg="#b3b3b3", bd=0)
-    data_label.place(x=0, y=0, width=190, height=230)
+    state_list = VirtualList(data_frame, state_row_count, state_row_text, rows=18, font=('bold', 8))
+    state_list.place(x=0, y=0, width=190, height=230)
+    state_list.refresh()
 
     data_info_floor = tk.Label(data_frame, text="", font=('bold', 15), bg="#353535", bd=0, )
     data_info_floor.place(x=5, y=240, width=180, height=5)
@@ -478,8 +386,7 @@ if __name__ == '__main__':
     options_frame.pack(side=tk.LEFT)
 
     request_btn = tk.Button(options_frame, font=('bold', 15), text="Request process", width=20, height=2, bg="#b3b3b3",
-                            bd=0, command=lambda: indicate_button(request_indicate, request_btn,
-                                                                  lambda: request_page(data_label, data_console_info)))
+                            bd=0, command=lambda: indicate_button(request_indicate, request_btn, request_page))
     request_btn.place(x=10, y=100)
 
     request_indicate = tk.Label(options_frame, font=('bold', 15), text="", width=20, height=2,
@@ -487,8 +394,7 @@ if __name__ == '__main__':
     request_indicate.place(x=10, y=100, width=5, height=60)
 
     release_btn = tk.Button(options_frame, font=('bold', 15), text="Release process", width=20, height=2, bg="#b3b3b3",
-                            bd=0, command=lambda: indicate_button(release_indicate, release_btn,
-                                                                  lambda: release_page(data_label, data_console_info)))
+                            bd=0, command=lambda: indicate_button(release_indicate, release_btn, release_page))
     release_btn.place(x=10, y=170)
 
     release_indicate = tk.Label(options_frame, font=('bold', 15), text="", width=20, height=2,
@@ -496,8 +402,7 @@ if __name__ == '__main__':
     release_indicate.place(x=10, y=170, width=5, height=60)
 
     settings_btn = tk.Button(options_frame, font=('bold', 15), text="System settings", width=20, height=2, bg="#b3b3b3",
-                             bd=0, command=lambda: indicate_button(settings_indicate, settings_btn,
-                                                                   lambda: settings_page(data_label)))
+                             bd=0, command=lambda: indicate_button(settings_indicate, settings_btn, settings_page))
     settings_btn.place(x=10, y=240)
 
     settings_indicate = tk.Label(options_frame, font=('bold', 15), text="", width=20, height=2,
@@ -508,4 +413,5 @@ if __name__ == '__main__':
                           highlightbackground="#c7c8c9")
     main_frame.pack(side=tk.RIGHT)
 
+    root.after(POLL_INTERVAL_MS, poll_engine_results)
     root.mainloop()
@@ -0,0 +1,154 @@
+"""Counters and histograms for BankersAlgorithm, served in the Prometheus text format.
+
+Pass an AllocatorMetrics to BankersAlgorithm(metrics=...) to record decisions, lock wait and hold times, safety-check
+latency and passes, then expose them with start_metrics_server().
+"""
+import threading
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import perf_counter
+
+LATENCY_BUCKETS = (1e-6, 5e-6, 1e-5, 5e-5, 1e-4, 5e-4, 1e-3, 5e-3, 1e-2, 5e-2, 0.1, 0.5, 1.0)
+PASS_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 1024)
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets: tuple):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f'{self.name}_bucket{{le="{bound}"}} {cumulative}')
+        cumulative += self.counts[-1]
+        lines.append(f'{self.name}_bucket{{le="+Inf"}} {cumulative}')
+        lines.append(f"{self.name}_sum {self.sum}")
+        lines.append(f"{self.name}_count {cumulative}")
+        return lines
+
+
+class AllocatorMetrics:
+    """Every update takes one uncontended lock, since safety checks can be recorded outside the engine lock."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.decisions = {}
+        self.lock_wait = Histogram("bankers_lock_wait_seconds", "Time spent waiting for the engine lock.",
+                                   LATENCY_BUCKETS)
+        self.lock_hold = Histogram("bankers_lock_hold_seconds", "Time the engine lock was held.", LATENCY_BUCKETS)
+        self.safety_check = Histogram("bankers_safety_check_seconds",
+                                      "Time spent deciding whether a request leaves the state safe.", LATENCY_BUCKETS)
+        self.safety_passes = Histogram("bankers_safety_check_passes", "Passes made by each full safety search.",
+                                       PASS_BUCKETS)
+
+    def count_decision(self, op: str, outcome: str) -> None:
+        with self.lock:
+            self.decisions[op, outcome] = self.decisions.get((op, outcome), 0) + 1
+
+    def observe(self, histogram: Histogram, value: float) -> None:
+        with self.lock:
+            histogram.observe(value)
+
+    def render(self, system_management=None) -> str:
+        with self.lock:
+            lines = ["# HELP bankers_decisions_total Requests and releases decided, by outcome.",
+                     "# TYPE bankers_decisions_total counter"]
+            for (op, outcome), value in sorted(self.decisions.items()):
+                lines.append(f'bankers_decisions_total{{op="{op}",outcome="{outcome}"}} {value}')
+            for histogram in (self.lock_wait, self.lock_hold, self.safety_check, self.safety_passes):
+                lines.extend(histogram.render())
+
+        if system_management is not None:
+            # Read without the engine lock: a gauge may be off by one operation, but scraping never stalls requests.
+            allocated = system_management.allocation.sum(axis=0)
+            total = allocated + system_management.available
+            lines += ["# HELP bankers_resource_utilization Share of each resource type currently allocated.",
+                      "# TYPE bankers_resource_utilization gauge"]
+            for k in range(len(total)):
+                utilization = allocated[k] / total[k] if total[k] else 0.0
+                lines.append(f'bankers_resource_utilization{{resource="{k}"}} {utilization:.6f}')
+
+            cache = getattr(system_management, "safety_cache", None)
+            if cache is not None:
+                lines += ["# HELP bankers_safety_cache_lookups_total Full safety checks looked up in the cache.",
+                          "# TYPE bankers_safety_cache_lookups_total counter",
+                          f'bankers_safety_cache_lookups_total{{result="hit"}} {cache.hits}',
+                          f'bankers_safety_cache_lookups_total{{result="miss"}} {cache.misses}',
+                          "# HELP bankers_safety_cache_evictions_total Entries evicted from the safety cache.",
+                          "# TYPE bankers_safety_cache_evictions_total counter",
+                          f"bankers_safety_cache_evictions_total {cache.evictions}",
+                          "# HELP bankers_safety_cache_entries Entries currently in the safety cache.",
+                          "# TYPE bankers_safety_cache_entries gauge",
+                          f"bankers_safety_cache_entries {len(cache.entries)}"]
+
+            leases = getattr(system_management, "leases", None)
+            if leases is not None:
+                lines += ["# HELP bankers_leases_expired_total Leases that ran out and were reclaimed.",
+                          "# TYPE bankers_leases_expired_total counter",
+                          f"bankers_leases_expired_total {leases.expired}",
+                          "# HELP bankers_leases_active Leases currently held.",
+                          "# TYPE bankers_leases_active gauge",
+                          f"bankers_leases_active {leases.active()}"]
+        return "\n".join(lines) + "\n"
+
+
+class InstrumentedLock:
+    """Drop-in for the engine lock that records how long callers wait for it and how long they hold it."""
+
+    def __init__(self, metrics: AllocatorMetrics):
+        self.inner = threading.Lock()
+        self.metrics = metrics
+        self.acquired_at = 0.0
+
+    def acquire(self, blocking=True, timeout=-1) -> bool:
+        start = perf_counter()
+        acquired = self.inner.acquire(blocking, timeout)
+        if acquired:
+            self.acquired_at = perf_counter()
+            self.metrics.observe(self.metrics.lock_wait, self.acquired_at - start)
+        return acquired
+
+    def release(self) -> None:
+        self.metrics.observe(self.metrics.lock_hold, perf_counter() - self.acquired_at)
+        self.inner.release()
+
+    def locked(self) -> bool:
+        return self.inner.locked()
+
+    __enter__ = acquire
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+def start_metrics_server(system_management, host="127.0.0.1", port=9108) -> ThreadingHTTPServer:
+    """Serves GET /metrics for system_management.metrics from a daemon thread; call shutdown() to stop it."""
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != "/metrics":
+                self.send_error(404)
+                return
+            body = system_management.metrics.render(system_management).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
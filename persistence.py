@@ -0,0 +1,289 @@
+"""Write-ahead log and memory-mapped snapshots, so a BankersAlgorithm survives restarts.
+
+A directory holds log segments ``wal-<lsn>.log`` and snapshots ``snapshot-<lsn>.bin``, where lsn is the byte
+position in the log at which the segment starts or which the snapshot covers. Each log record is
+
+    crc32 (uint32) | kind (uint8) | num_process (int64) | word count (uint32) | words (int64 each)
+
+with grants and releases carrying the vector, registrations carrying the new maximum row (all zeros when a process
+is unregistered) and configuration changes carrying the whole SystemState. A snapshot
+is a 32-byte header followed by the SystemState words, so recovery maps it as the live state and replays only the
+segments written after it.
+"""
+import mmap
+import os
+import struct
+import threading
+import zlib
+from time import sleep
+
+import numpy as np
+
+from bankers_algorithm import BankersAlgorithm, SystemState
+
+GRANT, RELEASE, CONFIGURE, REGISTER = 1, 2, 3, 4
+CRC = struct.Struct("<I")
+RECORD = struct.Struct("<BqI")
+SNAPSHOT_HEADER = struct.Struct("<8sQQQ")
+SNAPSHOT_MAGIC = b"BANKSNP1"
+
+
+def segment_path(directory: str, lsn: int) -> str:
+    return os.path.join(directory, f"wal-{lsn:020d}.log")
+
+
+def snapshot_path(directory: str, lsn: int) -> str:
+    return os.path.join(directory, f"snapshot-{lsn:020d}.bin")
+
+
+def list_lsns(directory: str, prefix: str, suffix: str) -> list:
+    return sorted(int(name[len(prefix):-len(suffix)]) for name in os.listdir(directory)
+                  if name.startswith(prefix) and name.endswith(suffix))
+
+
+def fsync_directory(directory: str) -> None:
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class WriteAheadLog:
+    """Append-only log with group commit.
+
+    Records are appended to an in-memory buffer under a short lock. A flusher thread writes and fsyncs whatever
+    has accumulated, so callers that arrive while an fsync is running share the next one.
+    """
+
+    def __init__(self, directory: str, lsn: int, flush_interval=0.0, synchronous=True):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.synchronous = synchronous
+        self.lock = threading.Lock()
+        self.data_ready = threading.Condition(self.lock)
+        self.durable = threading.Condition(self.lock)
+        self.io_lock = threading.Lock()
+        self.buffer = bytearray()
+        self.appended_lsn = lsn
+        self.durable_lsn = lsn
+        self.closed = False
+        self.file = open(segment_path(directory, lsn), "ab")
+        fsync_directory(directory)
+        self.flusher = threading.Thread(target=self.flush_loop, daemon=True)
+        self.flusher.start()
+
+    def append(self, kind: int, num_process: int, words) -> None:
+        body = RECORD.pack(kind, num_process, len(words)) + np.asarray(words, dtype="<i8").tobytes()
+        record = CRC.pack(zlib.crc32(body)) + body
+        with self.lock:
+            self.buffer += record
+            self.appended_lsn += len(record)
+            self.data_ready.notify()
+
+    def log_grant(self, num_process: int, request) -> None:
+        self.append(GRANT, num_process, request)
+
+    def log_release(self, num_process: int, release) -> None:
+        self.append(RELEASE, num_process, release)
+
+    def log_configure(self, state: SystemState) -> None:
+        header = np.array([state.num_processes, state.num_resources], dtype=np.int64)
+        self.append(CONFIGURE, -1, np.concatenate([header, state.words]))
+
+    def log_register(self, num_process: int, maximum_row) -> None:
+        self.append(REGISTER, num_process, maximum_row)
+
+    def wait_durable(self) -> None:
+        if not self.synchronous:
+            return
+        with self.lock:
+            target = self.appended_lsn
+            while self.durable_lsn < target and not self.closed:
+                self.durable.wait()
+
+    def flush_loop(self) -> None:
+        while True:
+            with self.lock:
+                while not self.buffer and not self.closed:
+                    self.data_ready.wait()
+                if self.closed and not self.buffer:
+                    return
+            if self.flush_interval and not self.closed:
+                # Let more records join this fsync.
+                sleep(self.flush_interval)
+            self.flush()
+
+    def flush(self) -> None:
+        with self.io_lock:
+            with self.lock:
+                data, self.buffer = self.buffer, bytearray()
+                target = self.appended_lsn
+            if data:
+                self.file.write(data)
+                self.file.flush()
+                os.fsync(self.file.fileno())
+            with self.lock:
+                self.durable_lsn = max(self.durable_lsn, target)
+                self.durable.notify_all()
+
+    def roll(self) -> int:
+        """Flushes the current segment and starts a new one at the current position, which it returns."""
+        self.flush()
+        with self.io_lock:
+            with self.lock:
+                lsn = self.appended_lsn
+            self.file.close()
+            self.file = open(segment_path(self.directory, lsn), "ab")
+            fsync_directory(self.directory)
+        return lsn
+
+    def close(self) -> None:
+        with self.lock:
+            self.closed = True
+            self.data_ready.notify()
+        self.flusher.join()
+        self.flush()
+        self.file.close()
+
+
+def read_records(path: str):
+    """Yields (kind, num_process, words, end_offset) and stops quietly at a torn or corrupt tail."""
+    with open(path, "rb") as f:
+        data = f.read()
+
+    offset = 0
+    header_size = CRC.size + RECORD.size
+    while offset + header_size <= len(data):
+        (crc,) = CRC.unpack_from(data, offset)
+        kind, num_process, count = RECORD.unpack_from(data, offset + CRC.size)
+        end = offset + header_size + 8 * count
+        if end > len(data) or zlib.crc32(data[offset + CRC.size:end]) != crc:
+            return
+        words = np.frombuffer(data, dtype="<i8", count=count, offset=offset + header_size)
+        offset = end
+        yield kind, num_process, words, offset
+
+
+def write_snapshot(directory: str, lsn: int, num_processes: int, num_resources: int, words: np.ndarray) -> str:
+    path = snapshot_path(directory, lsn)
+    temporary = path + ".tmp"
+    with open(temporary, "wb") as f:
+        f.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, lsn, num_processes, num_resources))
+        f.write(memoryview(np.ascontiguousarray(words, dtype="<i8")).cast("B"))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary, path)
+    fsync_directory(directory)
+    return path
+
+
+def map_snapshot(path: str) -> tuple:
+    """Maps a snapshot copy-on-write and returns (lsn, state); changes to the state never reach the file."""
+    with open(path, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+    magic, lsn, num_processes, num_resources = SNAPSHOT_HEADER.unpack_from(mapped)
+    if magic != SNAPSHOT_MAGIC:
+        raise ValueError(f"{path} is not a snapshot")
+    return lsn, SystemState(num_processes, num_resources, mapped, SNAPSHOT_HEADER.size)
+
+
+def replay(state, kind: int, num_process: int, words: np.ndarray):
+    """Applies one logged record to state and returns the resulting state, without any safety check."""
+    if kind == GRANT:
+        state.allocation[num_process] += words
+        state.need[num_process] -= words
+        state.available -= words
+    elif kind == RELEASE:
+        state.allocation[num_process] -= words
+        state.need[num_process] += words
+        state.available += words
+    elif kind == REGISTER:
+        state.maximum[num_process] = words
+        np.subtract(words, state.allocation[num_process], out=state.need[num_process])
+    elif kind == CONFIGURE:
+        state = SystemState(int(words[0]), int(words[1]))
+        state.words[:] = words[2:]
+    return state
+
+
+class DurableStore:
+    """Keeps one allocator's log and snapshots in directory."""
+
+    def __init__(self, directory: str, flush_interval=0.0, synchronous=True):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.synchronous = synchronous
+        self.wal = None
+        self.snapshot_lock = threading.Lock()
+        self.stop_snapshots = threading.Event()
+        self.snapshot_thread = None
+        os.makedirs(directory, exist_ok=True)
+
+    def open(self, available=None, maximum=None, allocation=None, **engine_kwargs) -> BankersAlgorithm:
+        """Recovers the allocator kept in the directory, or starts one from the given matrices if it is empty.
+
+        The latest snapshot is mapped as the live state and only the log written after it is replayed.
+        """
+        snapshots = list_lsns(self.directory, "snapshot-", ".bin")
+        state, lsn = None, 0
+        if snapshots:
+            lsn, state = map_snapshot(snapshot_path(self.directory, snapshots[-1]))
+
+        for start in [start for start in list_lsns(self.directory, "wal-", ".log") if start >= lsn]:
+            path = segment_path(self.directory, start)
+            valid = 0
+            for kind, num_process, words, valid in read_records(path):
+                state = replay(state, kind, num_process, words)
+            if valid < os.path.getsize(path):
+                # Drop a record torn by the crash, so new records are not appended after garbage.
+                with open(path, "r+b") as f:
+                    f.truncate(valid)
+            lsn = start + valid
+
+        fresh = state is None
+        if fresh:
+            if available is None:
+                raise FileNotFoundError(f"no allocator state in {self.directory} and no initial matrices given")
+            state = SystemState.from_matrices(available, maximum, allocation)
+
+        self.wal = WriteAheadLog(self.directory, lsn, self.flush_interval, self.synchronous)
+        if fresh:
+            self.wal.log_configure(state)
+            self.wal.wait_durable()
+        return BankersAlgorithm.from_state(state, wal=self.wal, **engine_kwargs)
+
+    def snapshot(self, system_management: BankersAlgorithm) -> str:
+        """Writes a snapshot of the current state, then deletes the segments and snapshots it makes redundant."""
+        with self.snapshot_lock:
+            system_management.lock.acquire()
+            try:
+                state = system_management.state
+                words = state.words.copy()
+                lsn = self.wal.roll()
+            finally:
+                system_management.lock.release()
+
+            path = write_snapshot(self.directory, lsn, state.num_processes, state.num_resources, words)
+            for old in list_lsns(self.directory, "snapshot-", ".bin"):
+                if old < lsn:
+                    os.remove(snapshot_path(self.directory, old))
+            for old in list_lsns(self.directory, "wal-", ".log"):
+                if old < lsn:
+                    os.remove(segment_path(self.directory, old))
+            return path
+
+    def start_snapshots(self, system_management: BankersAlgorithm, interval: float) -> None:
+        def loop():
+            while not self.stop_snapshots.wait(interval):
+                self.snapshot(system_management)
+
+        self.snapshot_thread = threading.Thread(target=loop, daemon=True)
+        self.snapshot_thread.start()
+
+    def close(self) -> None:
+        self.stop_snapshots.set()
+        if self.snapshot_thread is not None:
+            self.snapshot_thread.join()
+        if self.wal is not None:
+            self.wal.close()
@@ -0,0 +1,239 @@
+"""Asyncio JSON-lines front end for BankersAlgorithm.
+
+Every line is one JSON message with an "op" of request, release, query, configure, max_request, evaluate, renew,
+release_lease, register or unregister, plus an optional "id" that is echoed back in the response. Messages that
+arrive together on a connection are answered in order, and runs of consecutive requests or releases are coalesced
+into one batched engine call. A request with a "ttl" in seconds is leased, and a granted one is answered with the
+"lease" id to renew or release.
+"""
+import argparse
+import asyncio
+import json
+import math
+import signal
+
+from bankers_algorithm import AVOIDANCE, DEFAULT_PARAMETERS, DETECTION, BankersAlgorithm
+from config_loader import load_configuration
+from metrics import AllocatorMetrics, start_metrics_server
+from persistence import DurableStore
+from trace_replay import TraceRecorder
+from what_if import evaluate_requests, max_safe_requests
+
+READ_CHUNK = 1 << 16
+BATCHED_OPS = ("request", "release")
+# The engine counts resources in int64.
+MAX_RESOURCES = 2 ** 63 - 1
+
+
+class AllocatorServer:
+    def __init__(self, system_management: BankersAlgorithm):
+        self.system_management = system_management
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        loop = asyncio.get_running_loop()
+        pending = b""
+        try:
+            while True:
+                chunk = await reader.read(READ_CHUNK)
+                if not chunk:
+                    break
+
+                *lines, pending = (pending + chunk).split(b"\n")
+                lines = [line for line in lines if line.strip()]
+                if not lines:
+                    continue
+
+                # Engine calls take the engine lock, so they run off the event loop.
+                responses = await loop.run_in_executor(None, self.handle_lines, lines)
+                writer.write(b"".join(json.dumps(response).encode() + b"\n" for response in responses))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    def handle_lines(self, lines: list) -> list:
+        responses = [None] * len(lines)
+        run = []
+        run_op = None
+
+        for i, line in enumerate(lines):
+            message = None
+            try:
+                message = json.loads(line)
+                op = message["op"]
+                if op in BATCHED_OPS:
+                    vector = self.parse_vector(message)
+                    ttl = self.parse_ttl(message) if op == "request" else None
+            except (ValueError, OverflowError, KeyError, TypeError, AttributeError) as error:
+                message_id = message.get("id") if isinstance(message, dict) else None
+                responses[i] = {"id": message_id, "ok": False, "error": f"bad message: {error}"}
+                continue
+
+            if run and op != run_op:
+                self.flush_run(run_op, run, responses)
+                run = []
+
+            if op in BATCHED_OPS:
+                run.append((i, message.get("id"), vector, ttl))
+                run_op = op
+            else:
+                responses[i] = self.handle_single(message)
+
+        if run:
+            self.flush_run(run_op, run, responses)
+        return responses
+
+    def parse_vector(self, message: dict) -> tuple:
+        num_process = int(message["process"])
+        resources = [int(x) for x in message["resources"]]
+        if not self.system_management.is_registered(num_process):
+            raise ValueError(f"no process {num_process}")
+        if (len(resources) != self.system_management.len_resources
+                or not all(0 <= count <= MAX_RESOURCES for count in resources)):
+            raise ValueError(f"expected {self.system_management.len_resources} resources from 0 to {MAX_RESOURCES}")
+        return num_process, resources
+
+    @staticmethod
+    def parse_ttl(message: dict):
+        if message.get("ttl") is None:
+            return None
+        ttl = float(message["ttl"])
+        if not 0 < ttl < math.inf:
+            raise ValueError("ttl must be positive and finite")
+        return ttl
+
+    def flush_run(self, op: str, run: list, responses: list) -> None:
+        vectors = [vector for _, _, vector, _ in run]
+        if op == "request":
+            ttls = [ttl for _, _, _, ttl in run]
+            results = self.system_management.request_resources_batch(
+                vectors, ttls=ttls if any(ttl is not None for ttl in ttls) else None)
+            key = "granted"
+        else:
+            results = self.system_management.release_resources_batch(vectors)
+            key = "released"
+
+        for (i, message_id, _, ttl), result in zip(run, results):
+            responses[i] = {"id": message_id, "ok": True, key: bool(result)}
+            if ttl is not None and result:
+                responses[i]["lease"] = result
+
+    def handle_single(self, message: dict) -> dict:
+        op = message["op"]
+        if op == "query":
+            return {"id": message.get("id"), "ok": True, "state": self.system_management.export_state()}
+        if op in ("max_request", "evaluate"):
+            try:
+                return {"id": message.get("id"), "ok": True, **self.handle_what_if(message)}
+            except (ValueError, OverflowError, KeyError, TypeError) as error:
+                return {"id": message.get("id"), "ok": False, "error": f"bad message: {error}"}
+        if op in ("renew", "release_lease"):
+            try:
+                lease_id = int(message["lease"])
+                if op == "renew":
+                    ttl = self.parse_ttl({"ttl": message["ttl"]})
+                    return {"id": message.get("id"), "ok": True,
+                            "renewed": self.system_management.renew_lease(lease_id, ttl)}
+            except (ValueError, OverflowError, KeyError, TypeError) as error:
+                return {"id": message.get("id"), "ok": False, "error": f"bad message: {error}"}
+            return {"id": message.get("id"), "ok": True, "released": self.system_management.release_lease(lease_id)}
+        if op in ("register", "unregister"):
+            try:
+                if op == "register":
+                    return {"id": message.get("id"), "ok": True,
+                            "process": self.system_management.register_process([int(x) for x in message["maximum"]])}
+                self.system_management.unregister_process(int(message["process"]))
+            except (ValueError, OverflowError, KeyError, TypeError) as error:
+                return {"id": message.get("id"), "ok": False, "error": str(error)}
+            return {"id": message.get("id"), "ok": True}
+        if op == "configure":
+            try:
+                self.system_management.configure(message.get("available"), message.get("maximum"),
+                                                 message.get("allocation"))
+            except (ValueError, OverflowError, TypeError) as error:
+                return {"id": message.get("id"), "ok": False, "error": str(error)}
+            return {"id": message.get("id"), "ok": True}
+        return {"id": message.get("id"), "ok": False, "error": f"unknown op {op!r}"}
+
+    def handle_what_if(self, message: dict) -> dict:
+        """Answers read-only queries; they run on a snapshot and never take part in a batch."""
+        if message["op"] == "max_request":
+            if message.get("process") is None:
+                return {"requests": max_safe_requests(self.system_management).tolist()}
+            num_process, _ = self.parse_vector({"process": message["process"],
+                                                "resources": [0] * self.system_management.len_resources})
+            return {"request": max_safe_requests(self.system_management, [num_process])[0].tolist()}
+
+        requests = [self.parse_vector({"process": num_process, "resources": resources})
+                    for num_process, resources in message["requests"]]
+        return {"safe": evaluate_requests(self.system_management, requests)}
+
+
+async def serve(system_management: BankersAlgorithm, host="127.0.0.1", port=8765, unix_path=None) -> None:
+    allocator = AllocatorServer(system_management)
+    if unix_path:
+        server = await asyncio.start_unix_server(allocator.handle_connection, path=unix_path)
+    else:
+        server = await asyncio.start_server(allocator.handle_connection, host, port)
+
+    async with server:
+        await server.serve_forever()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve a Banker's algorithm allocator over JSON lines.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", dest="unix_path", help="listen on this Unix socket instead of TCP")
+    parser.add_argument("--optimistic", action="store_true", help="use the optimistic concurrency mode")
+    parser.add_argument("--config", help="start from the system in this .csv, JSON-lines file or .npy directory")
+    parser.add_argument("--metrics-port", type=int, help="serve Prometheus metrics on this port at /metrics")
+    parser.add_argument("--data-dir", help="log every change to this directory and recover from it on start")
+    parser.add_argument("--snapshot-interval", type=float, default=60.0,
+                        help="seconds between snapshots of the state in --data-dir, 0 to disable")
+    parser.add_argument("--trace", help="record every request and release to this trace file")
+    parser.add_argument("--policy", choices=[AVOIDANCE, DETECTION], default=AVOIDANCE,
+                        help="check safety on every request, or grant what fits and detect deadlocks afterwards")
+    parser.add_argument("--detection-interval", type=float, default=1.0,
+                        help="seconds between deadlock detection runs under the detection policy")
+    parser.add_argument("--preempt", action="store_true",
+                        help="preempt the cheapest deadlocked processes instead of only reporting deadlocks")
+    parser.add_argument("--safety-cache", type=int, default=0,
+                        help="remember the verdicts of this many full safety checks by state fingerprint")
+    args = parser.parse_args()
+
+    metrics = AllocatorMetrics() if args.metrics_port else None
+    engine_kwargs = {"optimistic": args.optimistic, "metrics": metrics, "policy": args.policy,
+                     "detection_interval": args.detection_interval, "preempt_victims": args.preempt,
+                     "safety_cache_size": args.safety_cache}
+    configuration = load_configuration(args.config) if args.config else DEFAULT_PARAMETERS
+    store = None
+    if args.data_dir:
+        # A configuration only seeds an empty data directory; an existing one is recovered as it was.
+        store = DurableStore(args.data_dir)
+        system_management = store.open(configuration["available"], configuration["maximum"],
+                                       configuration["allocation"], **engine_kwargs)
+        if args.snapshot_interval:
+            store.start_snapshots(system_management, args.snapshot_interval)
+    else:
+        system_management = BankersAlgorithm(configuration["available"], configuration["maximum"],
+                                             configuration["allocation"], **engine_kwargs)
+    if metrics is not None:
+        start_metrics_server(system_management, args.host, args.metrics_port)
+    recorder = TraceRecorder(args.trace, system_management) if args.trace else None
+    # Shut down through the same path as Ctrl-C, so the log and the trace are flushed.
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        asyncio.run(serve(system_management, args.host, args.port, args.unix_path))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if recorder is not None:
+            recorder.stop()
+        if store is not None:
+            store.close()
+
+
+if __name__ == '__main__':
+    main()
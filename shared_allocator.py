@@ -0,0 +1,172 @@
+"""BankersAlgorithm backed by a multiprocessing.shared_memory block, so worker processes can share one state.
+
+The block holds a small header, then a SystemState (available, maximum, allocation and need) and the cached safe
+sequence, all as fixed-width int64 arrays. Every process maps them as NumPy views without copying, and all
+mutations happen under a multiprocessing lock that the creating process hands to its workers together with the block
+name.
+"""
+import multiprocessing
+from multiprocessing.shared_memory import SharedMemory
+from time import perf_counter
+
+import numpy as np
+
+from bankers_algorithm import DEFAULT_PARAMETERS, BankersAlgorithm, SystemState
+
+WORD = np.dtype(np.int64).itemsize
+HEADER_WORDS = 3
+NUM_PROCESSES, NUM_RESOURCES, SEQUENCE_VALID = range(HEADER_WORDS)
+
+
+def shared_size(num_processes: int, num_resources: int) -> int:
+    return WORD * (HEADER_WORDS + SystemState.words_needed(num_processes, num_resources) + 2 * num_processes)
+
+
+class SharedBankersAlgorithm(BankersAlgorithm):
+    """BankersAlgorithm whose matrices and cached safe sequence live in shared memory.
+
+    Build it with create() in the parent and call attach() with connection_args() in each worker process.
+    Blocking requests are only woken by releases made in their own process, so give them a timeout.
+    """
+
+    def __init__(self, shm: SharedMemory, lock, owner=False, safety_engine=None, max_retries=8):
+        self.shm = shm
+        self.owner = owner
+        self.header = np.ndarray((HEADER_WORDS,), dtype=np.int64, buffer=shm.buf)
+        num_processes, num_resources = int(self.header[NUM_PROCESSES]), int(self.header[NUM_RESOURCES])
+        shared_state = SystemState(num_processes, num_resources, shm.buf, HEADER_WORDS * WORD)
+        offset = WORD * (HEADER_WORDS + SystemState.words_needed(num_processes, num_resources))
+        self.views = {
+            "safe_sequence": np.ndarray((num_processes,), dtype=np.int64, buffer=shm.buf, offset=offset),
+            "sequence_position": np.ndarray((num_processes,), dtype=np.int64, buffer=shm.buf,
+                                            offset=offset + WORD * num_processes),
+        }
+
+        self.init_engine(shared_state, safety_engine, max_retries=max_retries)
+        self.lock = lock
+
+    @classmethod
+    def create(cls, available, maximum, allocation, safety_engine=None, max_retries=8, context=None):
+        """Allocates the block and the lock; pass the multiprocessing context the workers will be started from."""
+        num_processes, num_resources = np.shape(maximum)
+        shm = SharedMemory(create=True, size=shared_size(num_processes, num_resources))
+
+        header = np.ndarray((HEADER_WORDS,), dtype=np.int64, buffer=shm.buf)
+        header[:] = (num_processes, num_resources, 0)
+        del header
+        SystemState.from_matrices(available, maximum, allocation, shm.buf, HEADER_WORDS * WORD)
+
+        context = context if context is not None else multiprocessing.get_context()
+        return cls(shm, context.Lock(), True, safety_engine, max_retries)
+
+    @classmethod
+    def attach(cls, name: str, lock, safety_engine=None, max_retries=8):
+        return cls(SharedMemory(name=name), lock, False, safety_engine, max_retries)
+
+    def connection_args(self) -> tuple:
+        """Arguments for attach() in a worker process, which has to receive the lock when it is started."""
+        return self.shm.name, self.lock
+
+    # The cached safe sequence is kept in the shared block, so a grant in one process keeps it valid for all.
+    @property
+    def safe_sequence(self):
+        return self.views["safe_sequence"] if self.header[SEQUENCE_VALID] else None
+
+    @safe_sequence.setter
+    def safe_sequence(self, sequence):
+        # Only None is ever assigned, by engine start-up and invalidate_safe_sequence. Start-up runs without the
+        # lock while other processes may be using the shared sequence, so only the latter clears the flag.
+        pass
+
+    @property
+    def sequence_position(self):
+        return self.views["sequence_position"] if self.header[SEQUENCE_VALID] else None
+
+    @sequence_position.setter
+    def sequence_position(self, position):
+        pass
+
+    def cache_safe_sequence(self, sequence) -> None:
+        self.views["safe_sequence"][:] = sequence
+        self.views["sequence_position"][self.views["safe_sequence"]] = np.arange(len(sequence))
+        self.header[SEQUENCE_VALID] = 1
+
+    def invalidate_safe_sequence(self) -> None:
+        super().invalidate_safe_sequence()
+        self.header[SEQUENCE_VALID] = 0
+
+    def configure(self, available=None, maximum=None, allocation=None) -> None:
+        """Same as BankersAlgorithm.configure, but the shape of the shared block cannot change."""
+        self.lock.acquire()
+        try:
+            for target, value in ((self.available, available), (self.maximum, maximum),
+                                  (self.allocation, allocation)):
+                if value is not None and np.shape(value) != target.shape:
+                    raise ValueError(f"expected shape {target.shape}, got {np.shape(value)}")
+            for target, value in ((self.available, available), (self.maximum, maximum),
+                                  (self.allocation, allocation)):
+                if value is not None:
+                    target[:] = value
+            np.subtract(self.maximum, self.allocation, out=self.need)
+            self.record_configure()
+            self.invalidate_safe_sequence()
+            self.wake_waiters(np.ones(self.len_resources, dtype=np.int64))
+        finally:
+            self.lock.release()
+
+    def reserve(self, num_processes) -> None:
+        if num_processes > len(self.maximum):
+            raise ValueError(f"the shared block holds {len(self.maximum)} process slots and cannot grow")
+
+    def take_free_slot(self) -> int:
+        """Finds a free slot in the shared matrices, since another process may have taken or freed one."""
+        free = np.flatnonzero(~self.maximum.any(axis=1))
+        if not len(free):
+            raise ValueError("every process slot of the shared block is in use")
+        return int(free[0])
+
+    def close(self) -> None:
+        """Drops this process's mapping; the creating process also removes the block."""
+        self.views = {}
+        self.header = None
+        self.state = self.available = self.maximum = self.allocation = self.need = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def run_worker(name: str, lock, seed: int, operations: int, results) -> None:
+    system_management = SharedBankersAlgorithm.attach(name, lock)
+    rng = np.random.default_rng(seed)
+    num_processes = len(system_management.allocation)
+    console_info = []
+    for _ in range(operations):
+        num_process = int(rng.integers(num_processes))
+        vector = rng.integers(0, 2, system_management.len_resources).tolist()
+        if rng.random() < 0.6:
+            system_management.request_resources(num_process, vector, console_info)
+        else:
+            system_management.release_resources(num_process, vector, console_info)
+    results.put(sum(1 for entry in console_info if entry[0]))
+    system_management.close()
+
+
+if __name__ == '__main__':
+    workers, operations = multiprocessing.cpu_count(), 20000
+    shared = SharedBankersAlgorithm.create(DEFAULT_PARAMETERS["available"], DEFAULT_PARAMETERS["maximum"],
+                                           DEFAULT_PARAMETERS["allocation"])
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=run_worker, args=(*shared.connection_args(), seed, operations, results))
+                 for seed in range(workers)]
+    start = perf_counter()
+    for p in processes:
+        p.start()
+    succeeded = sum(results.get() for _ in processes)
+    for p in processes:
+        p.join()
+    elapsed = perf_counter() - start
+
+    print(f"{workers} workers, {workers * operations} operations in {elapsed:.3f}s "
+          f"({workers * operations / elapsed:.0f} ops/s), {succeeded} succeeded")
+    print(shared.return_str_current_state_of_system())
+    shared.close()
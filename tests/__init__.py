@@ -0,0 +1 @@
+"""Behaviour tests for the Banker's algorithm allocator. Run with ``python -m pytest`` from the repository root."""
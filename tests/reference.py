@@ -0,0 +1,48 @@
+"""A textbook Banker's algorithm on plain lists, to check the engines against."""
+import numpy as np
+
+
+def random_system(rng, num_processes, num_resources, max_units=6) -> tuple:
+    """Returns available, maximum and allocation for a random safe state."""
+    while True:
+        maximum = rng.integers(0, max_units + 1, (num_processes, num_resources))
+        maximum[np.arange(num_processes), rng.integers(0, num_resources, num_processes)] += 1
+        allocation = rng.integers(0, maximum + 1)
+        available = rng.integers(0, max_units + 1, num_resources)
+        if is_safe(available.tolist(), maximum.tolist(), allocation.tolist()):
+            return available.tolist(), maximum.tolist(), allocation.tolist()
+
+
+def is_safe(available, maximum, allocation) -> bool:
+    work = list(available)
+    finished = [False] * len(maximum)
+    progress = True
+    while progress:
+        progress = False
+        for p, (maximum_row, allocation_row) in enumerate(zip(maximum, allocation)):
+            if not finished[p] and all(m - a <= w for m, a, w in zip(maximum_row, allocation_row, work)):
+                work = [w + a for w, a in zip(work, allocation_row)]
+                finished[p] = progress = True
+    return all(finished)
+
+
+def sequence_is_safe(available, maximum, allocation, sequence) -> bool:
+    """Whether every process can finish in the order given by sequence."""
+    if sorted(sequence) != list(range(len(maximum))):
+        return False
+    work = list(available)
+    for p in sequence:
+        if any(m - a > w for m, a, w in zip(maximum[p], allocation[p], work)):
+            return False
+        work = [w + a for w, a in zip(work, allocation[p])]
+    return True
+
+
+def grant_is_safe(available, maximum, allocation, num_process, request) -> bool:
+    """Whether request would be granted: it fits the need and what is available, and leaves the state safe."""
+    need = [m - a for m, a in zip(maximum[num_process], allocation[num_process])]
+    if any(r > n or r > w for r, n, w in zip(request, need, available)):
+        return False
+    allocation = [list(row) for row in allocation]
+    allocation[num_process] = [a + r for a, r in zip(allocation[num_process], request)]
+    return is_safe([w - r for w, r in zip(available, request)], maximum, allocation)
@@ -0,0 +1,73 @@
+"""Blocking requests: parking on the resource types a request is short of and waking on releases."""
+import threading
+from time import monotonic, sleep
+
+import pytest
+
+from bankers_algorithm import BankersAlgorithm
+
+
+def wait_until_parked(system_management, resource, timeout=5.0) -> None:
+    deadline = monotonic() + timeout
+    while not system_management.waiters[resource]:
+        assert monotonic() < deadline, "the request never parked"
+        sleep(0.001)
+
+
+def start_waiting(system_management, num_process, request, console_info, timeout=5.0) -> threading.Thread:
+    thread = threading.Thread(target=system_management.request_resources, args=(num_process, request, console_info),
+                              kwargs={"wait": True, "timeout": timeout})
+    thread.start()
+    return thread
+
+
+@pytest.mark.parametrize("optimistic", [False, True])
+def test_release_wakes_a_waiting_request(optimistic):
+    system_management = BankersAlgorithm([1, 1], [[2, 2], [2, 2]], [[1, 1], [0, 0]], optimistic=optimistic)
+    console_info = []
+
+    thread = start_waiting(system_management, 1, [2, 0], console_info)
+    wait_until_parked(system_management, 0)
+    system_management.release_resources(0, [1, 1], [])
+    thread.join()
+
+    assert console_info[-1][0] is True
+    assert system_management.allocation.tolist() == [[0, 0], [2, 0]]
+    assert not any(system_management.waiters)
+
+
+def test_release_of_another_resource_leaves_the_request_parked():
+    system_management = BankersAlgorithm([1, 1], [[2, 2], [2, 2]], [[1, 1], [0, 0]])
+    console_info = []
+
+    thread = start_waiting(system_management, 1, [2, 0], console_info)
+    wait_until_parked(system_management, 0)
+    system_management.release_resources(0, [0, 1], [])
+    sleep(0.05)
+    assert thread.is_alive() and not console_info
+
+    system_management.release_resources(0, [1, 0], [])
+    thread.join()
+    assert console_info[-1][0] is True
+
+
+def test_waiting_request_times_out():
+    system_management = BankersAlgorithm([1, 1], [[2, 2], [2, 2]], [[1, 1], [0, 0]])
+    console_info = []
+
+    start = monotonic()
+    system_management.request_resources(1, [2, 0], console_info, wait=True, timeout=0.05)
+
+    assert console_info[-1][0] is False
+    assert monotonic() - start >= 0.05
+    assert system_management.allocation.tolist() == [[1, 1], [0, 0]]
+    assert not any(system_management.waiters)
+
+
+def test_request_above_the_need_is_refused_without_waiting():
+    system_management = BankersAlgorithm([1, 1], [[2, 2], [2, 2]], [[1, 1], [0, 0]])
+    console_info = []
+
+    system_management.request_resources(1, [3, 0], console_info, wait=True)
+
+    assert console_info[-1][0] is False
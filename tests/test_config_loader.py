@@ -0,0 +1,124 @@
+"""Reading configurations from CSV, JSON lines and .npy files, and applying row updates atomically."""
+import json
+
+import numpy as np
+import pytest
+
+from bankers_algorithm import BankersAlgorithm
+from config_loader import apply_update, load_configuration, read_update
+from tests.reference import is_safe
+
+AVAILABLE = [3, 3, 2]
+MAXIMUM = [[7, 5, 3], [3, 2, 2], [9, 0, 2], [2, 2, 2]]
+ALLOCATION = [[0, 1, 0], [2, 0, 0], [3, 0, 2], [2, 1, 1]]
+
+
+def write_csv(path, lines) -> str:
+    path.write_text("\n".join(lines) + "\n")
+    return str(path)
+
+
+def test_csv_rows_in_any_order_load_a_whole_system(tmp_path):
+    path = write_csv(tmp_path / "system.csv", [
+        "matrix,process,values",
+        "# rows may come in any order",
+        "allocation,0,0,1,0",
+        "maximum,0,7,5,3",
+        "maximum,1,3,2,2",
+        "available,,3,3,2",
+        "allocation,1,2,0,0",
+        "maximum,2,9,0,2",
+        "allocation,2,3,0,2",
+        "maximum,3,2,2,2",
+        "allocation,3,2,1,1",
+    ])
+
+    configuration = load_configuration(path)
+
+    assert configuration["available"].tolist() == AVAILABLE
+    assert configuration["maximum"].tolist() == MAXIMUM
+    assert configuration["allocation"].tolist() == ALLOCATION
+
+
+def test_json_lines_mix_rows_and_whole_matrices(tmp_path):
+    path = tmp_path / "update.jsonl"
+    path.write_text("\n".join(json.dumps(record) for record in [
+        {"available": AVAILABLE, "allocation": ALLOCATION},
+        {"matrix": "maximum", "process": 1, "values": [4, 2, 2]},
+        {"matrix": "maximum", "process": 3, "values": [2, 2, 3]},
+    ]) + "\n")
+
+    update = read_update(str(path))
+
+    assert not update.is_complete()
+    assert update.available.tolist() == AVAILABLE
+    assert update.maximum[0].tolist() == [1, 3]
+    assert update.maximum[1].tolist() == [[4, 2, 2], [2, 2, 3]]
+    assert update.allocation[0].tolist() == [0, 1, 2, 3]
+    assert np.asarray(update.allocation[1]).tolist() == ALLOCATION
+
+
+def test_npy_directory_is_memory_mapped(tmp_path):
+    np.save(tmp_path / "available.npy", np.array(AVAILABLE, dtype=np.int64))
+    np.save(tmp_path / "maximum.npy", np.array(MAXIMUM, dtype=np.int64))
+    np.save(tmp_path / "allocation.npy", np.array(ALLOCATION, dtype=np.int32))
+
+    update = read_update(str(tmp_path))
+
+    assert update.is_complete()
+    assert isinstance(update.maximum[1], np.memmap)
+    assert update.allocation[1].dtype == np.int64 and update.allocation[1].tolist() == ALLOCATION
+    system_management = BankersAlgorithm(**load_configuration(str(tmp_path)))
+    assert system_management.need.tolist() == (np.array(MAXIMUM) - ALLOCATION).tolist()
+
+
+@pytest.mark.parametrize("lines", [
+    ["maximum,0,7,5", "maximum,1,3,2"],
+    ["maximum,0,7,5,3", "maximum,1,3,2,x"],
+    # Rows of unequal width whose total still adds up to a whole number of rows.
+    ["maximum,0,7,5,3", "maximum,1,3,2,2,1", "maximum,2,9,0"],
+    ["minimum,0,7,5,3"],
+])
+def test_malformed_csv_is_rejected(tmp_path, lines):
+    with pytest.raises(ValueError):
+        read_update(write_csv(tmp_path / "bad.csv", ["available,,3,3,2"] + lines))
+
+
+@pytest.mark.parametrize("optimistic", [False, True])
+def test_row_update_is_applied_with_one_safety_check(tmp_path, optimistic):
+    system_management = BankersAlgorithm(AVAILABLE, MAXIMUM, ALLOCATION, optimistic=optimistic)
+    path = write_csv(tmp_path / "update.csv", ["maximum,0,5,5,3", "allocation,3,2,2,1", "available,,3,2,2"])
+
+    apply_update(system_management, read_update(path))
+
+    assert system_management.maximum.tolist()[0] == [5, 5, 3]
+    assert system_management.allocation.tolist()[3] == [2, 2, 1]
+    assert system_management.available.tolist() == [3, 2, 2]
+    assert (system_management.need == system_management.maximum - system_management.allocation).all()
+    assert is_safe([3, 2, 2], system_management.maximum.tolist(), system_management.allocation.tolist())
+    if optimistic:
+        assert system_management.snapshot.allocation.tolist() == system_management.allocation.tolist()
+        assert system_management.snapshot.need.tolist() == system_management.need.tolist()
+
+
+@pytest.mark.parametrize("optimistic", [False, True])
+@pytest.mark.parametrize("lines, error", [
+    (["allocation,1,3,2,3"], "exceeds the maximum"),
+    (["available,,0,0,0"], "unsafe"),
+    (["maximum,1,3,2,2", "maximum,2,9,9,9", "allocation,0,1,1,1"], "unsafe"),
+])
+def test_rejected_update_leaves_the_state_unchanged(tmp_path, optimistic, lines, error):
+    system_management = BankersAlgorithm(AVAILABLE, MAXIMUM, ALLOCATION, optimistic=optimistic)
+    system_management.request_resources(1, [1, 0, 0], [])
+    before = {name: getattr(system_management, name).tolist() for name in ("available", "maximum", "allocation",
+                                                                            "need")}
+    snapshot = system_management.snapshot
+
+    with pytest.raises(ValueError, match=error):
+        apply_update(system_management, read_update(write_csv(tmp_path / "update.csv", lines)))
+
+    for name, value in before.items():
+        assert getattr(system_management, name).tolist() == value, name
+    assert system_management.snapshot is snapshot
+    system_management.request_resources(1, [0, 2, 0], [])
+    assert system_management.allocation.tolist()[1] == [3, 2, 0]
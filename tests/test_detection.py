@@ -0,0 +1,83 @@
+"""The detection policy: grants without a safety check, deadlock detection among blocked requests, preemption."""
+import threading
+from time import monotonic, sleep
+
+from bankers_algorithm import DETECTION, BankersAlgorithm
+from what_if import evaluate_requests, max_safe_requests
+
+
+def detecting_engine(**kwargs) -> BankersAlgorithm:
+    """Two processes holding half of a single resource type each, which is unsafe but allowed under detection."""
+    system_management = BankersAlgorithm([4], [[4], [4]], [[0], [0]], policy=DETECTION, detection_interval=60,
+                                         **kwargs)
+    console_info = []
+    system_management.request_resources(0, [2], console_info)
+    system_management.request_resources(1, [2], console_info)
+    assert [entry[0] for entry in console_info] == [True, True]
+    return system_management
+
+
+def block_both(system_management, timeout) -> tuple:
+    console_infos = ([], [])
+    threads = [threading.Thread(target=system_management.request_resources, args=(p, [2], console_infos[p]),
+                                kwargs={"wait": True, "timeout": timeout}) for p in (0, 1)]
+    for thread in threads:
+        thread.start()
+    deadline = monotonic() + 5
+    while len(set().union(*system_management.waiters)) < 2:
+        assert monotonic() < deadline, "the requests never parked"
+        sleep(0.001)
+    return threads, console_infos
+
+
+def test_deadlock_is_reported_without_preempting():
+    reported = []
+    system_management = detecting_engine(on_deadlock=lambda *args: reported.append(args))
+    threads, console_infos = block_both(system_management, timeout=0.5)
+
+    assert system_management.check_for_deadlock() == [0, 1]
+    for thread in threads:
+        thread.join()
+    system_management.stop_deadlock_detection()
+
+    assert reported == [([0, 1], [])]
+    assert [console_info[-1][0] for console_info in console_infos] == [False, False]
+    assert system_management.allocation.tolist() == [[2], [2]]
+
+
+def test_preempting_the_cheapest_process_lets_the_other_one_through():
+    reported = []
+    system_management = detecting_engine(preempt_victims=True, on_deadlock=lambda *args: reported.append(args))
+    threads, console_infos = block_both(system_management, timeout=5)
+
+    assert system_management.check_for_deadlock() == [0, 1]
+    for thread in threads:
+        thread.join()
+    system_management.stop_deadlock_detection()
+
+    assert reported == [([0, 1], [0])]
+    assert [console_info[-1][0] for console_info in console_infos] == [False, True]
+    assert system_management.allocation.tolist() == [[0], [4]]
+    assert system_management.check_for_deadlock() == []
+
+
+def test_processes_that_are_not_blocked_are_never_deadlocked():
+    system_management = detecting_engine()
+
+    assert system_management.check_for_deadlock() == []
+    system_management.stop_deadlock_detection()
+
+
+def test_what_if_queries_do_not_trust_a_sequence_cached_before_unchecked_grants():
+    system_management = BankersAlgorithm([0], [[4], [4]], [[0], [0]], policy=DETECTION, detection_interval=60)
+    system_management.update_rows(available=[4])
+    assert system_management.safe_sequence is not None
+    console_info = []
+    system_management.request_resources(0, [2], console_info)
+    system_management.request_resources(1, [2], console_info)
+    system_management.stop_deadlock_detection()
+
+    assert [entry[0] for entry in console_info] == [True, True]
+    assert system_management.safe_sequence is None
+    assert evaluate_requests(system_management, [(0, [0]), (1, [0])]) == [False, False]
+    assert max_safe_requests(system_management).tolist() == [[0], [0]]
@@ -0,0 +1,144 @@
+"""Leases: expiry through the timer wheel and reclaiming against concurrent releases and unregistrations."""
+from time import sleep
+
+import pytest
+
+from bankers_algorithm import BankersAlgorithm
+from components import ComponentBankersAlgorithm
+from leases import LeaseManager
+
+
+def stopped_lease_manager(system_management, tick=0.01):
+    """Installs a lease manager whose expired leases are only reclaimed when the test asks."""
+    system_management.leases = LeaseManager(system_management, tick=tick)
+    system_management.leases.stop()
+    system_management.leases.thread.join()
+    return system_management.leases
+
+
+def test_expired_lease_is_released():
+    system_management = BankersAlgorithm([4, 4], [[3, 3], [2, 2]], [[0, 0], [0, 0]])
+    leases = stopped_lease_manager(system_management)
+
+    lease_id = system_management.request_resources(0, [2, 1], [], ttl=0.02)
+    system_management.request_resources(1, [1, 1], [])
+    assert lease_id and leases.active() == 1
+    assert leases.reclaim_expired() == 0
+
+    sleep(0.05)
+    assert leases.reclaim_expired() == 1
+    assert system_management.allocation.tolist() == [[0, 0], [1, 1]]
+    assert system_management.available.tolist() == [3, 3]
+    assert leases.active() == 0 and leases.expired == 1
+    assert not system_management.renew_lease(lease_id, 1.0)
+
+
+def test_renewed_lease_does_not_expire():
+    system_management = BankersAlgorithm([4, 4], [[3, 3]], [[0, 0]])
+    leases = stopped_lease_manager(system_management)
+
+    lease_id = system_management.request_resources(0, [1, 1], [], ttl=0.02)
+    assert system_management.renew_lease(lease_id, 10.0)
+    sleep(0.05)
+    assert leases.reclaim_expired() == 0
+    assert system_management.allocation.tolist() == [[1, 1]]
+    assert system_management.release_lease(lease_id)
+    assert system_management.allocation.tolist() == [[0, 0]]
+
+
+def test_expiry_is_clipped_to_what_is_still_held():
+    system_management = BankersAlgorithm([4, 4], [[3, 3]], [[0, 0]])
+    leases = stopped_lease_manager(system_management)
+
+    system_management.request_resources(0, [2, 2], [], ttl=0.02)
+    system_management.release_resources(0, [1, 2], [])
+    sleep(0.05)
+    assert leases.reclaim_expired() == 1
+    assert system_management.allocation.tolist() == [[0, 0]]
+    assert system_management.available.tolist() == [4, 4]
+
+
+@pytest.mark.parametrize("engine, options", [(BankersAlgorithm, {}), (BankersAlgorithm, {"optimistic": True}),
+                                             (ComponentBankersAlgorithm, {})])
+def test_released_lease_does_not_expire_onto_a_later_grant(engine, options):
+    system_management = engine([4, 4], [[3, 3]], [[0, 0]], **options)
+    leases = stopped_lease_manager(system_management)
+
+    system_management.request_resources(0, [2, 2], [], ttl=0.02)
+    system_management.release_resources(0, [2, 2], [])
+    system_management.request_resources(0, [2, 2], [])
+    sleep(0.05)
+    assert leases.reclaim_expired() == 1
+    assert system_management.allocation.tolist() == [[2, 2]]
+
+
+def test_releases_are_taken_off_the_oldest_lease_first():
+    system_management = BankersAlgorithm([6, 6], [[5, 5]], [[0, 0]])
+    leases = stopped_lease_manager(system_management)
+
+    first = system_management.request_resources(0, [2, 2], [], ttl=10.0)
+    second = system_management.request_resources(0, [1, 1], [], ttl=10.0)
+    system_management.request_resources(0, [1, 1], [])
+    system_management.release_resources_batch([(0, [3, 1])])
+    assert system_management.allocation.tolist() == [[1, 3]]
+
+    assert system_management.release_lease(first)
+    assert system_management.allocation.tolist() == [[1, 2]]
+    assert system_management.release_lease(second)
+    assert system_management.allocation.tolist() == [[1, 1]]
+    assert leases.active() == 0 and not leases.reclaiming
+
+
+class SlotReusedBeforeReclaim(BankersAlgorithm):
+    """Unregisters process 0 and registers a new one into its slot just before an expiry batch is released."""
+
+    def release_resources_batch(self, releases, console_info=None, clip=False) -> list:
+        if clip:
+            self.unregister_process(0)
+            assert self.register_process([3, 3]) == 0
+            self.request_resources(0, [1, 1], [])
+        return super().release_resources_batch(releases, console_info, clip)
+
+
+def test_expiry_does_not_release_from_the_next_process_in_the_slot():
+    system_management = SlotReusedBeforeReclaim([4, 4], [[3, 3]], [[0, 0]])
+    leases = stopped_lease_manager(system_management)
+
+    system_management.request_resources(0, [2, 2], [], ttl=0.02)
+    sleep(0.05)
+    leases.reclaim_expired()
+    assert system_management.allocation.tolist() == [[1, 1]]
+    assert system_management.available.tolist() == [3, 3]
+
+
+class SlotReusedAfterGrant:
+    """Hands the slot of process 0 to a new process once, right after the lock that granted a request is released."""
+    reuse = False
+
+    def wait_durable(self) -> None:
+        super().wait_durable()
+        if self.reuse:
+            self.reuse = False
+            self.unregister_process(0)
+            assert self.register_process([3, 3]) == 0
+
+
+@pytest.mark.parametrize("engine, options", [(BankersAlgorithm, {}), (BankersAlgorithm, {"optimistic": True}),
+                                             (ComponentBankersAlgorithm, {})])
+@pytest.mark.parametrize("batch", [False, True])
+def test_lease_is_taken_out_before_the_slot_can_be_reused(engine, options, batch):
+    system_management = type("Engine", (SlotReusedAfterGrant, engine), {})([4, 4], [[3, 3]], [[0, 0]], **options)
+    leases = stopped_lease_manager(system_management)
+
+    system_management.reuse = True
+    if batch:
+        [lease_id] = system_management.request_resources_batch([(0, [2, 2])], ttls=[0.02])
+    else:
+        lease_id = system_management.request_resources(0, [2, 2], [], ttl=0.02)
+    assert lease_id and not system_management.reuse
+    assert leases.active() == 0 and not system_management.renew_lease(lease_id, 1.0)
+
+    system_management.request_resources(0, [1, 1], [])
+    sleep(0.05)
+    assert leases.reclaim_expired() == 0
+    assert system_management.allocation.tolist() == [[1, 1]]
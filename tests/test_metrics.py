@@ -0,0 +1,65 @@
+"""Prometheus metrics recorded by an instrumented engine."""
+from urllib.request import urlopen
+
+from bankers_algorithm import BankersAlgorithm
+from metrics import LATENCY_BUCKETS, AllocatorMetrics, Histogram, start_metrics_server
+
+
+def samples(text: str) -> dict:
+    return dict(line.rsplit(" ", 1) for line in text.splitlines() if not line.startswith("#"))
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("latency_seconds", "Latency.", (1, 2, 4))
+    for value in (0.5, 1, 3, 3, 10):
+        histogram.observe(value)
+
+    assert histogram.render() == [
+        "# HELP latency_seconds Latency.",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{le="1"} 2',
+        'latency_seconds_bucket{le="2"} 2',
+        'latency_seconds_bucket{le="4"} 4',
+        'latency_seconds_bucket{le="+Inf"} 5',
+        "latency_seconds_sum 17.5",
+        "latency_seconds_count 5",
+    ]
+
+
+def test_decisions_lock_times_and_utilization_are_rendered():
+    metrics = AllocatorMetrics()
+    system_management = BankersAlgorithm([4, 4], [[3, 3], [4, 4]], [[0, 0], [0, 0]], metrics=metrics)
+
+    system_management.request_resources(0, [2, 1], [])
+    system_management.request_resources(1, [2, 2], [])
+    system_management.request_resources(0, [5, 0], [])
+    system_management.release_resources(0, [1, 0], [])
+    system_management.release_resources(1, [1, 0], [])
+    rendered = samples(metrics.render(system_management))
+
+    assert rendered['bankers_decisions_total{op="request",outcome="granted"}'] == "1"
+    assert rendered['bankers_decisions_total{op="request",outcome="denied_unsafe"}'] == "1"
+    assert rendered['bankers_decisions_total{op="request",outcome="denied_invalid"}'] == "1"
+    assert rendered['bankers_decisions_total{op="release",outcome="released"}'] == "1"
+    assert rendered['bankers_decisions_total{op="release",outcome="denied_invalid"}'] == "1"
+    assert int(rendered["bankers_lock_hold_seconds_count"]) >= 5
+    assert int(rendered["bankers_lock_wait_seconds_count"]) == int(rendered["bankers_lock_hold_seconds_count"])
+    assert f'bankers_lock_wait_seconds_bucket{{le="{LATENCY_BUCKETS[0]}"}}' in rendered
+    assert int(rendered["bankers_safety_check_passes_count"]) >= 1
+    assert rendered['bankers_resource_utilization{resource="0"}'] == "0.250000"
+    assert rendered['bankers_resource_utilization{resource="1"}'] == "0.250000"
+
+
+def test_metrics_server_serves_the_rendered_text():
+    metrics = AllocatorMetrics()
+    system_management = BankersAlgorithm([4, 4], [[3, 3]], [[0, 0]], metrics=metrics)
+    system_management.request_resources(0, [1, 1], [])
+    server = start_metrics_server(system_management, port=0)
+    try:
+        with urlopen(f"http://127.0.0.1:{server.server_address[1]}/metrics") as response:
+            body = response.read().decode()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert samples(body)['bankers_decisions_total{op="request",outcome="granted"}'] == "1"
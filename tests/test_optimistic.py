@@ -0,0 +1,71 @@
+"""Optimistic mode: published snapshots and lock-free requests racing each other."""
+import threading
+
+import numpy as np
+
+from bankers_algorithm import BankersAlgorithm
+from tests.reference import is_safe, random_system
+
+
+def test_snapshots_keep_the_state_they_were_published_for():
+    rng = np.random.default_rng(2)
+    system_management = BankersAlgorithm(*random_system(rng, 8, 3), optimistic=True)
+    console_info = []
+    published = []
+
+    for _ in range(300):
+        num_process = int(rng.integers(8))
+        if rng.random() < 0.6:
+            system_management.request_resources(num_process, rng.integers(0, 3, 3), console_info)
+        else:
+            system_management.release_resources(num_process, rng.integers(0, 3, 3), console_info)
+        published.append((system_management.snapshot, system_management.allocation.copy(),
+                          system_management.need.copy()))
+
+    processes = np.array([5, 0, 7, 2])
+    for snapshot, allocation, need in published:
+        # Rows are read before the matrices are rebuilt, and later commits must not have changed either.
+        for num_process in range(8):
+            allocation_row, need_row = snapshot.row(num_process)
+            assert allocation_row.tolist() == allocation[num_process].tolist()
+            assert need_row.tolist() == need[num_process].tolist()
+        allocation_rows, need_rows = snapshot.rows(processes)
+        assert allocation_rows.tolist() == allocation[processes].tolist()
+        assert need_rows.tolist() == need[processes].tolist()
+        assert snapshot.allocation.tolist() == allocation.tolist()
+        assert snapshot.need.tolist() == need.tolist()
+
+
+def test_concurrent_requests_and_releases_conserve_resources():
+    rng = np.random.default_rng(3)
+    available, maximum, allocation = random_system(rng, 16, 3)
+    system_management = BankersAlgorithm(available, maximum, allocation, optimistic=True, max_retries=2)
+    total = (system_management.available + system_management.allocation.sum(axis=0)).tolist()
+    errors = []
+
+    def work(seed):
+        rng = np.random.default_rng(seed)
+        try:
+            for _ in range(500):
+                num_process = int(rng.integers(16))
+                if rng.random() < 0.6:
+                    system_management.request_resources(num_process, rng.integers(0, 3, 3), [])
+                else:
+                    system_management.release_resources(num_process, rng.integers(0, 3, 3), [])
+        except Exception as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=work, args=(seed,)) for seed in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors, errors
+    assert (system_management.available + system_management.allocation.sum(axis=0)).tolist() == total
+    assert (system_management.need == system_management.maximum - system_management.allocation).all()
+    assert (system_management.need >= 0).all() and (system_management.available >= 0).all()
+    assert is_safe(system_management.available.tolist(), system_management.maximum.tolist(),
+                   system_management.allocation.tolist())
+    assert system_management.snapshot.version == system_management.version
+    assert system_management.snapshot.allocation.tolist() == system_management.allocation.tolist()
@@ -0,0 +1,60 @@
+"""Recovering an allocator from its snapshot and write-ahead log."""
+import os
+
+import numpy as np
+
+from persistence import DurableStore
+from tests.reference import random_system
+
+
+def run_operations(system_management, rng, count) -> None:
+    console_info = []
+    for _ in range(count):
+        num_process = int(rng.integers(len(system_management.maximum)))
+        if not system_management.is_registered(num_process):
+            continue
+        vector = rng.integers(0, 2, system_management.len_resources)
+        if rng.random() < 0.6:
+            system_management.request_resources(num_process, vector, console_info)
+        else:
+            system_management.release_resources(num_process, vector, console_info)
+
+
+def test_snapshot_and_log_replay_restore_the_state(tmp_path):
+    rng = np.random.default_rng(4)
+    store = DurableStore(str(tmp_path))
+    system_management = store.open(*random_system(rng, 6, 3))
+
+    run_operations(system_management, rng, 200)
+    store.snapshot(system_management)
+    # Registering grows the state past the snapshot, so the log alone has to carry the new slots.
+    new_processes = [system_management.register_process([1, 1, 1]) for _ in range(4)]
+    system_management.unregister_process(new_processes[1])
+    run_operations(system_management, rng, 200)
+    expected = system_management.state.words.copy()
+    store.close()
+
+    assert len([name for name in os.listdir(tmp_path) if name.startswith("snapshot-")]) == 1
+    recovered_store = DurableStore(str(tmp_path))
+    recovered = recovered_store.open()
+    try:
+        assert recovered.state.words.tolist() == expected.tolist()
+        assert not recovered.is_registered(new_processes[1])
+        assert recovered.register_process([1, 0, 0]) == new_processes[1]
+    finally:
+        recovered_store.close()
+
+
+def test_recovery_without_a_snapshot_replays_the_whole_log(tmp_path):
+    rng = np.random.default_rng(5)
+    store = DurableStore(str(tmp_path))
+    system_management = store.open(*random_system(rng, 5, 2))
+    run_operations(system_management, rng, 100)
+    expected = system_management.state.words.copy()
+    store.close()
+
+    recovered_store = DurableStore(str(tmp_path))
+    try:
+        assert recovered_store.open().state.words.tolist() == expected.tolist()
+    finally:
+        recovered_store.close()
@@ -0,0 +1,106 @@
+"""Registering and unregistering processes while optimistic requests are in flight."""
+import threading
+
+import numpy as np
+
+from bankers_algorithm import BankersAlgorithm
+from tests.reference import is_safe
+
+
+class SlotReusedDuringCheck(BankersAlgorithm):
+    """Reuses slot 1 for a smaller process between the lock-free check of a request and its commit."""
+
+    def check_request_on_snapshot(self, snapshot, num_process, request):
+        verdict = super().check_request_on_snapshot(snapshot, num_process, request)
+        if not getattr(self, "reused", False):
+            self.reused = True
+            self.unregister_process(1)
+            assert self.register_process([1, 0]) == 1
+        return verdict
+
+
+def test_reused_slot_invalidates_an_optimistic_verdict():
+    system_management = SlotReusedDuringCheck([3, 3], [[1, 1], [3, 0]], [[0, 0], [0, 0]], optimistic=True)
+    console_info = []
+
+    system_management.request_resources(1, [3, 0], console_info)
+
+    # The request fit the process that held slot 1 when it was checked, not the one holding it at commit.
+    assert console_info[-1][0] is False
+    assert system_management.allocation[1].tolist() == [0, 0]
+    assert (system_management.need >= 0).all()
+
+
+def test_register_and_unregister_keep_optimistic_snapshots_current():
+    system_management = BankersAlgorithm([4, 4], [[2, 2]], [[1, 1]], optimistic=True)
+    console_info = []
+
+    new_processes = [system_management.register_process([1, 1]) for _ in range(10)]
+    for num_process in new_processes:
+        system_management.request_resources(num_process, [0, 1], console_info)
+    system_management.unregister_process(new_processes[0])
+
+    snapshot = system_management.snapshot
+    assert snapshot.version == system_management.version
+    assert (snapshot.allocation == system_management.allocation).all()
+    assert (snapshot.need == system_management.need).all()
+    assert system_management.register_process([2, 0]) == new_processes[0]
+    assert system_management.snapshot.row(new_processes[0])[1].tolist() == [2, 0]
+
+
+def test_request_for_a_slot_newer_than_the_snapshot_is_decided_under_the_lock():
+    system_management = BankersAlgorithm([8, 8], [[3, 3]] * 4, [[1, 1]] * 4, optimistic=True)
+    published = system_management.snapshot
+    new_processes = [system_management.register_process([1, 1]) for _ in range(8)]
+    # What a reader sees between the state growing and the snapshot of the grown state being published.
+    system_management.snapshot = published
+    console_info = []
+
+    system_management.request_resources(new_processes[-1], [1, 1], console_info)
+
+    assert console_info[-1][0] is True
+    assert system_management.allocation[new_processes[-1]].tolist() == [1, 1]
+
+
+def test_registration_churn_under_concurrent_optimistic_requests():
+    system_management = BankersAlgorithm([8, 8, 8], [[3, 3, 3]] * 4, [[1, 1, 1]] * 4, optimistic=True)
+    total = (system_management.available + system_management.allocation.sum(axis=0)).tolist()
+    stop = threading.Event()
+    errors = []
+
+    def work(seed):
+        rng = np.random.default_rng(seed)
+        try:
+            while not stop.is_set():
+                num_process = int(rng.integers(len(system_management.maximum)))
+                if rng.random() < 0.6:
+                    system_management.request_resources(num_process, rng.integers(0, 2, 3), [])
+                else:
+                    system_management.release_resources(num_process, rng.integers(0, 2, 3), [])
+        except Exception as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=work, args=(seed,)) for seed in range(4)]
+    for thread in threads:
+        thread.start()
+    rng = np.random.default_rng(0)
+    live = list(range(4))
+    for _ in range(300):
+        if len(live) < 3 or rng.random() < 0.5:
+            live.append(system_management.register_process(rng.integers(1, 4, 3)))
+        else:
+            system_management.unregister_process(live.pop(int(rng.integers(len(live)))))
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    assert not errors, errors
+    assert (system_management.available + system_management.allocation.sum(axis=0)).tolist() == total
+    assert (system_management.need == system_management.maximum - system_management.allocation).all()
+    assert (system_management.need >= 0).all()
+    assert sorted(system_management.free_slots + live) == list(range(len(system_management.maximum)))
+    assert is_safe(system_management.available.tolist(), system_management.maximum.tolist(),
+                   system_management.allocation.tolist())
+    snapshot = system_management.snapshot
+    assert (snapshot.allocation == system_management.allocation).all()
+    assert (snapshot.need == system_management.need).all()
@@ -0,0 +1,100 @@
+"""Grant decisions of every engine mode against the reference Banker's algorithm on random streams."""
+import numpy as np
+import pytest
+
+from bankers_algorithm import BankersAlgorithm
+from components import ComponentBankersAlgorithm
+from tests.reference import grant_is_safe, random_system, sequence_is_safe
+
+ENGINES = {
+    "locked": lambda *matrices: BankersAlgorithm(*matrices),
+    "optimistic": lambda *matrices: BankersAlgorithm(*matrices, optimistic=True),
+    "cached": lambda *matrices: BankersAlgorithm(*matrices, safety_cache_size=64),
+    "components": lambda *matrices: ComponentBankersAlgorithm(*matrices),
+}
+
+
+@pytest.mark.parametrize("mode", ENGINES)
+@pytest.mark.parametrize("seed", range(5))
+def test_decisions_match_the_reference(mode, seed):
+    rng = np.random.default_rng(seed)
+    available, maximum, allocation = random_system(rng, 8, 3)
+    system_management = ENGINES[mode](available, maximum, allocation)
+    console_info = []
+
+    for _ in range(400):
+        num_process = int(rng.integers(len(maximum)))
+        vector = rng.integers(0, 3, len(available)).tolist()
+        if rng.random() < 0.6:
+            expected = grant_is_safe(available, maximum, allocation, num_process, vector)
+            system_management.request_resources(num_process, vector, console_info)
+            sign = 1
+        else:
+            expected = all(v <= a for v, a in zip(vector, allocation[num_process]))
+            system_management.release_resources(num_process, vector, console_info)
+            sign = -1
+        assert console_info[-1][0] == expected, (num_process, vector)
+        if expected:
+            allocation[num_process] = [a + sign * v for a, v in zip(allocation[num_process], vector)]
+            available = [w - sign * v for w, v in zip(available, vector)]
+
+    assert system_management.available.tolist() == available
+    assert system_management.allocation.tolist() == allocation
+
+
+@pytest.mark.parametrize("mode", ["locked", "optimistic", "cached"])
+def test_batches_match_the_reference(mode):
+    rng = np.random.default_rng(11)
+    available, maximum, allocation = random_system(rng, 8, 3)
+    system_management = ENGINES[mode](available, maximum, allocation)
+
+    for _ in range(50):
+        requests = [(int(rng.integers(len(maximum))), rng.integers(0, 3, len(available)).tolist()) for _ in range(6)]
+        granted = system_management.request_resources_batch(requests)
+        for (num_process, vector), was_granted in zip(requests, granted):
+            assert was_granted == grant_is_safe(available, maximum, allocation, num_process, vector)
+            if was_granted:
+                allocation[num_process] = [a + v for a, v in zip(allocation[num_process], vector)]
+                available = [w - v for w, v in zip(available, vector)]
+        system_management.release_resources_batch([(p, allocation[p]) for p in range(0, len(maximum), 2)])
+        for p in range(0, len(maximum), 2):
+            available = [w + a for w, a in zip(available, allocation[p])]
+            allocation[p] = [0] * len(available)
+
+    assert system_management.available.tolist() == available
+    assert system_management.allocation.tolist() == allocation
+
+
+def test_cached_sequence_is_a_safe_order():
+    rng = np.random.default_rng(7)
+    available, maximum, allocation = random_system(rng, 8, 3)
+    system_management = BankersAlgorithm(available, maximum, allocation)
+    console_info = []
+
+    for _ in range(400):
+        num_process = int(rng.integers(len(maximum)))
+        if rng.random() < 0.6:
+            system_management.request_resources(num_process, rng.integers(0, 3, 3), console_info)
+        else:
+            system_management.release_resources(num_process, rng.integers(0, 3, 3), console_info)
+        if system_management.safe_sequence is not None:
+            assert sequence_is_safe(system_management.available.tolist(), maximum,
+                                    system_management.allocation.tolist(), system_management.safe_sequence.tolist())
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_prefix_check_matches_the_reference_across_blocks(seed):
+    rng = np.random.default_rng(seed)
+    count = int(rng.integers(1, 300))
+    allocation = rng.integers(0, 4, (count, 3))
+    available = rng.integers(0, 8, 3)
+    # Needs up to the running work vector, with one row pushed past it on odd seeds.
+    work = np.cumsum(allocation, axis=0) - allocation + available
+    need = rng.integers(0, work + 1)
+    if seed % 2:
+        need[rng.integers(count), rng.integers(3)] += work.max() + 1
+
+    expected = sequence_is_safe(available.tolist(), (allocation + need).tolist(), allocation.tolist(),
+                                list(range(count)))
+    assert expected == (seed % 2 == 0)
+    assert BankersAlgorithm.rows_finish_in_order(allocation, available, need) == expected
@@ -0,0 +1,112 @@
+"""The JSON-lines server: answers in order, coalesced requests and releases, and error replies."""
+import asyncio
+import json
+
+from bankers_algorithm import BankersAlgorithm
+from server import AllocatorServer
+
+
+class CountingAllocator(BankersAlgorithm):
+    """Records the batched engine calls made by the server."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.batches = []
+
+    def request_resources_batch(self, requests, *args, **kwargs):
+        self.batches.append(("request", len(requests)))
+        return super().request_resources_batch(requests, *args, **kwargs)
+
+    def release_resources_batch(self, releases, *args, **kwargs):
+        self.batches.append(("release", len(releases)))
+        return super().release_resources_batch(releases, *args, **kwargs)
+
+
+def encode(*messages) -> list:
+    return [json.dumps(message).encode() for message in messages]
+
+
+def test_runs_of_requests_and_releases_are_coalesced():
+    system_management = CountingAllocator([4, 4], [[3, 3], [3, 3]], [[0, 0], [0, 0]])
+    server = AllocatorServer(system_management)
+
+    responses = server.handle_lines(encode(
+        {"op": "request", "id": 1, "process": 0, "resources": [1, 1]},
+        {"op": "request", "id": 2, "process": 1, "resources": [2, 1]},
+        {"op": "release", "id": 3, "process": 0, "resources": [1, 0]},
+        {"op": "release", "id": 4, "process": 1, "resources": [3, 0]},
+        {"op": "query", "id": 5},
+        {"op": "request", "id": 6, "process": 0, "resources": [1, 0]},
+    ))
+
+    assert system_management.batches == [("request", 2), ("release", 2), ("request", 1)]
+    assert [response["id"] for response in responses] == [1, 2, 3, 4, 5, 6]
+    assert [response.get("granted", response.get("released")) for response in responses] == [
+        True, True, True, False, None, True]
+    assert responses[4]["state"]["allocation"] == [[0, 1], [2, 1]]
+    assert system_management.allocation.tolist() == [[1, 1], [2, 1]]
+
+
+def test_bad_messages_are_answered_without_breaking_the_batch():
+    system_management = CountingAllocator([4, 4], [[3, 3], [3, 3]], [[0, 0], [0, 0]])
+    server = AllocatorServer(system_management)
+
+    responses = server.handle_lines([b"{not json"] + encode(
+        {"id": 1, "process": 0, "resources": [1, 1]},
+        {"op": "request", "id": 2, "process": 7, "resources": [1, 1]},
+        {"op": "request", "id": 3, "process": 0, "resources": [1]},
+        {"op": "request", "id": 4, "process": 0, "resources": [-1, 1]},
+        {"op": "request", "id": 5, "process": 0, "resources": [1, 1]},
+        {"op": "shutdown", "id": 6},
+    ))
+
+    assert [response["ok"] for response in responses] == [False, False, False, False, False, True, False]
+    assert [response["id"] for response in responses] == [None, 1, 2, 3, 4, 5, 6]
+    assert all(response["error"].startswith("bad message") for response in responses[:5])
+    assert responses[6]["error"] == "unknown op 'shutdown'"
+    assert system_management.batches == [("request", 1)]
+    assert system_management.allocation.tolist() == [[1, 1], [0, 0]]
+
+
+def test_numbers_out_of_the_int64_range_are_answered_as_bad_messages():
+    system_management = CountingAllocator([4, 4], [[3, 3], [3, 3]], [[0, 0], [0, 0]])
+    server = AllocatorServer(system_management)
+
+    responses = server.handle_lines([b'{"op": "request", "id": 1, "process": 0, "resources": [1e400, 1]}'] + encode(
+        {"op": "request", "id": 2, "process": 0, "resources": [2 ** 70, 1]},
+        {"op": "release", "id": 3, "process": 1, "resources": [2 ** 63, 0]},
+        {"op": "request", "id": 4, "process": 0, "resources": [1, 1], "ttl": 1e400},
+        {"op": "evaluate", "id": 5, "requests": [[0, [2 ** 64, 0]]]},
+        {"op": "register", "id": 6, "maximum": [2 ** 70, 1]},
+        {"op": "configure", "id": 7, "available": [2 ** 70, 1]},
+        {"op": "request", "id": 8, "process": 0, "resources": [1, 1]},
+    ))
+
+    assert [response["ok"] for response in responses] == [False] * 7 + [True]
+    assert [response["id"] for response in responses] == list(range(1, 9))
+    assert system_management.batches == [("request", 1)]
+    assert system_management.allocation.tolist() == [[1, 1], [0, 0]]
+
+
+def test_lines_sent_together_are_answered_in_order_over_a_connection():
+    system_management = BankersAlgorithm([4, 4], [[3, 3], [3, 3]], [[0, 0], [0, 0]])
+
+    async def exchange() -> list:
+        server = await asyncio.start_server(AllocatorServer(system_management).handle_connection, "127.0.0.1", 0)
+        async with server:
+            reader, writer = await asyncio.open_connection(*server.sockets[0].getsockname()[:2])
+            writer.write(b"\n".join(encode(
+                {"op": "request", "id": "a", "process": 0, "resources": [2, 2]},
+                {"op": "request", "id": "b", "process": 1, "resources": [3, 3]},
+                {"op": "release", "id": "c", "process": 0, "resources": [2, 2]},
+            )) + b"\n")
+            await writer.drain()
+            responses = [json.loads(await reader.readline()) for _ in range(3)]
+            writer.close()
+            await writer.wait_closed()
+        return responses
+
+    responses = asyncio.run(exchange())
+
+    assert [(response["id"], response["ok"]) for response in responses] == [("a", True), ("b", True), ("c", True)]
+    assert responses[0]["granted"] is True and responses[1]["granted"] is False and responses[2]["released"] is True
@@ -0,0 +1,52 @@
+"""The shared-memory allocator: one state mapped by several engines and worker processes."""
+import multiprocessing
+
+import numpy as np
+
+from shared_allocator import SharedBankersAlgorithm, run_worker
+from tests.reference import is_safe, random_system, sequence_is_safe
+
+
+def test_attached_engine_shares_the_state_and_the_cached_sequence():
+    shared = SharedBankersAlgorithm.create([4, 4], [[3, 3], [2, 2]], [[0, 0], [0, 0]])
+    attached = SharedBankersAlgorithm.attach(*shared.connection_args())
+    try:
+        shared.request_resources(0, [1, 1], [])
+        assert attached.allocation.tolist() == [[1, 1], [0, 0]]
+        assert attached.safe_sequence is not None
+        assert attached.safe_sequence.tolist() == shared.safe_sequence.tolist()
+
+        attached.release_resources(0, [1, 0], [])
+        assert shared.available.tolist() == [4, 3]
+        assert shared.need.tolist() == [[3, 2], [2, 2]]
+    finally:
+        attached.close()
+        shared.close()
+
+
+def test_worker_processes_keep_the_shared_state_consistent():
+    rng = np.random.default_rng(6)
+    context = multiprocessing.get_context()
+    shared = SharedBankersAlgorithm.create(*random_system(rng, 8, 3), context=context)
+    total = (shared.available + shared.allocation.sum(axis=0)).tolist()
+    results = context.Queue()
+    workers = [context.Process(target=run_worker, args=(*shared.connection_args(), seed, 300, results))
+               for seed in range(4)]
+    try:
+        for worker in workers:
+            worker.start()
+        succeeded = sum(results.get(timeout=60) for _ in workers)
+        for worker in workers:
+            worker.join()
+
+        assert all(worker.exitcode == 0 for worker in workers)
+        assert succeeded > 0
+        assert (shared.available + shared.allocation.sum(axis=0)).tolist() == total
+        assert (shared.need == shared.maximum - shared.allocation).all()
+        assert (shared.need >= 0).all() and (shared.available >= 0).all()
+        maximum, allocation = shared.maximum.tolist(), shared.allocation.tolist()
+        assert is_safe(shared.available.tolist(), maximum, allocation)
+        if shared.safe_sequence is not None:
+            assert sequence_is_safe(shared.available.tolist(), maximum, allocation, shared.safe_sequence.tolist())
+    finally:
+        shared.close()
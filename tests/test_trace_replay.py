@@ -0,0 +1,81 @@
+"""Recording a trace and replaying it against a fresh engine."""
+import numpy as np
+import pytest
+
+from bankers_algorithm import BankersAlgorithm
+from trace_replay import APPLIED, DENIED, GRANTED, REFUSED, TraceRecorder, replay
+
+
+def test_replay_follows_registrations_and_growth(tmp_path):
+    rng = np.random.default_rng(3)
+    system_management = BankersAlgorithm([6, 6], [[2, 2], [3, 1]], [[1, 0], [0, 1]])
+    recorder = TraceRecorder(str(tmp_path / "trace.bin"), system_management)
+    expected = []
+
+    live = [0, 1]
+    for step in range(300):
+        choice = rng.random()
+        if choice < 0.15:
+            capacity = len(system_management.maximum)
+            live.append(system_management.register_process(rng.integers(0, 3, 2) + np.eye(2, dtype=np.int64)[step % 2]))
+            # Registering into a full state also records the resize that made room.
+            expected.extend([APPLIED] * (1 + (len(system_management.maximum) > capacity)))
+        elif choice < 0.25 and len(live) > 1:
+            system_management.unregister_process(live.pop(int(rng.integers(len(live)))))
+            expected.append(APPLIED)
+        else:
+            num_process = live[int(rng.integers(len(live)))]
+            console_info = []
+            if rng.random() < 0.6:
+                system_management.request_resources(num_process, rng.integers(0, 2, 2), console_info)
+                expected.append(GRANTED if console_info[-1][0] else DENIED)
+            else:
+                system_management.release_resources(num_process, rng.integers(0, 2, 2), console_info)
+                expected.append(GRANTED if console_info[-1][0] else REFUSED)
+    recorder.stop()
+
+    report = replay(str(tmp_path / "trace.bin"), batch_size=8, utilization_every=0)
+
+    assert len(system_management.maximum) > 2
+    assert report["events"] == len(expected)
+    assert list(report["outcomes"]) == expected
+
+
+def test_vectors_beyond_int32_are_recorded_and_replayed(tmp_path):
+    system_management = BankersAlgorithm([2 ** 40, 5], [[2 ** 40, 5]], [[0, 0]])
+    recorder = TraceRecorder(str(tmp_path / "trace.bin"), system_management)
+    console_info = []
+
+    system_management.request_resources(0, [2 ** 40, 1], console_info)
+    system_management.request_resources(0, [2 ** 33, 0], console_info)
+    system_management.release_resources_batch([(0, [2 ** 39, 0]), (0, [2 ** 45, 0])])
+    recorder.stop()
+
+    assert [entry[0] for entry in console_info] == [True, False]
+    report = replay(str(tmp_path / "trace.bin"))
+    assert list(report["outcomes"]) == [GRANTED, DENIED, GRANTED, REFUSED]
+
+
+@pytest.mark.parametrize("optimistic", [False, True])
+def test_failed_recording_releases_the_engine_lock(optimistic):
+    system_management = BankersAlgorithm([4, 4], [[3, 3]], [[0, 0]], optimistic=optimistic)
+
+    class FailingRecorder:
+        def record_request(self, num_process, request):
+            raise OSError("disk full")
+
+        record_release = record_request
+
+    system_management.recorder = FailingRecorder()
+    for call in (lambda: system_management.request_resources(0, [1, 1], []),
+                 lambda: system_management.request_resources_batch([(0, [1, 1])]),
+                 lambda: system_management.release_resources(0, [1, 1], []),
+                 lambda: system_management.release_resources_batch([(0, [1, 1])])):
+        with pytest.raises(OSError):
+            call()
+        assert not system_management.lock.locked()
+
+    system_management.recorder = None
+    console_info = []
+    system_management.request_resources(0, [1, 1], console_info)
+    assert console_info[-1][0] is True
@@ -0,0 +1,37 @@
+"""What-if queries against the reference Banker's algorithm."""
+import numpy as np
+import pytest
+
+from bankers_algorithm import BankersAlgorithm
+from components import ComponentBankersAlgorithm
+from tests.reference import grant_is_safe, random_system
+from what_if import evaluate_requests, max_safe_requests
+
+
+@pytest.mark.parametrize("engine", [BankersAlgorithm, ComponentBankersAlgorithm])
+@pytest.mark.parametrize("seed", range(5))
+def test_max_safe_requests_are_safe_and_maximal(engine, seed):
+    rng = np.random.default_rng(seed)
+    available, maximum, allocation = random_system(rng, 6, 3)
+    system_management = engine(available, maximum, allocation)
+
+    for num_process, row in enumerate(max_safe_requests(system_management).tolist()):
+        assert grant_is_safe(available, maximum, allocation, num_process, row)
+        for k in range(len(row)):
+            larger = row[:k] + [row[k] + 1] + row[k + 1:]
+            assert not grant_is_safe(available, maximum, allocation, num_process, larger), (num_process, k)
+
+
+@pytest.mark.parametrize("optimistic", [False, True])
+def test_evaluate_requests_matches_the_reference_and_changes_nothing(optimistic):
+    rng = np.random.default_rng(8)
+    available, maximum, allocation = random_system(rng, 6, 3)
+    system_management = BankersAlgorithm(available, maximum, allocation, optimistic=optimistic)
+    # Caches a safe sequence, so verdicts can come from its prefix check as well as from full searches.
+    system_management.request_resources(0, [0, 0, 0], [])
+    requests = [(int(rng.integers(6)), rng.integers(0, 3, 3).tolist()) for _ in range(100)]
+
+    verdicts = evaluate_requests(system_management, requests)
+
+    assert verdicts == [grant_is_safe(available, maximum, allocation, *request) for request in requests]
+    assert system_management.allocation.tolist() == allocation
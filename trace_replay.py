@@ -0,0 +1,260 @@
+"""Recording of request/release streams into a compact binary trace, and max-speed offline replay.
+
+A trace starts with a header and the SystemState words at the moment recording began, followed by events:
+
+    kind (uint8) | num_process (uint32) | nanoseconds since recording began (uint64) | vector (int64 each)
+
+Events are recorded under the engine lock, in the order they were decided. A configure event, written whenever the
+matrices are replaced or updated outside requests and releases, carries the number of processes in num_process and
+is followed by the whole new SystemState as int64 words. A register event carries the maximum of the new process, an
+unregister event what the process still held, and a resize event the new number of process slots in num_process.
+Replay streams the events in chunks, so traces larger than memory can be replayed.
+"""
+import argparse
+import json
+import struct
+import threading
+from array import array
+from time import perf_counter_ns
+
+import numpy as np
+
+from bankers_algorithm import BankersAlgorithm, SystemState
+
+REQUEST, RELEASE, CONFIGURE, REGISTER, UNREGISTER, RESIZE = 1, 2, 3, 4, 5, 6
+TRACE_HEADER = struct.Struct("<8sII")
+# Version 2 widened the vectors from int32 to int64, so version 1 traces are refused rather than misread.
+TRACE_MAGIC = b"BANKTRC2"
+CHUNK_EVENTS = 4096
+# Outcome codes kept per event for diffing: denied, granted or released, refused release, and applied configuration,
+# registration or resize.
+DENIED, GRANTED, REFUSED, APPLIED = 0, 1, 2, 3
+
+
+def event_struct(num_resources: int) -> struct.Struct:
+    return struct.Struct(f"<BIQ{num_resources}q")
+
+
+class TraceRecorder:
+    """Appends every request, release, registration and configuration change of system_management to a trace file
+    until stop().
+    """
+
+    def __init__(self, path: str, system_management: BankersAlgorithm):
+        self.system_management = system_management
+        self.event = event_struct(system_management.len_resources)
+        self.lock = threading.Lock()
+        self.file = open(path, "wb", buffering=1 << 20)
+
+        system_management.lock.acquire()
+        try:
+            state = system_management.state
+            self.file.write(TRACE_HEADER.pack(TRACE_MAGIC, state.num_processes, state.num_resources))
+            self.file.write(memoryview(np.ascontiguousarray(state.words, dtype="<i8")).cast("B"))
+            self.start = perf_counter_ns()
+            system_management.recorder = self
+        finally:
+            system_management.lock.release()
+
+    def record(self, kind: int, num_process: int, vector) -> None:
+        record = self.event.pack(kind, num_process, perf_counter_ns() - self.start, *vector.tolist())
+        with self.lock:
+            self.file.write(record)
+
+    def record_request(self, num_process: int, request) -> None:
+        self.record(REQUEST, num_process, request)
+
+    def record_release(self, num_process: int, release) -> None:
+        self.record(RELEASE, num_process, release)
+
+    def record_configure(self, state: SystemState) -> None:
+        record = self.event.pack(CONFIGURE, state.num_processes, perf_counter_ns() - self.start,
+                                 *[0] * state.num_resources)
+        words = memoryview(np.ascontiguousarray(state.words, dtype="<i8")).cast("B")
+        with self.lock:
+            self.file.write(record)
+            self.file.write(words)
+
+    def record_register(self, num_process: int, maximum_row) -> None:
+        self.record(REGISTER, num_process, maximum_row)
+
+    def record_unregister(self, num_process: int, released) -> None:
+        self.record(UNREGISTER, num_process, released)
+
+    def record_resize(self, num_processes: int) -> None:
+        self.record(RESIZE, num_processes, np.zeros(self.system_management.len_resources, dtype=np.int64))
+
+    def stop(self) -> None:
+        self.system_management.recorder = None
+        with self.lock:
+            self.file.close()
+
+
+class TraceReader:
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            magic, self.num_processes, self.num_resources = TRACE_HEADER.unpack(f.read(TRACE_HEADER.size))
+            if magic != TRACE_MAGIC:
+                raise ValueError(f"{path} is not a trace")
+            words = SystemState.words_needed(self.num_processes, self.num_resources)
+            self.initial_words = np.frombuffer(f.read(8 * words), dtype="<i8")
+            self.events_offset = f.tell()
+        self.event = event_struct(self.num_resources)
+
+    def initial_state(self) -> SystemState:
+        state = SystemState(self.num_processes, self.num_resources)
+        state.words[:] = self.initial_words
+        return state
+
+    def events(self):
+        """Yields (kind, num_process, timestamp_ns, vector) tuples, reading CHUNK_EVENTS events' worth at a time.
+
+        For configure events vector is the SystemState words that follow the event.
+        """
+        size = self.event.size
+        chunk_size = size * CHUNK_EVENTS
+        with open(self.path, "rb") as f:
+            f.seek(self.events_offset)
+            data = b""
+            while True:
+                more = f.read(chunk_size)
+                data += more
+                offset = 0
+                while offset + size <= len(data):
+                    kind, num_process, timestamp, *vector = self.event.unpack_from(data, offset)
+                    end = offset + size
+                    if kind == CONFIGURE:
+                        words = SystemState.words_needed(num_process, self.num_resources)
+                        end += 8 * words
+                        if end > len(data):
+                            break
+                        vector = np.frombuffer(data, dtype="<i8", count=words, offset=offset + size).copy()
+                    yield kind, num_process, timestamp, vector
+                    offset = end
+                data = data[offset:]
+                if not more:
+                    return
+
+
+def replay(path: str, batch_size=1, maximize_grants=False, utilization_every=1000, **engine_kwargs) -> dict:
+    """Replays a trace as fast as possible against a fresh engine built from the trace's initial state.
+
+    Runs of up to batch_size events of the same kind go through the batch calls. Returns counts, engine cost per
+    event, utilization sampled every utilization_every events and the outcome of each event.
+    """
+    reader = TraceReader(path)
+    system_management = BankersAlgorithm.from_state(reader.initial_state(), **engine_kwargs)
+    outcomes = bytearray()
+    costs = array("d")
+    utilization = []
+    run, run_kind = [], None
+
+    def flush():
+        start = perf_counter_ns()
+        if run_kind == REQUEST:
+            results = system_management.request_resources_batch(run, maximize_grants)
+            outcomes.extend(GRANTED if granted else DENIED for granted in results)
+        else:
+            results = system_management.release_resources_batch(run)
+            outcomes.extend(GRANTED if released else REFUSED for released in results)
+        costs.extend([(perf_counter_ns() - start) / len(run)] * len(run))
+
+    events = 0
+    for kind, num_process, timestamp, vector in reader.events():
+        if run and (kind != run_kind or len(run) >= batch_size):
+            flush()
+            run = []
+        if kind in (REQUEST, RELEASE):
+            run.append((num_process, vector))
+        else:
+            start = perf_counter_ns()
+            apply_change(system_management, reader, kind, num_process, vector)
+            costs.append(perf_counter_ns() - start)
+            outcomes.append(APPLIED)
+        run_kind = kind
+        events += 1
+        if utilization_every and events % utilization_every == 0:
+            allocated = system_management.allocation.sum(axis=0)
+            total = np.maximum(allocated + system_management.available, 1)
+            utilization.append({"event": events, "timestamp_ns": timestamp,
+                                "utilization": round(float((allocated / total).mean()), 6)})
+    if run:
+        flush()
+
+    codes = np.frombuffer(bytes(outcomes), dtype=np.uint8)
+    costs = np.frombuffer(costs, dtype=np.float64) if costs else np.zeros(1)
+    report = {
+        "events": events,
+        "granted_or_released": int((codes == GRANTED).sum()),
+        "denied": int((codes == DENIED).sum()),
+        "refused_releases": int((codes == REFUSED).sum()),
+        "configurations": int((codes == APPLIED).sum()),
+        "engine_seconds": round(float(costs.sum()) / 1e9, 6),
+        "engine_ns_per_event_p50": round(float(np.percentile(costs, 50)), 1),
+        "engine_ns_per_event_p99": round(float(np.percentile(costs, 99)), 1),
+        "utilization": utilization,
+        "outcomes": outcomes,
+    }
+    if system_management.safety_cache is not None:
+        report["safety_cache"] = system_management.safety_cache.stats()
+    return report
+
+
+def apply_change(system_management: BankersAlgorithm, reader: TraceReader, kind: int, num_process: int,
+                 vector) -> None:
+    """Applies a configure, register, unregister or resize event."""
+    if kind == CONFIGURE:
+        state = SystemState(num_process, reader.num_resources)
+        state.words[:] = vector
+        system_management.configure(state.available, state.maximum, state.allocation)
+    elif kind == REGISTER:
+        registered = system_management.register_process(vector)
+        if registered != num_process:
+            raise ValueError(f"trace registered process {num_process}, replay registered {registered}")
+    elif kind == UNREGISTER:
+        system_management.unregister_process(num_process)
+    elif kind == RESIZE:
+        system_management.reserve(num_process)
+    else:
+        raise ValueError(f"unknown trace event kind {kind}")
+
+
+def diff(path: str, config_a: dict, config_b: dict, max_listed=20) -> dict:
+    """Replays the trace under two configurations and reports where their decisions part."""
+    report_a = replay(path, **config_a)
+    report_b = replay(path, **config_b)
+    a = np.frombuffer(bytes(report_a.pop("outcomes")), dtype=np.uint8)
+    b = np.frombuffer(bytes(report_b.pop("outcomes")), dtype=np.uint8)
+    differing = np.flatnonzero(a != b)
+    return {
+        "a": {"config": config_a, **report_a},
+        "b": {"config": config_b, **report_b},
+        "differing_events": int(differing.size),
+        "first_differing_events": differing[:max_listed].tolist(),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Replay a recorded allocator trace.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    replay_parser = subparsers.add_parser("replay", help="replay a trace and report decisions and cost")
+    replay_parser.add_argument("trace")
+    replay_parser.add_argument("--config", default="{}",
+                               help='JSON replay options, e.g. {"optimistic": true, "batch_size": 64}')
+    diff_parser = subparsers.add_parser("diff", help="replay a trace under two configurations and compare them")
+    diff_parser.add_argument("trace")
+    diff_parser.add_argument("--a", default="{}", help="JSON options for the first replay")
+    diff_parser.add_argument("--b", default="{}", help="JSON options for the second replay")
+    args = parser.parse_args()
+
+    if args.command == "replay":
+        report = replay(args.trace, **json.loads(args.config))
+        report.pop("outcomes")
+    else:
+        report = diff(args.trace, json.loads(args.a), json.loads(args.b))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
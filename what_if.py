@@ -0,0 +1,86 @@
+"""Read-only what-if queries: the largest safe request of each process and verdicts on hypothetical requests.
+
+Every query works on one snapshot of the state, taken with a single short lock acquisition (none in optimistic
+mode), never changes the state and spreads its work over a thread pool. The answers are those of the avoidance
+policy: under the detection policy request_resources grants anything that fits, but these still tell whether the
+state would stay safe.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from bankers_algorithm import BankersAlgorithm, StateSnapshot
+
+default_pool = None
+
+
+def default_executor() -> ThreadPoolExecutor:
+    global default_pool
+    if default_pool is None:
+        default_pool = ThreadPoolExecutor(max_workers=os.cpu_count() or 1, thread_name_prefix="what-if")
+    return default_pool
+
+
+def sequence_bound(snapshot: StateSnapshot, num_process, upper) -> np.ndarray:
+    """Largest box of requests that the snapshot's cached safe sequence keeps safe without a new search.
+
+    A request r is safe along the cached sequence if every process ahead of num_process still fits, that is
+    need[j] <= available - r + (allocation released before j), which bounds every entry of r independently.
+    """
+    if snapshot.safe_sequence is None:
+        return np.zeros_like(upper)
+
+    prefix = snapshot.safe_sequence[:snapshot.sequence_position[num_process]]
+    if not prefix.size:
+        return upper.copy()
+    prefix_alloc = snapshot.allocation[prefix]
+    released_before = np.cumsum(prefix_alloc, axis=0) - prefix_alloc
+    slack = (released_before - snapshot.need[prefix]).min(axis=0)
+    return np.clip(snapshot.available + slack, 0, upper)
+
+
+def max_safe_request(system_management: BankersAlgorithm, snapshot: StateSnapshot, num_process) -> np.ndarray:
+    """Returns a largest request num_process could make on snapshot that leaves the state safe.
+
+    Safe requests are closed under taking less, so each resource type in turn is raised by binary search as far as
+    it stays safe given the ones before it. The result is maximal: no single entry of it can be increased.
+    """
+    upper = np.minimum(snapshot.need[num_process], snapshot.available)
+    request = sequence_bound(snapshot, num_process, upper)
+    if not request.any() and not system_management.check_request_on_snapshot(snapshot, num_process, request)[0]:
+        return request
+
+    for k in np.flatnonzero(request < upper):
+        low, high = request[k], upper[k]
+        while low < high:
+            request[k] = (low + high + 1) // 2
+            if system_management.check_request_on_snapshot(snapshot, num_process, request)[0]:
+                low = request[k]
+            else:
+                high = request[k] - 1
+        request[k] = low
+    return request
+
+
+def max_safe_requests(system_management: BankersAlgorithm, processes=None, executor=None) -> np.ndarray:
+    """Returns max_safe_request for each of processes (all of them by default), one row per process."""
+    snapshot = system_management.take_snapshot()
+    processes = range(len(snapshot.need)) if processes is None else processes
+    executor = executor if executor is not None else default_executor()
+    rows = list(executor.map(lambda num_process: max_safe_request(system_management, snapshot, num_process),
+                             processes))
+    return np.array(rows, dtype=np.int64).reshape(len(rows), snapshot.need.shape[1])
+
+
+def evaluate_requests(system_management: BankersAlgorithm, requests, executor=None) -> list:
+    """Returns, for each (num_process, request_res) pair, whether it fits and leaves the state safe right now.
+
+    That is whether request_resources would grant it under the avoidance policy. The requests are judged
+    independently of each other against the same snapshot.
+    """
+    snapshot = system_management.take_snapshot()
+    executor = executor if executor is not None else default_executor()
+    vectors = [(num_process, np.asarray(request_res, dtype=np.int64)) for num_process, request_res in requests]
+    return list(executor.map(
+        lambda item: system_management.check_request_on_snapshot(snapshot, item[0], item[1])[0], vectors))